@@ -0,0 +1,134 @@
+"""Fila de consultas à IA executadas em segundo plano.
+
+Cada consulta vira um job com identificador e status, executado por um pool
+de threads limitado por processo. A sessão que fez a pergunta apenas consulta
+o andamento do job, sem bloquear a execução do script.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+
+FINISHED_STATUSES = (DONE, ERROR)
+
+
+class ConsultationJob:
+    """Estado de uma consulta: status, partes já recebidas e resposta final"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.status = QUEUED
+        self.chunks: List[str] = []
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def text(self) -> str:
+        """Resposta acumulada até o momento"""
+        return "".join(self.chunks)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+
+class ConsultationPool:
+    """Pool limitado de workers para consultas à IA
+
+    ``max_workers`` limita as chamadas simultâneas à API e ``max_pending`` o
+    total de jobs aceitos (em execução + na fila). Acima desse limite novas
+    consultas são recusadas em vez de acumular threads ou memória.
+    """
+
+    def __init__(self, max_workers: int = 8, max_pending: int = 64, job_ttl_seconds: float = 600):
+        if max_workers <= 0 or max_pending < max_workers:
+            raise ValueError("max_pending deve ser maior ou igual a max_workers, ambos positivos")
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.job_ttl_seconds = job_ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai-consultation")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._jobs: Dict[str, ConsultationJob] = {}
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def submit(self, generate: Callable[[], Iterable[str]]) -> Optional[str]:
+        """Agenda uma consulta e retorna o id do job, ou ``None`` se o pool estiver cheio
+
+        ``generate`` é chamado na thread do worker e deve produzir a resposta
+        em partes; cada parte fica visível em ``ConsultationJob.chunks``.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            return None
+
+        job = ConsultationJob(uuid.uuid4().hex)
+        with self._lock:
+            self._prune()
+            self._jobs[job.job_id] = job
+
+        try:
+            self._executor.submit(self._run, job, generate)
+        except Exception:
+            self._slots.release()
+            with self._lock:
+                self._jobs.pop(job.job_id, None)
+            raise
+        return job.job_id
+
+    def get(self, job_id: str) -> Optional[ConsultationJob]:
+        """Retorna o job pelo id, se ainda existir"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def discard(self, job_id: str):
+        """Remove um job já finalizado depois que a sessão consumiu a resposta"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.finished:
+                del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, int]:
+        """Contagem de jobs por status"""
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, DONE: 0, ERROR: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            counts["rejected"] = self.rejected
+            return counts
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job: ConsultationJob, generate: Callable[[], Iterable[str]]):
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            for chunk in generate():
+                job.chunks.append(chunk)
+            job.status = DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = ERROR
+        finally:
+            job.finished_at = time.time()
+            self._slots.release()
+
+    def _prune(self):
+        # Descarta jobs finalizados que nenhuma sessão buscou dentro do prazo
+        cutoff = time.time() - self.job_ttl_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
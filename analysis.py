@@ -0,0 +1,219 @@
+"""Análise das demonstrações sem dependência do Streamlit.
+
+Indicadores com fórmulas e interpretações, classificação de status e a
+organização do Balanço e da DRE em linhas, compartilhados pelo app e pelo
+gerador de relatórios em lote (``reports.py``).
+"""
+import hashlib
+import importlib.util
+import json
+from typing import Dict, Any, List
+
+# Rótulos das sublinhas do Balanço (as chaves são as de ledger.BALANCE_SHEET_SUBLINES)
+BALANCE_SHEET_SUBLINE_LABELS = {
+    "disponibilidades": "Disponibilidades",
+    "clientes": "Clientes",
+    "estoques": "Estoques",
+    "imobilizado": "Imobilizado",
+    "fornecedores": "Fornecedores",
+    "obrigacoes_trabalhistas": "Obrigações Trabalhistas",
+    "emprestimos_cp": "Empréstimos CP",
+    "emprestimos_lp": "Empréstimos LP",
+    "capital_social": "Capital Social",
+    "lucros_acumulados": "Lucros Acumulados",
+}
+
+# Cada lado do Balanço: grupos (linha, rótulo, sublinhas) e a linha de total
+BALANCE_SHEET_LAYOUT = {
+    "ativo": (
+        (
+            ("ativo_circulante", "Ativo Circulante", ("disponibilidades", "clientes", "estoques")),
+            ("ativo_nao_circulante", "Ativo não Circulante", ("imobilizado",)),
+        ),
+        ("total_ativo", "TOTAL DO ATIVO"),
+    ),
+    "passivo": (
+        (
+            ("passivo_circulante", "Passivo Circulante", ("fornecedores", "obrigacoes_trabalhistas", "emprestimos_cp")),
+            ("passivo_nao_circulante", "Passivo não Circulante", ("emprestimos_lp",)),
+            ("patrimonio_liquido", "Patrimônio Líquido", ("capital_social", "lucros_acumulados")),
+        ),
+        ("total_passivo", "TOTAL"),
+    ),
+}
+
+# Linhas da DRE na ordem de apresentação
+DRE_LINES = (
+    ("Receita Bruta de Vendas", "receita_bruta"),
+    ("(-) Deduções da Receita", "deducoes"),
+    ("(=) Receita Líquida", "receita_liquida"),
+    ("(-) Custo das Mercadorias/Serviços", "custo_mercadorias"),
+    ("(=) Lucro Bruto", "lucro_bruto"),
+    ("(-) Despesas com Vendas", "despesas_vendas"),
+    ("(-) Despesas Administrativas", "despesas_administrativas"),
+    ("(-) Depreciação", "depreciacao"),
+    ("(=) Resultado Operacional", "resultado_operacional"),
+    ("(+) Receitas Financeiras", "receitas_financeiras"),
+    ("(-) Despesas Financeiras", "despesas_financeiras"),
+    ("(=) Resultado Antes do IRPJ e CSLL", "resultado_antes_ir"),
+    ("(-) IRPJ/CSLL", "ir_csll"),
+    ("(=) Lucro Líquido do Período", "lucro_liquido"),
+)
+
+# Rótulo de cada linha principal do Balanço e da DRE, na ordem de apresentação
+STATEMENT_LINE_LABELS = {
+    **{line: label for line, label, _ in BALANCE_SHEET_LAYOUT["ativo"][0]},
+    "total_ativo": "TOTAL DO ATIVO",
+    **{line: label for line, label, _ in BALANCE_SHEET_LAYOUT["passivo"][0]},
+    "total_passivo": "TOTAL DO PASSIVO + PL",
+    **{key: label for label, key in DRE_LINES},
+}
+
+INDICATOR_LABELS = {
+    "liquidez_corrente": "💧 Liquidez Corrente",
+    "liquidez_geral": "🌊 Liquidez Geral",
+    "capital_giro": "💰 Capital de Giro",
+    "margem_bruta": "📊 Margem Bruta",
+    "margem_operacional": "⚙️ Margem Operacional",
+    "margem_liquida": "💎 Margem Líquida",
+    "divida_patrimonio": "⚖️ Dívida/Patrimônio Líquido",
+}
+
+# Classe CSS e emoji de cada código de status (indicators.STATUS_DANGER/WARNING/GOOD)
+STATUS_CLASSES = ("status-danger", "status-warning", "status-good")
+STATUS_EMOJIS = ("🔴", "🟡", "🟢")
+
+
+def module_available(name: str) -> bool:
+    """Se uma dependência opcional está instalada, sem importá-la"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def statements_version(data: Dict[str, Any]) -> str:
+    """Hash do conteúdo das demonstrações, usado como chave de caches e de relatórios já gerados
+
+    Inclui os dados cadastrais (nome, setor, período), que também aparecem
+    nos relatórios e nas comparações.
+    """
+    payload = json.dumps(
+        {
+            "company_info": data.get("company_info", {}),
+            "balance_sheet": data["balance_sheet"],
+            "income_statement": data["income_statement"],
+        },
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def format_brl(value: float) -> str:
+    """Formata um valor no padrão brasileiro (R$ 25.000,00)"""
+    return "R$ " + f"{value:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+def format_indicator(name: str, value: float) -> str:
+    """Valor do indicador como exibido nos cartões: R$ para capital de giro, % para margens"""
+    if name == "capital_giro":
+        return f"R$ {value:,.0f}"
+    if name.startswith("margem_"):
+        return f"{value:.2f}%"
+    return f"{value:.2f}"
+
+
+def balance_sheet_markdown(bs: Dict[str, Any], side: str) -> str:
+    """Um lado do Balanço em Markdown; sublinhas ausentes na fonte são omitidas"""
+    groups, (total, total_label) = BALANCE_SHEET_LAYOUT[side]
+    blocks = []
+    for line, label, sublines in groups:
+        items = "\n".join(
+            f"- {BALANCE_SHEET_SUBLINE_LABELS[key]}: {format_brl(bs[key])}" for key in sublines if key in bs
+        )
+        blocks.append(f"**{label}:** R$ {bs[line]:,.2f}\n{items}")
+    blocks.append(f"**{total_label}:** R$ {bs[total]:,.2f}")
+    return "\n\n".join(blocks)
+
+
+def dre_rows(is_: Dict[str, Any]) -> List[List[str]]:
+    """Linhas ``[item, valor]`` da DRE"""
+    return [[label, f"R$ {is_[key]:,.2f}"] for label, key in DRE_LINES]
+
+
+def build_indicators(data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Monta os indicadores com fórmulas e interpretações a partir das demonstrações"""
+    bs = data["balance_sheet"]
+    is_ = data["income_statement"]
+
+    from indicators import compute_indicators, statements_to_frame
+
+    # Visão de uma linha sobre o motor vetorizado
+    values = compute_indicators(statements_to_frame(data)).iloc[0]
+
+    indicators = {
+        "liquidez_corrente": {
+            "value": float(values["liquidez_corrente"]),
+            "formula": "Ativo Circulante / Passivo Circulante",
+            "calculation": f"R$ {bs['ativo_circulante']:,.0f} / R$ {bs['passivo_circulante']:,.0f}",
+            "interpretation": "Para cada R$ 1,00 de dívida de curto prazo, a empresa possui R$ {:.2f} de recursos de curto prazo"
+        },
+        "liquidez_geral": {
+            "value": float(values["liquidez_geral"]),
+            "formula": "Ativo Circulante / (Passivo Circulante + Passivo não Circulante)",
+            "calculation": f"R$ {bs['ativo_circulante']:,.0f} / (R$ {bs['passivo_circulante']:,.0f} + R$ {bs['passivo_nao_circulante']:,.0f})",
+            "interpretation": "Para cada R$ 1,00 de dívida total, a empresa possui R$ {:.2f} de recursos"
+        },
+        "capital_giro": {
+            "value": float(values["capital_giro"]),
+            "formula": "Ativo Circulante - Passivo Circulante",
+            "calculation": f"R$ {bs['ativo_circulante']:,.0f} - R$ {bs['passivo_circulante']:,.0f}",
+            "interpretation": "A empresa possui R$ {:.0f} de recursos próprios para financiar suas operações"
+        },
+        "margem_bruta": {
+            "value": float(values["margem_bruta"]),
+            "formula": "(Lucro Bruto / Receita Líquida) × 100",
+            "calculation": f"(R$ {is_['lucro_bruto']:,.0f} / R$ {is_['receita_liquida']:,.0f}) × 100",
+            "interpretation": "{:.2f}% da receita líquida se transforma em lucro bruto"
+        },
+        "margem_operacional": {
+            "value": float(values["margem_operacional"]),
+            "formula": "(Resultado Operacional / Receita Líquida) × 100",
+            "calculation": f"(R$ {is_['resultado_operacional']:,.0f} / R$ {is_['receita_liquida']:,.0f}) × 100",
+            "interpretation": "{:.2f}% da receita líquida se transforma em resultado operacional"
+        },
+        "margem_liquida": {
+            "value": float(values["margem_liquida"]),
+            "formula": "(Lucro Líquido / Receita Líquida) × 100",
+            "calculation": f"(R$ {is_['lucro_liquido']:,.0f} / R$ {is_['receita_liquida']:,.0f}) × 100",
+            "interpretation": "{:.2f}% da receita líquida se transforma em lucro líquido"
+        },
+        "divida_patrimonio": {
+            "value": float(values["divida_patrimonio"]),
+            "formula": "(Passivo Circulante + Passivo não Circulante) / Patrimônio Líquido",
+            "calculation": f"(R$ {bs['passivo_circulante']:,.0f} + R$ {bs['passivo_nao_circulante']:,.0f}) / R$ {bs['patrimonio_liquido']:,.0f}",
+            "interpretation": "Para cada R$ 1,00 de patrimônio líquido, a empresa possui R$ {:.2f} de dívidas"
+        }
+    }
+
+    # Formatar interpretações com valores
+    for indicator in indicators.values():
+        indicator["interpretation"] = indicator["interpretation"].format(indicator["value"])
+
+    return indicators
+
+
+def get_status_class(indicator_name, value):
+    """Retorna a classe CSS baseada no status do indicador (faixas de ``indicators.STATUS_THRESHOLDS``)"""
+    from indicators import status_code
+
+    code = status_code(indicator_name, value)
+    return "" if code is None else STATUS_CLASSES[code]
+
+
+def get_status_emoji(indicator_name, value) -> str:
+    """Emoji do status do indicador, pelas mesmas faixas de ``get_status_class``"""
+    from indicators import status_code
+
+    code = status_code(indicator_name, value)
+    return "" if code is None else STATUS_EMOJIS[code]
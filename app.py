@@ -1,9 +1,24 @@
 import streamlit as st
-import time
 import os
-from typing import Dict, Any, Optional
-import pandas as pd
-import numpy as np
+import json
+import functools
+import hmac
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Any, Iterator, Optional, Tuple
+
+from analysis import balance_sheet_markdown, build_indicators, dre_rows, get_status_class, get_status_emoji, module_available, statements_version
+from response_cache import ResponseCache, make_key
+from ai_jobs import ConsultationPool, DONE
+
+if TYPE_CHECKING:
+    from chat_history import ChatHistory, ChatHistoryStore
+    from formula_graph import FormulaGraph
+    from gemini_client import GeminiClient, GeminiClientRegistry
+    from period_store import PeriodStore
+    from figure_payload import PayloadBudget
+    from sector_benchmark import SectorBenchmark
+    from submissions import SubmissionStore
+    from telemetry import Telemetry
 
 # Configuração da página
 st.set_page_config(
@@ -13,48 +28,127 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Importações condicionais para evitar erros
-try:
-    import plotly.graph_objects as go
-    import plotly.express as px
-    from plotly.subplots import make_subplots
-    PLOTLY_AVAILABLE = True
-except ImportError:
-    PLOTLY_AVAILABLE = False
-
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
+# Dependências opcionais: apenas verifica se estão instaladas, sem importá-las.
+# pandas, plotly e o SDK do Gemini são importados nas funções que os usam, para
+# que a página inicial não pague o custo de carregá-los.
+PLOTLY_AVAILABLE = module_available("plotly")
+GEMINI_AVAILABLE = module_available("google.generativeai")
+
+# Instrumentação opcional (APP_TELEMETRY=1): tempo por seção e trecho, bytes
+# das figuras e reruns, exportados em JSON e no formato texto do Prometheus
+TELEMETRY_ENABLED = os.environ.get("APP_TELEMETRY", "0") == "1"
+TELEMETRY_LOG = os.environ.get("TELEMETRY_LOG", ".cache/telemetry/reruns.jsonl")
+TELEMETRY_PROMETHEUS = os.environ.get("TELEMETRY_PROMETHEUS", ".cache/telemetry/metrics.prom")
+TELEMETRY_ADMIN_TOKEN = os.environ.get("TELEMETRY_ADMIN_TOKEN")
+
+@st.cache_resource(show_spinner=False)
+def get_telemetry() -> "Telemetry":
+    """Agregador de medições compartilhado por todas as sessões do processo"""
+    from telemetry import Telemetry
+    return Telemetry(log_path=TELEMETRY_LOG or None, prometheus_path=TELEMETRY_PROMETHEUS or None)
+
+# O script é reexecutado a cada rerun, então cada execução tem seu próprio registro
+_RERUN = get_telemetry().start_rerun() if TELEMETRY_ENABLED else None
+
+@contextmanager
+def timed(name: str):
+    """Mede o bloco no registro do rerun atual (sem efeito com a instrumentação desligada)"""
+    if _RERUN is None or _RERUN.finished:
+        yield
+        return
+    with _RERUN.span(name):
+        yield
+
+def instrumented(func):
+    """Decorador que mede cada chamada de uma função ``show_*``"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with timed(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+def instrumented_fragment(func=None, **fragment_kwargs):
+    """``st.fragment`` que mede também as reexecuções só do fragmento
+
+    Nelas o script não roda e o registro do rerun completo já foi fechado;
+    cada reexecução ganha então um registro próprio, na seção
+    ``"<seção>:<fragmento>"``.
+    """
+    if func is None:
+        return functools.partial(instrumented_fragment, **fragment_kwargs)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global _RERUN
+        if not TELEMETRY_ENABLED or (_RERUN is not None and not _RERUN.finished):
+            return func(*args, **kwargs)
+        record = get_telemetry().start_rerun()
+        record.section = f"{st.session_state.get('current_section', 'home')}:{func.__name__}"
+        previous, _RERUN = _RERUN, record
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _RERUN = previous
+            get_telemetry().finish_rerun(record)
+    return st.fragment(wrapper, **fragment_kwargs)
 
 # Configuração do Gemini AI
-def configure_gemini():
-    """Configura a API do Gemini"""
+def get_gemini_api_key() -> Optional[str]:
+    """Obtém a chave da API do Gemini (secrets, ambiente ou sessão)"""
     try:
-        api_key = None
-        if hasattr(st, 'secrets') and 'GEMINI_API_KEY' in st.secrets:
-            api_key = st.secrets['GEMINI_API_KEY']
-        elif 'GEMINI_API_KEY' in os.environ:
-            api_key = os.environ['GEMINI_API_KEY']
-        elif 'gemini_api_key' in st.session_state:
-            api_key = st.session_state.gemini_api_key
-        
-        if api_key and GEMINI_AVAILABLE:
-            genai.configure(api_key=api_key)
-            return True
-        return False
-    except Exception as e:
-        return False
+        # Sem secrets.toml, o Streamlit levanta StreamlitSecretNotFoundError já no acesso
+        if 'GEMINI_API_KEY' in st.secrets:
+            return st.secrets['GEMINI_API_KEY']
+    except Exception:
+        pass
+    if os.environ.get('GEMINI_API_KEY'):
+        return os.environ['GEMINI_API_KEY']
+    return st.session_state.get('gemini_api_key')
 
-def get_gemini_response(prompt: str, context: str = "") -> Optional[str]:
-    """Obtém resposta do Gemini AI"""
-    try:
-        if not GEMINI_AVAILABLE or not configure_gemini():
-            return "IA não disponível. Configure a chave da API do Gemini para usar esta funcionalidade."
-        
-        model = genai.GenerativeModel('gemini-pro')
-        system_prompt = f"""
+def configure_gemini():
+    """Verifica se a API do Gemini está disponível para esta sessão"""
+    return GEMINI_AVAILABLE and bool(get_gemini_api_key())
+
+@st.cache_resource(show_spinner=False)
+def get_gemini_clients() -> "GeminiClientRegistry":
+    """Clientes do Gemini por chave, criados uma vez por processo"""
+    from gemini_client import GeminiClientRegistry
+    return GeminiClientRegistry(max_keys=AI_CLIENT_MAX_KEYS)
+
+def get_gemini_client() -> "GeminiClient":
+    """Cliente do Gemini para a chave ativa nesta sessão"""
+    return get_gemini_clients().get(get_gemini_api_key())
+
+GEMINI_MODEL = 'gemini-pro'
+
+AI_CONTEXT = "Empresa de pequeno porte no setor de manutenção de móveis e eletrodomésticos com crescimento de clientes mas problemas de controle de custos"
+
+# Limites do cache de respostas da IA
+AI_CACHE_MAX_ENTRIES = int(os.environ.get("AI_CACHE_MAX_ENTRIES", 256))
+AI_CACHE_TTL_SECONDS = float(os.environ.get("AI_CACHE_TTL_SECONDS", 6 * 3600))
+
+# Quantidade máxima de chaves de API com cliente mantido em memória
+AI_CLIENT_MAX_KEYS = int(os.environ.get("AI_CLIENT_MAX_KEYS", 16))
+
+# Concorrência das consultas em segundo plano (por processo)
+AI_MAX_WORKERS = int(os.environ.get("AI_MAX_WORKERS", 8))
+AI_MAX_PENDING = int(os.environ.get("AI_MAX_PENDING", 64))
+AI_POLL_INTERVAL = float(os.environ.get("AI_POLL_INTERVAL", 0.5))
+
+# Exibida (e nunca guardada no cache) quando o Gemini não devolve texto algum
+AI_EMPTY_ANSWER = (
+    "⚠️ A IA não retornou uma resposta: ela foi bloqueada pelos filtros de segurança ou veio vazia. "
+    "Reformule a pergunta e tente novamente."
+)
+
+@st.cache_resource(show_spinner=False)
+def get_response_cache() -> ResponseCache:
+    """Cache de respostas da IA compartilhado por todas as sessões"""
+    return ResponseCache(max_entries=AI_CACHE_MAX_ENTRIES, ttl_seconds=AI_CACHE_TTL_SECONDS)
+
+def build_system_prompt(prompt: str, context: str = "") -> str:
+    """Monta o prompt enviado ao Gemini"""
+    return f"""
         Você é um consultor financeiro especializado em análise de demonstrações contábeis.
         Contexto: Análise da empresa Alpha Serviços LTDA - {context}
         
@@ -67,193 +161,236 @@ def get_gemini_response(prompt: str, context: str = "") -> Optional[str]:
         
         Pergunta: {prompt}
         """
+
+def get_gemini_response(prompt: str, context: str = "") -> Optional[str]:
+    """Obtém resposta do Gemini AI"""
+    try:
+        if not GEMINI_AVAILABLE or not configure_gemini():
+            return "IA não disponível. Configure a chave da API do Gemini para usar esta funcionalidade."
         
-        response = model.generate_content(system_prompt)
-        return response.text
+        cache = get_response_cache()
+        cache_key = make_key(prompt, context, GEMINI_MODEL)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        client = get_gemini_client()
+        response = client.model(GEMINI_MODEL).generate_content(build_system_prompt(prompt, context))
+        try:
+            text = response.text
+        except ValueError:
+            # Resposta sem texto (ex.: bloqueada por segurança)
+            text = ""
+        if not text.strip():
+            return AI_EMPTY_ANSWER
+        cache.put(cache_key, text)
+        return text
     except Exception as e:
+        _discard_client_on_auth_error(e)
         return f"Erro ao consultar IA: {str(e)}"
 
-# CSS customizado aprimorado
-st.markdown("""
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&family=Poppins:wght@300;400;500;600;700;800&display=swap');
-    
-    .main-header {
-        font-family: 'Poppins', sans-serif;
-        font-size: 2.5rem;
-        font-weight: 700;
-        color: #1E40AF;
-        text-align: center;
-        margin-bottom: 1rem;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
-    }
-    
-    .sub-header {
-        font-family: 'Inter', sans-serif;
-        font-size: 1.2rem;
-        color: #64748B;
-        text-align: center;
-        margin-bottom: 2rem;
-    }
-    
-    .company-card {
-        background: linear-gradient(135deg, #1E40AF 0%, #3B82F6 100%);
-        border-radius: 1rem;
-        padding: 2rem;
-        margin: 2rem 0;
-        color: white;
-        box-shadow: 0 10px 25px rgba(30, 64, 175, 0.2);
-    }
-    
-    .company-title {
-        font-family: 'Poppins', sans-serif;
-        font-size: 2rem;
-        font-weight: 700;
-        margin-bottom: 1rem;
-        text-align: center;
-    }
-    
-    .company-info {
-        font-family: 'Inter', sans-serif;
-        font-size: 1rem;
-        line-height: 1.6;
-        text-align: center;
-        opacity: 0.9;
-    }
-    
-    .metric-card {
-        background: white;
-        border: 2px solid #E2E8F0;
-        border-radius: 0.75rem;
-        padding: 1.5rem;
-        margin: 1rem 0;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.05);
-        transition: all 0.3s ease;
-    }
-    
-    .metric-card:hover {
-        border-color: #3B82F6;
-        box-shadow: 0 8px 25px rgba(59, 130, 246, 0.15);
-        transform: translateY(-2px);
-    }
-    
-    .metric-title {
-        font-family: 'Poppins', sans-serif;
-        font-size: 1.1rem;
-        font-weight: 600;
-        color: #1E293B;
-        margin-bottom: 0.5rem;
-    }
-    
-    .metric-value {
-        font-family: 'Inter', sans-serif;
-        font-size: 2rem;
-        font-weight: 700;
-        color: #3B82F6;
-        margin-bottom: 0.5rem;
-    }
-    
-    .metric-interpretation {
-        font-family: 'Inter', sans-serif;
-        font-size: 0.9rem;
-        color: #64748B;
-        line-height: 1.4;
-    }
-    
-    .status-good {
-        color: #059669 !important;
-    }
-    
-    .status-warning {
-        color: #D97706 !important;
-    }
-    
-    .status-danger {
-        color: #DC2626 !important;
-    }
-    
-    .navigation-card {
-        background: linear-gradient(135deg, #F8FAFC 0%, #E2E8F0 100%);
-        border: 2px solid #CBD5E1;
-        border-radius: 1rem;
-        padding: 1.5rem;
-        margin: 1rem 0;
-        cursor: pointer;
-        transition: all 0.3s ease;
-    }
-    
-    .navigation-card:hover {
-        border-color: #3B82F6;
-        background: linear-gradient(135deg, #EFF6FF 0%, #DBEAFE 100%);
-        transform: translateY(-2px);
-        box-shadow: 0 8px 25px rgba(59, 130, 246, 0.15);
-    }
-    
-    .nav-title {
-        font-family: 'Poppins', sans-serif;
-        font-size: 1.3rem;
-        font-weight: 600;
-        color: #1E293B;
-        margin-bottom: 0.5rem;
-    }
-    
-    .nav-description {
-        font-family: 'Inter', sans-serif;
-        font-size: 1rem;
-        color: #64748B;
-        line-height: 1.5;
-    }
-    
-    .ai-chat-container {
-        background: linear-gradient(135deg, #F0F9FF 0%, #E0F2FE 100%);
-        border: 2px solid #0EA5E9;
-        border-radius: 1rem;
-        padding: 1.5rem;
-        margin: 1rem 0;
-    }
-    
-    .ai-response {
-        background: rgba(59, 130, 246, 0.1);
-        border-left: 4px solid #3B82F6;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        margin: 1rem 0;
-    }
-    
-    .data-table {
-        font-family: 'Inter', sans-serif;
-        border-collapse: collapse;
-        width: 100%;
-        margin: 1rem 0;
-    }
-    
-    .data-table th, .data-table td {
-        border: 1px solid #E2E8F0;
-        padding: 0.75rem;
-        text-align: left;
-    }
+def stream_gemini_response(prompt: str, context: str = "") -> Iterator[str]:
+    """Obtém a resposta do Gemini AI em partes, à medida que são geradas"""
+    try:
+        if not GEMINI_AVAILABLE or not configure_gemini():
+            yield "IA não disponível. Configure a chave da API do Gemini para usar esta funcionalidade."
+            return
+        
+        model = get_gemini_client().model(GEMINI_MODEL)
+        yield from _stream_from_model(model, get_response_cache(), prompt, context)
+    except Exception as e:
+        _discard_client_on_auth_error(e)
+        yield f"Erro ao consultar IA: {str(e)}"
+
+def _discard_client_on_auth_error(error: Exception, api_key: Optional[str] = None, clients=None):
+    """Descarta o cliente da chave quando a API recusa a autenticação"""
+    if not GEMINI_AVAILABLE:
+        return
+    from gemini_client import AUTH_ERRORS
+    if isinstance(error, AUTH_ERRORS):
+        api_key = api_key or get_gemini_api_key()
+        if api_key:
+            (clients or get_gemini_clients()).invalidate(api_key)
+
+def _stream_from_model(model, cache: ResponseCache, prompt: str, context: str) -> Iterator[str]:
+    """Gera a resposta em partes usando o cache; não acessa o estado do Streamlit
+    
+    Pode ser executada fora da thread do script, por isso recebe o modelo e o
+    cache já resolvidos.
+    """
+    cache_key = make_key(prompt, context, GEMINI_MODEL)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        yield cached
+        return
     
-    .data-table th {
-        background-color: #F8FAFC;
-        font-weight: 600;
-        color: #1E293B;
-    }
+    parts = []
+    for chunk in model.generate_content(build_system_prompt(prompt, context), stream=True):
+        try:
+            text = chunk.text
+        except ValueError:
+            # Partes sem texto (ex.: bloqueadas por segurança) são ignoradas
+            continue
+        parts.append(text)
+        yield text
+    
+    answer = "".join(parts)
+    if not answer.strip():
+        # Bloqueada ou vazia: avisa em vez de um balão em branco e não guarda no cache,
+        # para que a mesma pergunta possa ser refeita
+        yield AI_EMPTY_ANSWER
+        return
+    # Só respostas completas entram no cache
+    cache.put(cache_key, answer)
+
+# Histórico da consultoria: consultas mantidas em memória por sessão (as mais
+# recentes, exibidas na página); as anteriores vão para um SQLite local
+CHAT_HISTORY_IN_MEMORY = int(os.environ.get("CHAT_HISTORY_IN_MEMORY", 3))
+CHAT_HISTORY_DB = os.environ.get("CHAT_HISTORY_DB", ".cache/chat_history.sqlite3")
+CHAT_HISTORY_TTL_SECONDS = float(os.environ.get("CHAT_HISTORY_TTL_SECONDS", 7 * 24 * 3600))
+CHAT_HISTORY_PAGE_SIZE = int(os.environ.get("CHAT_HISTORY_PAGE_SIZE", 10))
+CHAT_HISTORY_SHOWN = 3
+
+@st.cache_resource(show_spinner=False)
+def get_chat_history_store() -> Optional["ChatHistoryStore"]:
+    """Banco do histórico compartilhado pelas sessões; sem ele, consultas antigas são descartadas"""
+    import sqlite3
+    from chat_history import ChatHistoryStore
     
-    .unifor-logo {
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        margin-bottom: 2rem;
-    }
+    try:
+        return ChatHistoryStore(CHAT_HISTORY_DB, ttl_seconds=CHAT_HISTORY_TTL_SECONDS)
+    except (sqlite3.Error, OSError):
+        return None
+
+def get_chat_history() -> "ChatHistory":
+    """Histórico de consultas da sessão, criado no primeiro uso"""
+    if 'ai_chat_history' not in st.session_state:
+        from chat_history import ChatHistory
+        st.session_state.ai_chat_history = ChatHistory(max(CHAT_HISTORY_IN_MEMORY, 1), get_chat_history_store())
+    return st.session_state.ai_chat_history
+
+# Seções do roteiro, na ordem da barra de progresso; a ordem também define os bits
+# das seções visitadas no banco de atividades, então novas seções entram no fim
+SECTIONS = ('home', 'statements', 'liquidity', 'profitability', 'capital_structure', 'integrated_analysis', 'ai_consultant')
+SECTION_LABELS = {
+    'home': "🏠 Início",
+    'statements': "📊 Demonstrações",
+    'liquidity': "💧 Liquidez",
+    'profitability': "📈 Rentabilidade",
+    'capital_structure': "⚖️ Estrutura Capital",
+    'integrated_analysis': "🎯 Análise Integrada",
+    'ai_consultant': "🤖 Consultoria IA",
+}
+
+# Atividades dos alunos (simulações, perguntas e seções visitadas) para o painel do
+# professor, gravadas em lote em um SQLite local (submissions.py)
+SUBMISSIONS_DB = os.environ.get("SUBMISSIONS_DB", ".cache/submissions.sqlite3")
+SUBMISSIONS_BATCH_SIZE = int(os.environ.get("SUBMISSIONS_BATCH_SIZE", 200))
+SUBMISSIONS_FLUSH_SECONDS = float(os.environ.get("SUBMISSIONS_FLUSH_SECONDS", 2))
+PROFESSOR_TOKEN = os.environ.get("PROFESSOR_TOKEN")
+ANONYMOUS_CLASS = "Sem turma"
+
+@st.cache_resource(show_spinner=False)
+def get_submission_store() -> Optional["SubmissionStore"]:
+    """Banco de atividades compartilhado pelas sessões; sem ele, nada é registrado"""
+    import sqlite3
+    from submissions import SubmissionStore
     
-    .progress-indicator {
-        background: linear-gradient(90deg, #3B82F6 0%, #1E40AF 100%);
-        height: 4px;
-        border-radius: 2px;
-        margin: 1rem 0;
+    try:
+        return SubmissionStore(
+            SUBMISSIONS_DB, SECTIONS,
+            batch_size=SUBMISSIONS_BATCH_SIZE, flush_interval=SUBMISSIONS_FLUSH_SECONDS
+        )
+    except (sqlite3.Error, OSError):
+        return None
+
+def student_identity() -> Tuple[str, str]:
+    """Turma e matrícula informadas na sidebar; sem matrícula, um id anônimo da sessão"""
+    student = st.session_state.get('student_id', '').strip()
+    if not student:
+        if 'anonymous_id' not in st.session_state:
+            import uuid
+            st.session_state.anonymous_id = f"anon-{uuid.uuid4().hex[:12]}"
+        student = st.session_state.anonymous_id
+    class_id = st.session_state.get('student_class', '').strip().upper() or ANONYMOUS_CLASS
+    return class_id, student
+
+def record_visit(section: str):
+    """Registra a primeira visita do aluno a cada seção"""
+    store = get_submission_store()
+    if store is None:
+        return
+    identity = student_identity()
+    visited = st.session_state.setdefault('recorded_visits', set())
+    if (identity, section) not in visited:
+        visited.add((identity, section))
+        store.record_visit(*identity, section)
+
+@st.cache_resource(show_spinner=False)
+def get_consultation_pool() -> ConsultationPool:
+    """Pool de workers das consultas à IA, único por processo"""
+    return ConsultationPool(max_workers=AI_MAX_WORKERS, max_pending=AI_MAX_PENDING)
+
+def submit_consultation(prompt: str, context: str = "") -> Optional[str]:
+    """Agenda a consulta em segundo plano e retorna o id do job (``None`` se o pool estiver cheio)"""
+    # Chave, modelo e cache são resolvidos aqui, na thread do script
+    api_key = get_gemini_api_key()
+    clients = get_gemini_clients()
+    model = clients.get(api_key).model(GEMINI_MODEL)
+    cache = get_response_cache()
+    
+    def generate():
+        try:
+            yield from _stream_from_model(model, cache, prompt, context)
+        except Exception as e:
+            _discard_client_on_auth_error(e, api_key, clients)
+            raise
+    
+    return get_consultation_pool().submit(generate)
+
+# CSS customizado aprimorado: arquivo estático com nome por conteúdo (static_assets.py),
+# que o navegador baixa uma vez e mantém em cache; sem servidor de estáticos, volta ao <style> inline
+
+@st.cache_resource(show_spinner=False)
+def get_static_assets() -> Dict[str, Any]:
+    """Gera os arquivos estáticos uma vez por processo e devolve as URLs a usar"""
+    from static_assets import STATIC_URL_PREFIX, build_assets, fallback_css
+    
+    served = bool(st.get_option("server.enableStaticServing"))
+    manifest = None
+    if served:
+        try:
+            manifest = build_assets()
+        except OSError:
+            # Sistema de arquivos somente leitura: segue com o CSS inline
+            manifest = None
+    
+    if manifest is None:
+        return {"css_url": None, "inline_css": fallback_css(), "logo_url": None}
+    return {
+        "css_url": STATIC_URL_PREFIX + manifest["css"],
+        "inline_css": None,
+        # Sem o logo em assets/, o cabeçalho usa o nome em texto
+        "logo_url": STATIC_URL_PREFIX + manifest["logo"] if manifest["logo"] else None,
     }
-</style>
-""", unsafe_allow_html=True)
+
+def inject_styles():
+    """Aplica o CSS do app: referência ao arquivo estático, ou o CSS inteiro inline"""
+    assets = get_static_assets()
+    if assets["css_url"] is None:
+        st.markdown(f"<style>\n{assets['inline_css']}</style>", unsafe_allow_html=True)
+        return
+    # Só <style>: o st.html não ocupa espaço na página. O Streamlit remove o que
+    # não é reenviado no rerun, então a regra (poucos bytes) vai em todo rerun;
+    # o arquivo com hash no nome fica no cache do navegador.
+    st.html(f"<style>@import url({json.dumps(assets['css_url'])});</style>")
+
+with timed("css"):
+    inject_styles()
+
+# Parâmetros da simulação de Monte Carlo da Análise Integrada
+MONTE_CARLO_DRAWS = int(os.environ.get("MONTE_CARLO_DRAWS", 1_000_000))
+MONTE_CARLO_SEED = 2025
 
 # Dados reais da Alpha Serviços LTDA
 ALPHA_DATA = {
@@ -261,7 +398,8 @@ ALPHA_DATA = {
         "name": "Alpha Serviços LTDA",
         "segment": "Comércio e prestação de serviços especializados em manutenção de móveis e eletrodomésticos",
         "size": "Empresa de Pequeno Porte",
-        "challenge": "Crescimento no volume de clientes sem controle rigoroso de custos e despesas"
+        "challenge": "Crescimento no volume de clientes sem controle rigoroso de custos e despesas",
+        "period": "2025-03"
     },
     "balance_sheet": {
         "ativo_circulante": 80000,
@@ -270,7 +408,17 @@ ALPHA_DATA = {
         "passivo_circulante": 60000,
         "passivo_nao_circulante": 30000,
         "patrimonio_liquido": 90000,
-        "total_passivo": 180000
+        "total_passivo": 180000,
+        "disponibilidades": 25000,
+        "clientes": 40000,
+        "estoques": 15000,
+        "imobilizado": 100000,
+        "fornecedores": 35000,
+        "obrigacoes_trabalhistas": 10000,
+        "emprestimos_cp": 15000,
+        "emprestimos_lp": 30000,
+        "capital_social": 73850,
+        "lucros_acumulados": 16150
     },
     "income_statement": {
         "receita_bruta": 150000,
@@ -290,113 +438,212 @@ ALPHA_DATA = {
     }
 }
 
+@st.cache_data(show_spinner="📂 Carregando demonstrações...")
+def load_company_data(source: str, source_mtime: float, company: Optional[str] = None, period: Optional[str] = None) -> Dict[str, Any]:
+    """Carrega as demonstrações de uma empresa de um arquivo CSV, Parquet ou SPED-ECD
+    
+    ``source_mtime`` faz parte da chave do cache para recarregar quando o arquivo muda.
+    """
+    from data_sources import load_statements, to_alpha_data
+    
+    frame = load_statements(source, companies=[company] if company else None)
+    if frame.empty:
+        raise ValueError(f"Nenhuma demonstração encontrada em '{source}'")
+    if company is None:
+        company = frame.index.get_level_values("company")[0]
+    return to_alpha_data(frame, company, period)
+
+# Fonte externa opcional: STATEMENTS_SOURCE aponta para o arquivo e
+# STATEMENTS_COMPANY/STATEMENTS_PERIOD escolhem empresa e período
+STATEMENTS_SOURCE = os.environ.get("STATEMENTS_SOURCE")
+if STATEMENTS_SOURCE:
+    ALPHA_DATA = load_company_data(
+        STATEMENTS_SOURCE,
+        os.path.getmtime(STATEMENTS_SOURCE),
+        os.environ.get("STATEMENTS_COMPANY") or None,
+        os.environ.get("STATEMENTS_PERIOD") or None
+    )
+
+# Base de comparação setorial opcional (sector_benchmark.py): SECTOR_BENCHMARK_SOURCE aponta
+# para um arquivo de demonstrações de empresas pares, com o setor na coluna "segment"
+SECTOR_BENCHMARK_SOURCE = os.environ.get("SECTOR_BENCHMARK_SOURCE")
+SECTOR_BENCHMARK_PERIOD = os.environ.get("SECTOR_BENCHMARK_PERIOD") or None
+ALL_SECTORS = "Todos os setores"
+
+@st.cache_resource(show_spinner="🏭 Carregando empresas do setor...")
+def load_sector_benchmark(source: str, source_mtime: float, period: Optional[str] = None) -> "SectorBenchmark":
+    """Arrays ordenados dos indicadores por setor, montados uma vez por processo
+    
+    ``source_mtime`` faz parte da chave do cache para recarregar quando o arquivo muda.
+    """
+    from sector_benchmark import SectorBenchmark
+    return SectorBenchmark.from_file(source, period=period)
+
+def get_sector_benchmark() -> "SectorBenchmark":
+    """Base de comparação setorial configurada em SECTOR_BENCHMARK_SOURCE"""
+    return load_sector_benchmark(SECTOR_BENCHMARK_SOURCE, os.path.getmtime(SECTOR_BENCHMARK_SOURCE), SECTOR_BENCHMARK_PERIOD)
+
+# Histórico de períodos (period_store.py): as demonstrações de cada período são
+# acrescentadas a um armazenamento Parquet por empresa, sem reescrever as anteriores
+PERIOD_STORE_DIR = os.environ.get("PERIOD_STORE_DIR", ".cache/periods")
+
+@st.cache_resource(show_spinner=False)
+def get_period_store() -> Optional["PeriodStore"]:
+    """Histórico de períodos compartilhado pelas sessões; ``None`` sem pyarrow ou sem acesso ao diretório"""
+    from period_store import PeriodStore
+    
+    try:
+        return PeriodStore(PERIOD_STORE_DIR)
+    except (ImportError, OSError):
+        return None
+
+@st.cache_resource(show_spinner=False)
+def _sync_period_history(company: str, version: str) -> int:
+    """Acrescenta ao histórico os períodos da fonte ainda não gravados, uma vez por versão dos dados"""
+    store = get_period_store()
+    if STATEMENTS_SOURCE:
+        from data_sources import load_statements
+        return store.append(company, load_statements(STATEMENTS_SOURCE, companies=[company]))
+    return store.append(company, ALPHA_DATA)
+
+def get_period_history() -> Optional[Tuple[str, str]]:
+    """``(empresa, versão do histórico)`` da empresa em análise, com o histórico já sincronizado"""
+    store = get_period_store()
+    if store is None:
+        return None
+    info = ALPHA_DATA["company_info"]
+    company = info.get("company") or info["name"]
+    _sync_period_history(company, data_version())
+    return company, store.version(company)
+
+@st.cache_data(show_spinner=False)
+def _cached_period_analysis(company: str, history_version: str) -> Dict[str, Any]:
+    """Análises vertical, horizontal e anual de todos os períodos, por versão do histórico"""
+    from period_store import horizontal_analysis, period_indicators, vertical_analysis, year_over_year
+    
+    history = get_period_store().read(company)
+    indicators = period_indicators(history)
+    return {
+        "periods": list(history.index),
+        "vertical": vertical_analysis(history),
+        "horizontal": horizontal_analysis(history),
+        "yoy": year_over_year(history),
+        "indicators": indicators,
+        "indicators_yoy": year_over_year(indicators, relative=False),
+    }
+
+@st.cache_resource(show_spinner=False)
+def _cached_period_margins_figure(company: str, history_version: str) -> Dict[str, Any]:
+    """Figura das margens por período, já reduzida para o envio"""
+    from analysis import INDICATOR_LABELS
+    from figures import build_period_series_figure
+    
+    margins = _cached_period_analysis(company, history_version)["indicators"][["margem_bruta", "margem_operacional", "margem_liquida"]]
+    return prepare_figure(build_period_series_figure(margins, "Margens por Período", "Margem (%)", INDICATOR_LABELS))
+
+@st.cache_data(show_spinner=False)
+def _cached_rolling_indicators(company: str, history_version: str, window: int):
+    from period_store import rolling_indicators
+    return rolling_indicators(get_period_store().read(company), window)
+
+def data_version(data: Dict[str, Any] = None) -> str:
+    """Retorna o hash do conteúdo das demonstrações, usado como chave dos caches"""
+    return statements_version(ALPHA_DATA if data is None else data)
+
+def clear_statement_cache():
+    """Invalida explicitamente os resultados derivados das demonstrações"""
+    _cached_indicators.clear()
+    _cached_statement_tables.clear()
+    _cached_figure.clear()
+
 # Cálculo dos indicadores
 def calculate_indicators():
     """Calcula todos os indicadores financeiros"""
-    bs = ALPHA_DATA["balance_sheet"]
-    is_ = ALPHA_DATA["income_statement"]
-    
-    indicators = {
-        "liquidez_corrente": {
-            "value": bs["ativo_circulante"] / bs["passivo_circulante"],
-            "formula": "Ativo Circulante / Passivo Circulante",
-            "calculation": f"R$ {bs['ativo_circulante']:,.0f} / R$ {bs['passivo_circulante']:,.0f}",
-            "interpretation": "Para cada R$ 1,00 de dívida de curto prazo, a empresa possui R$ {:.2f} de recursos de curto prazo"
-        },
-        "liquidez_geral": {
-            "value": bs["ativo_circulante"] / (bs["passivo_circulante"] + bs["passivo_nao_circulante"]),
-            "formula": "Ativo Circulante / (Passivo Circulante + Passivo não Circulante)",
-            "calculation": f"R$ {bs['ativo_circulante']:,.0f} / (R$ {bs['passivo_circulante']:,.0f} + R$ {bs['passivo_nao_circulante']:,.0f})",
-            "interpretation": "Para cada R$ 1,00 de dívida total, a empresa possui R$ {:.2f} de recursos"
-        },
-        "capital_giro": {
-            "value": bs["ativo_circulante"] - bs["passivo_circulante"],
-            "formula": "Ativo Circulante - Passivo Circulante",
-            "calculation": f"R$ {bs['ativo_circulante']:,.0f} - R$ {bs['passivo_circulante']:,.0f}",
-            "interpretation": "A empresa possui R$ {:.0f} de recursos próprios para financiar suas operações"
-        },
-        "margem_bruta": {
-            "value": (is_["lucro_bruto"] / is_["receita_liquida"]) * 100,
-            "formula": "(Lucro Bruto / Receita Líquida) × 100",
-            "calculation": f"(R$ {is_['lucro_bruto']:,.0f} / R$ {is_['receita_liquida']:,.0f}) × 100",
-            "interpretation": "{:.2f}% da receita líquida se transforma em lucro bruto"
-        },
-        "margem_operacional": {
-            "value": (is_["resultado_operacional"] / is_["receita_liquida"]) * 100,
-            "formula": "(Resultado Operacional / Receita Líquida) × 100",
-            "calculation": f"(R$ {is_['resultado_operacional']:,.0f} / R$ {is_['receita_liquida']:,.0f}) × 100",
-            "interpretation": "{:.2f}% da receita líquida se transforma em resultado operacional"
-        },
-        "margem_liquida": {
-            "value": (is_["lucro_liquido"] / is_["receita_liquida"]) * 100,
-            "formula": "(Lucro Líquido / Receita Líquida) × 100",
-            "calculation": f"(R$ {is_['lucro_liquido']:,.0f} / R$ {is_['receita_liquida']:,.0f}) × 100",
-            "interpretation": "{:.2f}% da receita líquida se transforma em lucro líquido"
-        },
-        "divida_patrimonio": {
-            "value": (bs["passivo_circulante"] + bs["passivo_nao_circulante"]) / bs["patrimonio_liquido"],
-            "formula": "(Passivo Circulante + Passivo não Circulante) / Patrimônio Líquido",
-            "calculation": f"(R$ {bs['passivo_circulante']:,.0f} + R$ {bs['passivo_nao_circulante']:,.0f}) / R$ {bs['patrimonio_liquido']:,.0f}",
-            "interpretation": "Para cada R$ 1,00 de patrimônio líquido, a empresa possui R$ {:.2f} de dívidas"
-        }
+    with timed("indicators"):
+        return _cached_indicators(data_version(), ALPHA_DATA)
+
+@st.cache_data(show_spinner=False)
+def _cached_indicators(version: str, _data: Dict[str, Any]):
+    """Indicadores compartilhados entre sessões, recalculados apenas quando a versão muda"""
+    return build_indicators(_data)
+
+# Orçamento de pontos das linhas (LTTB, em downsampling.py): uma linha nunca precisa de
+# mais pontos do que a largura da tela; acima do limite a figura passa para WebGL
+CHART_MAX_POINTS = int(os.environ.get("CHART_MAX_POINTS", 1500))
+CHART_WEBGL_THRESHOLD = int(os.environ.get("CHART_WEBGL_THRESHOLD", 5000))
+# Orçamento de bytes das figuras por página (figure_payload.py); 0 desliga o aviso
+PAGE_PAYLOAD_BUDGET_KB = int(os.environ.get("PAGE_PAYLOAD_BUDGET_KB", 256))
+
+def _new_page_payload() -> "PayloadBudget":
+    from figure_payload import PayloadBudget
+    return PayloadBudget(PAGE_PAYLOAD_BUDGET_KB * 1024)
+
+# Como o registro de telemetria, a contagem de bytes é refeita a cada execução do script
+_PAGE_PAYLOAD = _new_page_payload()
+
+def prepare_figure(fig) -> Dict[str, Any]:
+    """Reduz as linhas longas, compacta o JSON da figura e mede os bytes enviados e os da figura original"""
+    from downsampling import downsample_figure
+    from figure_payload import compact_figure, figure_json
+    
+    compact = compact_figure(downsample_figure(fig, CHART_MAX_POINTS, CHART_WEBGL_THRESHOLD))
+    payload = figure_json(compact)
+    return {
+        "figure": compact,
+        "json": payload,
+        "bytes": len(payload.encode("utf-8")),
+        "raw_bytes": len(figure_json(fig).encode("utf-8")),
     }
-    
-    # Formatar interpretações com valores
-    for key, indicator in indicators.items():
-        if "{" in indicator["interpretation"]:
-            if key == "capital_giro":
-                indicator["interpretation"] = indicator["interpretation"].format(indicator["value"])
-            else:
-                indicator["interpretation"] = indicator["interpretation"].format(indicator["value"])
-    
-    return indicators
-
-def get_status_class(indicator_name, value):
-    """Retorna a classe CSS baseada no status do indicador"""
-    if indicator_name == "liquidez_corrente":
-        if value >= 1.5:
-            return "status-good"
-        elif value >= 1.0:
-            return "status-warning"
-        else:
-            return "status-danger"
-    elif indicator_name == "liquidez_geral":
-        if value >= 1.0:
-            return "status-good"
-        elif value >= 0.8:
-            return "status-warning"
-        else:
-            return "status-danger"
-    elif indicator_name == "capital_giro":
-        if value > 0:
-            return "status-good"
-        else:
-            return "status-danger"
-    elif indicator_name in ["margem_bruta", "margem_operacional", "margem_liquida"]:
-        if value >= 20:
-            return "status-good"
-        elif value >= 10:
-            return "status-warning"
-        else:
-            return "status-danger"
-    elif indicator_name == "divida_patrimonio":
-        if value <= 0.5:
-            return "status-good"
-        elif value <= 1.0:
-            return "status-warning"
-        else:
-            return "status-danger"
-    
-    return ""
+
+@st.cache_resource(show_spinner=False)
+def _cached_figure(name: str, version: str, _data: Dict[str, Any]):
+    """Figura construída uma única vez por versão dos dados e compartilhada entre sessões
+    
+    O objeto é mantido já construído junto com seu JSON serializado: reconstruir a
+    figura a partir do JSON a cada rerun custa mais do que montá-la do zero.
+    """
+    from figures import FIGURE_BUILDERS
+    return prepare_figure(FIGURE_BUILDERS[name](_data))
+
+def get_figure(name: str):
+    """Retorna a figura pré-construída para a versão atual dos dados"""
+    with timed(f"figure:{name}"):
+        return _cached_figure(name, data_version(), ALPHA_DATA)["figure"]
+
+def get_figure_json(name: str) -> str:
+    """Retorna o JSON serializado da figura para a versão atual dos dados"""
+    return _cached_figure(name, data_version(), ALPHA_DATA)["json"]
+
+def show_figure(name: str, figure=None):
+    """Envia a figura ``name`` do registro (ou ``figure``, se informada) ao navegador"""
+    if figure is None:
+        with timed(f"figure:{name}"):
+            entry = _cached_figure(name, data_version(), ALPHA_DATA)
+    else:
+        entry = prepare_figure(figure)
+    send_figure(name, entry)
+
+def send_figure(name: str, entry: Dict[str, Any]):
+    """Envia uma figura já preparada por ``prepare_figure`` e registra seus bytes na página e na telemetria"""
+    with timed(f"plotly_chart:{name}"):
+        st.plotly_chart(entry["figure"], use_container_width=True)
+    _PAGE_PAYLOAD.add(name, entry["bytes"])
+    if _RERUN is not None and not _RERUN.finished:
+        _RERUN.add_payload(name, entry["bytes"], entry["raw_bytes"])
+
+def show_payload_warning():
+    """Avisa quando as figuras da página passaram do orçamento de bytes"""
+    warning = _PAGE_PAYLOAD.close()
+    if warning:
+        st.warning(f"📶 {warning} Em redes lentas, a página pode demorar a carregar.")
 
 # Inicialização do estado da sessão
 def init_session_state():
     """Inicializa o estado da sessão"""
     if 'current_section' not in st.session_state:
         st.session_state.current_section = 'home'
-    if 'ai_chat_history' not in st.session_state:
-        st.session_state.ai_chat_history = []
 
+@instrumented
 def show_company_overview():
     """Exibe visão geral da empresa"""
     info = ALPHA_DATA["company_info"]
@@ -412,6 +659,11 @@ def show_company_overview():
     </div>
     """, unsafe_allow_html=True)
 
+def go_to(section: str):
+    """Callback de navegação: troca a seção antes do rerun, sem uma segunda execução do script"""
+    st.session_state.current_section = section
+
+@instrumented
 def show_navigation():
     """Exibe menu de navegação"""
     st.markdown("## 🧭 Navegação da Análise")
@@ -419,160 +671,129 @@ def show_navigation():
     col1, col2 = st.columns(2)
     
     with col1:
-        if st.button("📊 Demonstrações Contábeis", use_container_width=True):
-            st.session_state.current_section = 'statements'
-            st.rerun()
-        
-        if st.button("📈 Indicadores de Liquidez", use_container_width=True):
-            st.session_state.current_section = 'liquidity'
-            st.rerun()
-        
-        if st.button("💰 Indicadores de Rentabilidade", use_container_width=True):
-            st.session_state.current_section = 'profitability'
-            st.rerun()
+        st.button("📊 Demonstrações Contábeis", use_container_width=True, on_click=go_to, args=('statements',))
+        st.button("📈 Indicadores de Liquidez", use_container_width=True, on_click=go_to, args=('liquidity',))
+        st.button("💰 Indicadores de Rentabilidade", use_container_width=True, on_click=go_to, args=('profitability',))
     
     with col2:
-        if st.button("⚖️ Estrutura de Capital", use_container_width=True):
-            st.session_state.current_section = 'capital_structure'
-            st.rerun()
-        
-        if st.button("🎯 Análise Integrada", use_container_width=True):
-            st.session_state.current_section = 'integrated_analysis'
-            st.rerun()
-        
-        if st.button("🤖 Consultoria IA", use_container_width=True):
-            st.session_state.current_section = 'ai_consultant'
-            st.rerun()
+        st.button("⚖️ Estrutura de Capital", use_container_width=True, on_click=go_to, args=('capital_structure',))
+        st.button("🎯 Análise Integrada", use_container_width=True, on_click=go_to, args=('integrated_analysis',))
+        st.button("🤖 Consultoria IA", use_container_width=True, on_click=go_to, args=('ai_consultant',))
 
+@st.cache_data(show_spinner=False)
+def _cached_statement_tables(version: str, _data: Dict[str, Any]):
+    """Tabelas do Balanço e da DRE, compartilhadas entre sessões"""
+    import pandas as pd
+    
+    bs = _data["balance_sheet"]
+    df_dre = pd.DataFrame(dre_rows(_data["income_statement"]), columns=["Item", "Valor"])
+    
+    return {"ativo": balance_sheet_markdown(bs, "ativo"), "passivo": balance_sheet_markdown(bs, "passivo"), "dre": df_dre}
+
+@instrumented
 def show_statements():
     """Exibe as demonstrações contábeis"""
     st.markdown("## 📊 Demonstrações Contábeis")
     
-    tab1, tab2 = st.tabs(["🏛️ Balanço Patrimonial", "📈 DRE"])
+    tables = _cached_statement_tables(data_version(), ALPHA_DATA)
+    
+    tab1, tab2, tab3 = st.tabs(["🏛️ Balanço Patrimonial", "📈 DRE", "📅 Análise Temporal"])
     
     with tab1:
         st.markdown("### Balanço Patrimonial - Alpha Serviços LTDA")
         
-        bs = ALPHA_DATA["balance_sheet"]
-        
         col1, col2 = st.columns(2)
         
         with col1:
             st.markdown("#### ATIVO")
-            st.markdown(f"""
-            **Ativo Circulante:** R$ {bs['ativo_circulante']:,.2f}
-            - Disponibilidades: R$ 25.000,00
-            - Clientes: R$ 40.000,00
-            - Estoques: R$ 15.000,00
-            
-            **Ativo não Circulante:** R$ {bs['ativo_nao_circulante']:,.2f}
-            - Imobilizado: R$ 100.000,00
-            
-            **TOTAL DO ATIVO:** R$ {bs['total_ativo']:,.2f}
-            """)
+            st.markdown(tables["ativo"])
         
         with col2:
             st.markdown("#### PASSIVO + PL")
-            st.markdown(f"""
-            **Passivo Circulante:** R$ {bs['passivo_circulante']:,.2f}
-            - Fornecedores: R$ 35.000,00
-            - Obrigações Trabalhistas: R$ 10.000,00
-            - Empréstimos CP: R$ 15.000,00
-            
-            **Passivo não Circulante:** R$ {bs['passivo_nao_circulante']:,.2f}
-            - Empréstimos LP: R$ 30.000,00
-            
-            **Patrimônio Líquido:** R$ {bs['patrimonio_liquido']:,.2f}
-            - Capital Social: R$ 73.850,00
-            - Lucros Acumulados: R$ 16.150,00
-            
-            **TOTAL:** R$ {bs['total_passivo']:,.2f}
-            """)
+            st.markdown(tables["passivo"])
         
         # Gráfico do Balanço
         if PLOTLY_AVAILABLE:
-            fig = make_subplots(
-                rows=1, cols=2,
-                specs=[[{"type": "pie"}, {"type": "pie"}]],
-                subplot_titles=("Composição do Ativo", "Composição do Passivo + PL")
-            )
-            
-            # Ativo
-            fig.add_trace(go.Pie(
-                labels=["Ativo Circulante", "Ativo não Circulante"],
-                values=[bs['ativo_circulante'], bs['ativo_nao_circulante']],
-                name="Ativo",
-                marker_colors=['#3B82F6', '#1E40AF']
-            ), row=1, col=1)
-            
-            # Passivo + PL
-            fig.add_trace(go.Pie(
-                labels=["Passivo Circulante", "Passivo não Circulante", "Patrimônio Líquido"],
-                values=[bs['passivo_circulante'], bs['passivo_nao_circulante'], bs['patrimonio_liquido']],
-                name="Passivo + PL",
-                marker_colors=['#EF4444', '#F97316', '#10B981']
-            ), row=1, col=2)
-            
-            fig.update_layout(
-                title="Estrutura Patrimonial da Alpha Serviços LTDA",
-                height=500
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            show_figure("balance_sheet")
     
     with tab2:
         st.markdown("### Demonstração do Resultado do Exercício")
         
-        is_ = ALPHA_DATA["income_statement"]
-        
         # Tabela da DRE
-        dre_data = [
-            ["Receita Bruta de Vendas", f"R$ {is_['receita_bruta']:,.2f}"],
-            ["(-) Deduções da Receita", f"R$ {is_['deducoes']:,.2f}"],
-            ["(=) Receita Líquida", f"R$ {is_['receita_liquida']:,.2f}"],
-            ["(-) Custo das Mercadorias/Serviços", f"R$ {is_['custo_mercadorias']:,.2f}"],
-            ["(=) Lucro Bruto", f"R$ {is_['lucro_bruto']:,.2f}"],
-            ["(-) Despesas com Vendas", f"R$ {is_['despesas_vendas']:,.2f}"],
-            ["(-) Despesas Administrativas", f"R$ {is_['despesas_administrativas']:,.2f}"],
-            ["(-) Depreciação", f"R$ {is_['depreciacao']:,.2f}"],
-            ["(=) Resultado Operacional", f"R$ {is_['resultado_operacional']:,.2f}"],
-            ["(+) Receitas Financeiras", f"R$ {is_['receitas_financeiras']:,.2f}"],
-            ["(-) Despesas Financeiras", f"R$ {is_['despesas_financeiras']:,.2f}"],
-            ["(=) Resultado Antes do IRPJ e CSLL", f"R$ {is_['resultado_antes_ir']:,.2f}"],
-            ["(-) IRPJ/CSLL", f"R$ {is_['ir_csll']:,.2f}"],
-            ["(=) Lucro Líquido do Período", f"R$ {is_['lucro_liquido']:,.2f}"]
-        ]
-        
-        df_dre = pd.DataFrame(dre_data, columns=["Item", "Valor"])
+        df_dre = tables["dre"]
         st.dataframe(df_dre, use_container_width=True, hide_index=True)
         
         # Gráfico Waterfall da DRE
         if PLOTLY_AVAILABLE:
-            fig = go.Figure(go.Waterfall(
-                name="DRE",
-                orientation="v",
-                measure=["absolute", "relative", "relative", "relative", "relative", "relative", "relative", "relative", "relative", "relative", "total"],
-                x=["Receita Líquida", "Custo", "Desp. Vendas", "Desp. Admin", "Depreciação", "Rec. Financ.", "Desp. Financ.", "IRPJ/CSLL", "", "", "Lucro Líquido"],
-                textposition="outside",
-                text=[f"R$ {is_['receita_liquida']:,.0f}", f"-R$ {is_['custo_mercadorias']:,.0f}", 
-                      f"-R$ {is_['despesas_vendas']:,.0f}", f"-R$ {is_['despesas_administrativas']:,.0f}",
-                      f"-R$ {is_['depreciacao']:,.0f}", f"R$ {is_['receitas_financeiras']:,.0f}",
-                      f"-R$ {is_['despesas_financeiras']:,.0f}", f"-R$ {is_['ir_csll']:,.0f}",
-                      "", "", f"R$ {is_['lucro_liquido']:,.0f}"],
-                y=[is_['receita_liquida'], -is_['custo_mercadorias'], -is_['despesas_vendas'], 
-                   -is_['despesas_administrativas'], -is_['depreciacao'], is_['receitas_financeiras'],
-                   -is_['despesas_financeiras'], -is_['ir_csll'], 0, 0, is_['lucro_liquido']],
-                connector={"line": {"color": "rgb(63, 63, 63)"}},
-            ))
-            
-            fig.update_layout(
-                title="Formação do Resultado - Alpha Serviços LTDA",
-                showlegend=False,
-                height=500
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            show_figure("dre_waterfall")
+    
+    with tab3:
+        show_period_analysis()
 
+@instrumented
+def show_period_analysis():
+    """Análise vertical, horizontal e anual dos períodos no histórico da empresa"""
+    import pandas as pd
+    from analysis import INDICATOR_LABELS, STATEMENT_LINE_LABELS
+    
+    st.markdown("### Análise Temporal")
+    
+    history = get_period_history()
+    if history is None:
+        st.info("ℹ️ Histórico de períodos indisponível: instale o pyarrow (`pip install pyarrow`).")
+        return
+    analysis = _cached_period_analysis(*history)
+    periods = analysis["periods"]
+    st.caption(f"📅 Períodos no histórico: {', '.join(periods)}")
+    
+    def by_line(frame: pd.DataFrame) -> pd.DataFrame:
+        """Linhas das demonstrações nas linhas da tabela e períodos nas colunas"""
+        table = frame[list(STATEMENT_LINE_LABELS)].T.rename(index=STATEMENT_LINE_LABELS)
+        table.columns = [str(period) for period in table.columns]
+        return table
+    
+    def percent_columns(table: pd.DataFrame, fmt: str = "%.1f%%") -> Dict[str, Any]:
+        return {column: st.column_config.NumberColumn(format=fmt) for column in table.columns}
+    
+    st.markdown("#### 📐 Análise Vertical")
+    st.caption("Linhas do Balanço em % do Ativo Total e linhas da DRE em % da Receita Líquida.")
+    vertical = by_line(analysis["vertical"])
+    st.dataframe(vertical, use_container_width=True, column_config=percent_columns(vertical))
+    
+    if len(periods) < 2:
+        st.info(
+            "ℹ️ Só há um período no histórico. A análise horizontal, a variação anual e os indicadores "
+            "acumulados aparecem quando houver outros períodos (por exemplo, com `STATEMENTS_SOURCE` "
+            "apontando para um arquivo com vários períodos da empresa)."
+        )
+        return
+    
+    st.markdown(f"#### 📏 Análise Horizontal (base: {periods[0]} = 100)")
+    horizontal = by_line(analysis["horizontal"])
+    st.dataframe(horizontal, use_container_width=True, column_config=percent_columns(horizontal, "%.1f"))
+    
+    yoy = by_line(analysis["yoy"]).dropna(axis=1, how="all")
+    if not yoy.empty:
+        st.markdown("#### 📆 Variação em Relação ao Mesmo Período do Ano Anterior")
+        st.dataframe(yoy, use_container_width=True, column_config=percent_columns(yoy, "%+.1f%%"))
+    
+    st.markdown("#### 📈 Indicadores por Período")
+    indicators = analysis["indicators"].rename(columns=INDICATOR_LABELS)
+    indicators.index = indicators.index.astype(str)
+    st.dataframe(indicators, use_container_width=True, column_config=percent_columns(indicators, "%.2f"))
+    if PLOTLY_AVAILABLE:
+        send_figure("period_margins", _cached_period_margins_figure(*history))
+    
+    st.markdown("#### 🔁 Indicadores Acumulados")
+    window = st.number_input(
+        "Períodos por janela (DRE somada; Balanço do fim da janela)",
+        min_value=2, max_value=len(periods), value=min(4, len(periods)), key="rolling_window"
+    )
+    rolling = _cached_rolling_indicators(*history, int(window)).dropna(how="all").rename(columns=INDICATOR_LABELS)
+    rolling.index = rolling.index.astype(str)
+    st.dataframe(rolling, use_container_width=True, column_config=percent_columns(rolling, "%.2f"))
+
+@instrumented
 def show_liquidity_indicators():
     """Exibe indicadores de liquidez"""
     st.markdown("## 💧 Indicadores de Liquidez")
@@ -631,31 +852,58 @@ def show_liquidity_indicators():
     
     # Simulador de Liquidez
     st.markdown("### 🧪 Simulador de Cenários de Liquidez")
+    show_liquidity_simulator(indicators)
+    
+    # Mapa com todos os cenários; a exploração por hover acontece no navegador, sem rerun
+    if PLOTLY_AVAILABLE:
+        show_figure("liquidity_grid")
+
+@instrumented_fragment
+def show_liquidity_simulator(indicators: Dict[str, Any]):
+    """Sliders e resultados do simulador; mover um slider reexecuta só este trecho"""
+    from indicators import SIMULATOR_AC_RANGE, SIMULATOR_PC_RANGE, STATUS_GOOD, STATUS_WARNING, lookup_scenario
+    
+    # Todos os cenários são calculados de uma vez; mover o slider é só uma consulta à grade
+    grid = get_liquidity_grid()
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown("#### Ajuste os Valores:")
-        ativo_circ = st.slider("Ativo Circulante (R$ mil)", 50, 150, 80, key="ac_sim")
-        passivo_circ = st.slider("Passivo Circulante (R$ mil)", 30, 100, 60, key="pc_sim")
+        ativo_circ = st.slider("Ativo Circulante (R$ mil)", *SIMULATOR_AC_RANGE, 80, key="ac_sim")
+        passivo_circ = st.slider("Passivo Circulante (R$ mil)", *SIMULATOR_PC_RANGE, 60, key="pc_sim")
+    
+    # Registra cada combinação nova escolhida pelo aluno (os valores iniciais não contam)
+    if (ativo_circ, passivo_circ) != st.session_state.setdefault('last_simulation', (80, 60)):
+        st.session_state.last_simulation = (ativo_circ, passivo_circ)
+        store = get_submission_store()
+        if store is not None:
+            store.record_simulation(*student_identity(), ativo_circ, passivo_circ)
     
     with col2:
-        # Recalcular indicadores
-        lc_sim = (ativo_circ * 1000) / (passivo_circ * 1000)
-        cg_sim = (ativo_circ * 1000) - (passivo_circ * 1000)
+        scenario = lookup_scenario(grid, ativo_circ * 1000, passivo_circ * 1000)
+        lc_sim = scenario["liquidez_corrente"]
+        cg_sim = scenario["capital_giro"]
         
         st.markdown("#### Resultados da Simulação:")
         st.metric("Liquidez Corrente", f"{lc_sim:.2f}", f"{lc_sim - indicators['liquidez_corrente']['value']:.2f}")
         st.metric("Capital de Giro", f"R$ {cg_sim:,.0f}", f"R$ {cg_sim - indicators['capital_giro']['value']:,.0f}")
         
         # Status
-        if lc_sim >= 1.5:
+        if scenario["status"] == STATUS_GOOD:
             st.success("✅ Situação de liquidez saudável")
-        elif lc_sim >= 1.0:
+        elif scenario["status"] == STATUS_WARNING:
             st.warning("⚠️ Situação de liquidez de atenção")
         else:
             st.error("❌ Situação de liquidez preocupante")
 
+@st.cache_data(show_spinner=False)
+def get_liquidity_grid():
+    """Grade de cenários do simulador, calculada uma vez e compartilhada entre sessões"""
+    from indicators import simulator_liquidity_grid
+    return simulator_liquidity_grid()
+
+@instrumented
 def show_profitability_indicators():
     """Exibe indicadores de rentabilidade"""
     st.markdown("## 📈 Indicadores de Rentabilidade")
@@ -714,33 +962,11 @@ def show_profitability_indicators():
     
     # Gráfico de Margens
     if PLOTLY_AVAILABLE:
-        fig = go.Figure()
-        
-        margens = ["Margem Bruta", "Margem Operacional", "Margem Líquida"]
-        valores = [mb["value"], mo["value"], ml["value"]]
-        cores = ['#10B981', '#3B82F6', '#8B5CF6']
-        
-        fig.add_trace(go.Bar(
-            x=margens,
-            y=valores,
-            marker_color=cores,
-            text=[f"{v:.1f}%" for v in valores],
-            textposition='auto',
-        ))
-        
-        fig.update_layout(
-            title="Evolução das Margens de Rentabilidade",
-            yaxis_title="Percentual (%)",
-            height=400
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        show_figure("margins")
     
     # Análise de Rentabilidade
     st.markdown("### 📊 Análise de Rentabilidade")
     
-    is_ = ALPHA_DATA["income_statement"]
-    
     # Decomposição da Receita
     col1, col2 = st.columns(2)
     
@@ -748,46 +974,87 @@ def show_profitability_indicators():
         st.markdown("#### Decomposição da Receita Líquida")
         
         if PLOTLY_AVAILABLE:
-            fig = go.Figure(data=[go.Pie(
-                labels=['Lucro Líquido', 'Custos e Despesas'],
-                values=[is_['lucro_liquido'], is_['receita_liquida'] - is_['lucro_liquido']],
-                hole=.3,
-                marker_colors=['#10B981', '#EF4444']
-            )])
-            
-            fig.update_layout(
-                title="Composição da Receita",
-                height=300
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            show_figure("revenue_composition")
     
     with col2:
         st.markdown("#### Estrutura de Custos e Despesas")
         
-        custos_despesas = {
-            'Custo das Mercadorias': is_['custo_mercadorias'],
-            'Despesas de Vendas': is_['despesas_vendas'],
-            'Despesas Administrativas': is_['despesas_administrativas'],
-            'Depreciação': is_['depreciacao'],
-            'Despesas Financeiras Líquidas': is_['despesas_financeiras'] - is_['receitas_financeiras'],
-            'IRPJ/CSLL': is_['ir_csll']
-        }
-        
         if PLOTLY_AVAILABLE:
-            fig = go.Figure(data=[go.Pie(
-                labels=list(custos_despesas.keys()),
-                values=list(custos_despesas.values()),
-                hole=.3
-            )])
-            
-            fig.update_layout(
-                title="Estrutura de Custos",
-                height=300
+            show_figure("cost_structure")
+    
+    show_dre_what_if()
+
+# Linhas da DRE ajustáveis no simulador de cenários
+WHAT_IF_LINES = {
+    "receita_bruta": "Receita Bruta",
+    "custo_mercadorias": "Custo das Mercadorias/Serviços",
+    "despesas_vendas": "Despesas com Vendas",
+    "despesas_administrativas": "Despesas Administrativas",
+}
+# Amplitude mínima de cada lado do slider (R$), para linhas zeradas ou pequenas
+WHAT_IF_MIN_SPAN = 10_000.0
+
+def what_if_range(value: float) -> Tuple[float, float]:
+    """Limites do slider em R$: de 0 ao dobro do valor, ou ao redor dele quando é negativo ou pequeno"""
+    span = max(abs(value), WHAT_IF_MIN_SPAN)
+    low = 0.0 if value >= 0 else value - span
+    return low, value + span
+
+def get_formula_graph() -> "FormulaGraph":
+    """Grafo de fórmulas da sessão, recriado quando as demonstrações mudam"""
+    from formula_graph import FormulaGraph
+    
+    version = data_version()
+    if st.session_state.get("formula_graph_version") != version:
+        st.session_state.formula_graph = FormulaGraph.from_statements(ALPHA_DATA)
+        st.session_state.formula_graph_version = version
+    return st.session_state.formula_graph
+
+@instrumented_fragment
+@instrumented
+def show_dre_what_if():
+    """Simulador de cenários da DRE: recalcula apenas as linhas afetadas pelo ajuste"""
+    st.markdown("### 🔬 Simulador de Cenários da DRE")
+    
+    graph = get_formula_graph()
+    is_ = ALPHA_DATA["income_statement"]
+    
+    cols = st.columns(len(WHAT_IF_LINES))
+    values = {}
+    for col, (line, label) in zip(cols, WHAT_IF_LINES.items()):
+        with col:
+            base_value = float(is_[line])
+            low, high = what_if_range(base_value)
+            chosen = st.slider(
+                f"{label} (R$ mil)",
+                low / 1000, high / 1000, base_value / 1000, step=1.0, format="%.1f",
+                key=f"what_if_{line}"
             )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            # Na posição inicial, o valor exato da DRE (sem arredondar para R$ mil)
+            values[line] = base_value if chosen == base_value / 1000 else chosen * 1000
+    
+    evaluations = graph.evaluations
+    changed = graph.update(**values)
+    
+    base = calculate_indicators()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Lucro Líquido", f"R$ {graph['lucro_liquido']:,.0f}",
+                  f"R$ {graph['lucro_liquido'] - is_['lucro_liquido']:,.0f}")
+    with col2:
+        st.metric("Margem Operacional", f"{graph['margem_operacional']:.2f}%",
+                  f"{graph['margem_operacional'] - base['margem_operacional']['value']:.2f} p.p.")
+    with col3:
+        st.metric("Margem Líquida", f"{graph['margem_liquida']:.2f}%",
+                  f"{graph['margem_liquida'] - base['margem_liquida']['value']:.2f} p.p.")
+    
+    if changed:
+        st.caption(
+            f"Valores alterados neste ajuste ({graph.evaluations - evaluations} fórmulas recalculadas): "
+            + ", ".join(sorted(changed))
+        )
 
+@instrumented
 def show_capital_structure():
     """Exibe análise da estrutura de capital"""
     st.markdown("## ⚖️ Estrutura de Capital")
@@ -816,19 +1083,7 @@ def show_capital_structure():
     with col2:
         # Gráfico da Estrutura de Capital
         if PLOTLY_AVAILABLE:
-            fig = go.Figure(data=[go.Pie(
-                labels=['Patrimônio Líquido', 'Passivo Circulante', 'Passivo não Circulante'],
-                values=[bs['patrimonio_liquido'], bs['passivo_circulante'], bs['passivo_nao_circulante']],
-                marker_colors=['#10B981', '#EF4444', '#F97316'],
-                hole=.4
-            )])
-            
-            fig.update_layout(
-                title="Estrutura de Financiamento",
-                height=400
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            show_figure("financing_structure")
     
     # Análise Detalhada
     st.markdown("### 📊 Análise da Estrutura de Capital")
@@ -873,6 +1128,7 @@ def show_capital_structure():
         - Avaliar oportunidades de crescimento
         """)
 
+@instrumented
 def show_integrated_analysis():
     """Exibe análise integrada"""
     st.markdown("## 🎯 Análise Integrada")
@@ -886,63 +1142,44 @@ def show_integrated_analysis():
     
     with col1:
         lc = indicators["liquidez_corrente"]
-        status = "🟢" if lc["value"] >= 1.5 else "🟡" if lc["value"] >= 1.0 else "🔴"
+        status = get_status_emoji("liquidez_corrente", lc["value"])
         st.metric("Liquidez Corrente", f"{lc['value']:.2f}", delta=None, help=lc["interpretation"])
         st.markdown(f"Status: {status}")
     
     with col2:
         ml = indicators["margem_liquida"]
-        status = "🟢" if ml["value"] >= 20 else "🟡" if ml["value"] >= 10 else "🔴"
+        status = get_status_emoji("margem_liquida", ml["value"])
         st.metric("Margem Líquida", f"{ml['value']:.1f}%", delta=None, help=ml["interpretation"])
         st.markdown(f"Status: {status}")
     
     with col3:
         cg = indicators["capital_giro"]
-        status = "🟢" if cg["value"] > 0 else "🔴"
+        status = get_status_emoji("capital_giro", cg["value"])
         st.metric("Capital de Giro", f"R$ {cg['value']:,.0f}", delta=None, help=cg["interpretation"])
         st.markdown(f"Status: {status}")
     
     with col4:
         dp = indicators["divida_patrimonio"]
-        status = "🟢" if dp["value"] <= 0.5 else "🟡" if dp["value"] <= 1.0 else "🔴"
+        status = get_status_emoji("divida_patrimonio", dp["value"])
         st.metric("Dívida/PL", f"{dp['value']:.2f}", delta=None, help=dp["interpretation"])
         st.markdown(f"Status: {status}")
     
+    # Comparação com empresas do mesmo setor (opcional)
+    sector = show_sector_comparison(indicators) if SECTOR_BENCHMARK_SOURCE else None
+    
     # Radar Chart dos Indicadores
     if PLOTLY_AVAILABLE:
         st.markdown("### 🎯 Radar dos Indicadores")
-        
-        # Normalizar indicadores para o radar (0-100)
-        radar_data = {
-            'Liquidez Corrente': min(lc["value"] * 50, 100),  # Normalizar para 0-100
-            'Liquidez Geral': min(indicators["liquidez_geral"]["value"] * 100, 100),
-            'Margem Bruta': min(indicators["margem_bruta"]["value"] * 2, 100),
-            'Margem Líquida': min(ml["value"] * 5, 100),
-            'Estrutura Capital': max(100 - (dp["value"] * 50), 0)  # Inverter para que menor dívida = melhor
-        }
-        
-        fig = go.Figure()
-        
-        fig.add_trace(go.Scatterpolar(
-            r=list(radar_data.values()),
-            theta=list(radar_data.keys()),
-            fill='toself',
-            name='Alpha Serviços',
-            line_color='#3B82F6'
-        ))
-        
-        fig.update_layout(
-            polar=dict(
-                radialaxis=dict(
-                    visible=True,
-                    range=[0, 100]
-                )),
-            showlegend=True,
-            title="Radar de Performance Financeira",
-            height=500
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        if sector is None:
+            show_figure("radar")
+        else:
+            send_figure("radar", _cached_sector_radar(data_version(), sector, os.path.getmtime(SECTOR_BENCHMARK_SOURCE), ALPHA_DATA))
+    
+    # Simulação de Monte Carlo
+    st.markdown("### 🎲 Simulação de Monte Carlo")
+    st.markdown(f"Cada linha da DRE e do Balanço varia aleatoriamente em torno do valor real; {MONTE_CARLO_DRAWS:,} cenários são propagados pela DRE.")
+    
+    show_monte_carlo()
     
     # Matriz SWOT Financeira
     st.markdown("### 🔍 Matriz SWOT Financeira")
@@ -1003,6 +1240,103 @@ def show_integrated_analysis():
     3. **Implementar indicadores de performance (KPIs) regulares**
     """)
 
+@instrumented
+def show_sector_comparison(indicators: Dict[str, Any]) -> Optional[str]:
+    """Percentil e quartis de cada indicador no setor escolhido; retorna a opção escolhida (``None`` se a base não carregar)"""
+    import pandas as pd
+    from analysis import INDICATOR_LABELS, format_indicator
+    
+    st.markdown("### 🏭 Comparação com o Setor")
+    try:
+        benchmark = get_sector_benchmark()
+    except (OSError, ValueError, KeyError) as e:
+        st.warning(f"⚠️ Não foi possível carregar a base setorial: {e}")
+        return None
+    
+    sectors = benchmark.sectors()
+    own_sector = benchmark.find_sector(ALPHA_DATA["company_info"].get("segment", ""))
+    choice = st.selectbox(
+        "Setor de comparação", [ALL_SECTORS, *sectors],
+        index=sectors.index(own_sector) + 1 if own_sector else 0, key="benchmark_sector"
+    )
+    sector = None if choice == ALL_SECTORS else choice
+    
+    ranks = benchmark.percentile_ranks(indicators, sector)
+    rows = []
+    for name, rank in ranks.items():
+        q1, median, q3 = benchmark.quartiles(name, sector)
+        rows.append({
+            "Indicador": INDICATOR_LABELS[name],
+            "Empresa": format_indicator(name, indicators[name]["value"]),
+            "1º quartil": format_indicator(name, q1),
+            "Mediana": format_indicator(name, median),
+            "3º quartil": format_indicator(name, q3),
+            "Percentil": rank,
+        })
+    st.dataframe(
+        pd.DataFrame(rows), hide_index=True, use_container_width=True,
+        column_config={"Percentil": st.column_config.ProgressColumn(format="%.0f", min_value=0, max_value=100)}
+    )
+    st.caption(
+        f"Percentil: % das {benchmark.company_count(sector):,} empresas ({choice}) com valor menor que o da empresa. "
+        "Em Dívida/PL, quanto menor o valor, melhor."
+    )
+    return choice
+
+@st.cache_resource(show_spinner=False)
+def _cached_sector_radar(version: str, sector: str, source_mtime: float, _data: Dict[str, Any]):
+    """Radar com os quartis do setor, por versão dos dados, setor e versão da base setorial"""
+    from figures import build_radar_figure
+    
+    benchmark = get_sector_benchmark()
+    quartiles = benchmark.sector_quartiles(None if sector == ALL_SECTORS else sector)
+    return prepare_figure(build_radar_figure(_data, quartiles, sector))
+
+@instrumented_fragment
+def show_monte_carlo():
+    """Controle de variabilidade e resultados da simulação, reexecutados sem o restante da seção"""
+    cv = st.select_slider(
+        "Variabilidade das linhas (desvio padrão em % do valor)",
+        options=[5, 10, 15, 20, 25],
+        value=10,
+        key="mc_cv"
+    )
+    mc = _cached_monte_carlo(data_version(), cv / 100, ALPHA_DATA)
+    mc_summary = mc["summary"]
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        ml_mc = mc_summary["margem_liquida"]
+        st.metric("Margem Líquida (mediana)", f"{ml_mc['p50']:.1f}%", help=f"90% dos cenários entre {ml_mc['p5']:.1f}% e {ml_mc['p95']:.1f}%")
+    
+    with col2:
+        ll_mc = mc_summary["lucro_liquido"]
+        st.metric("Probabilidade de Prejuízo", f"{ll_mc['prob_negativo'] * 100:.1f}%", help=f"Lucro líquido mediano: R$ {ll_mc['p50']:,.0f}")
+    
+    with col3:
+        lc_mc = mc_summary["liquidez_corrente"]
+        st.metric("Liquidez Corrente (mediana)", f"{lc_mc['p50']:.2f}", help=f"90% dos cenários entre {lc_mc['p5']:.2f} e {lc_mc['p95']:.2f}")
+    
+    if PLOTLY_AVAILABLE:
+        send_figure("monte_carlo", mc["figure"])
+
+@st.cache_resource(show_spinner=False)
+def _cached_monte_carlo(version: str, cv: float, _data: Dict[str, Any]):
+    """Simulação de Monte Carlo por versão dos dados e variabilidade, compartilhada entre sessões
+    
+    Guarda só o resumo e os histogramas; os sorteios completos não ficam em memória.
+    """
+    from monte_carlo import default_distributions, histograms, simulate, summarize
+    
+    results = simulate(_data, default_distributions(_data, cv), n_draws=MONTE_CARLO_DRAWS, seed=MONTE_CARLO_SEED)
+    output = {"summary": summarize(results), "histograms": histograms(results)}
+    if PLOTLY_AVAILABLE:
+        from figures import build_monte_carlo_figure
+        output["figure"] = prepare_figure(build_monte_carlo_figure(output["histograms"]))
+    return output
+
+@instrumented
 def show_ai_consultant():
     """Exibe consultoria com IA"""
     st.markdown("## 🤖 Consultoria Financeira com IA")
@@ -1028,6 +1362,14 @@ def show_ai_consultant():
     
     st.success("✅ Consultoria IA ativa - Especialista em Alpha Serviços LTDA")
     
+    show_ai_chat()
+
+@instrumented_fragment
+def show_ai_chat():
+    """Perguntas, envio e histórico da consultoria; cliques aqui não reexecutam a página"""
+    cache_stats = get_response_cache().stats()
+    st.caption(f"⚡ Respostas em cache: {cache_stats['entries']} · acertos: {cache_stats['hits']} · novas consultas: {cache_stats['misses']}")
+    
     # Interface de chat
     st.markdown("### 💬 Consulte o Especialista")
     
@@ -1065,48 +1407,101 @@ def show_ai_consultant():
     col1, col2 = st.columns([1, 4])
     
     with col1:
-        if st.button("🚀 Consultar IA", type="primary"):
-            if user_question:
-                with st.spinner("🧠 Analisando dados da Alpha Serviços..."):
-                    context = "Empresa de pequeno porte no setor de manutenção de móveis e eletrodomésticos com crescimento de clientes mas problemas de controle de custos"
-                    response = get_gemini_response(user_question, context)
-                    
-                    st.session_state.ai_chat_history.append({
-                        "question": user_question,
-                        "answer": response,
-                        "timestamp": time.time()
-                    })
-                st.rerun()
+        ask_clicked = st.button("🚀 Consultar IA", type="primary", disabled=bool(st.session_state.get('ai_job_id')))
     
     with col2:
-        if st.button("🗑️ Limpar Histórico"):
-            st.session_state.ai_chat_history = []
-            st.rerun()
+        st.button("🗑️ Limpar Histórico", on_click=clear_chat_history)
+    
+    if ask_clicked and user_question and not st.session_state.get('ai_job_id'):
+        job_id = submit_consultation(user_question, AI_CONTEXT)
+        if job_id is None:
+            st.warning("⏳ Muitas consultas em andamento no momento. Tente novamente em instantes.")
+        else:
+            st.session_state.ai_job_id = job_id
+            st.session_state.ai_job_question = user_question
+            store = get_submission_store()
+            if store is not None:
+                store.record_question(*student_identity(), user_question)
+    
+    # Consulta em andamento, acompanhada sem bloquear a sessão
+    if st.session_state.get('ai_job_id'):
+        show_ai_job_progress()
     
     # Histórico de conversas
-    if st.session_state.ai_chat_history:
+    history = get_chat_history()
+    if history:
         st.markdown("### 📚 Histórico de Consultorias")
         
-        for i, chat in enumerate(reversed(st.session_state.ai_chat_history[-3:])):  # Últimas 3 conversas
-            with st.expander(f"💬 Consulta {len(st.session_state.ai_chat_history) - i}: {chat['question'][:50]}..."):
-                st.markdown(f"**👤 Pergunta:** {chat['question']}")
-                st.markdown(f"""
-                <div class="ai-response">
-                    <strong>🤖 Resposta do Especialista:</strong><br>
-                    {chat['answer']}
-                </div>
-                """, unsafe_allow_html=True)
+        recent = history.recent(CHAT_HISTORY_SHOWN)  # Últimas 3 conversas, sempre em memória
+        for number, chat in recent:
+            show_chat_record(number, chat)
+        
+        # Consultas anteriores, lidas do disco página por página
+        older_pages = history.page_count(CHAT_HISTORY_PAGE_SIZE, before=recent[-1][0])
+        if older_pages and st.toggle(f"🗂️ Ver consultas anteriores ({len(history) - len(recent)})", key="chat_history_older"):
+            page = st.number_input("Página", min_value=1, max_value=older_pages, value=1, key="chat_history_page")
+            for number, chat in history.page(page - 1, CHAT_HISTORY_PAGE_SIZE, before=recent[-1][0]):
+                show_chat_record(number, chat)
+        
+        stats = history.stats()
+        st.caption(f"🧠 Histórico desta sessão: {stats['in_memory']} consultas em memória ({stats['memory_bytes'] / 1024:,.1f} KB), {stats['on_disk']} em disco")
+
+def clear_chat_history():
+    """Callback do botão de limpar: roda antes do rerun do fragmento, sem precisar de outro"""
+    get_chat_history().clear()
+    st.session_state.pop("chat_history_page", None)
+
+def show_chat_record(number: int, chat):
+    """Uma consulta do histórico em um expander"""
+    with st.expander(f"💬 Consulta {number}: {chat.question[:50]}..."):
+        st.markdown(f"**👤 Pergunta:** {chat.question}")
+        st.markdown(f"""
+        <div class="ai-response">
+            <strong>🤖 Resposta do Especialista:</strong><br>
+            {chat.answer}
+        </div>
+        """, unsafe_allow_html=True)
+
+@instrumented_fragment(run_every=AI_POLL_INTERVAL)
+def show_ai_job_progress():
+    """Acompanha a consulta em segundo plano e exibe a resposta parcial"""
+    job_id = st.session_state.get('ai_job_id')
+    job = get_consultation_pool().get(job_id) if job_id else None
+    
+    if job is None:
+        # Job expirado ou processo reiniciado: libera a sessão para nova consulta
+        st.session_state.ai_job_id = None
+        return
+    
+    st.markdown(f"**👤 Pergunta:** {st.session_state.ai_job_question}")
+    with st.chat_message("assistant", avatar="🤖"):
+        if job.chunks:
+            st.markdown(job.text)
+        else:
+            st.markdown("🧠 Analisando dados da Alpha Serviços...")
+    
+    if job.finished:
+        answer = job.text if job.status == DONE else f"Erro ao consultar IA: {job.error}"
+        get_chat_history().append(st.session_state.ai_job_question, answer)
+        st.session_state.ai_job_id = None
+        get_consultation_pool().discard(job_id)
+        # O histórico e o botão de envio estão fora deste fragmento
+        st.rerun()
 
 def main():
     """Função principal do aplicativo"""
     try:
         # Inicializar estado da sessão
         init_session_state()
+        if _RERUN is not None:
+            _RERUN.section = st.session_state.current_section
         
         # Cabeçalho com logo da Unifor
-        st.markdown("""
+        logo_url = get_static_assets()['logo_url']
+        logo = f'<img src="{logo_url}" width="200" alt="Unifor">' if logo_url else '<span class="unifor-logo-text">UNIFOR</span>'
+        st.markdown(f"""
         <div class="unifor-logo">
-            <img src="https://www.unifor.br/documents/392178/3101527/logo.png" width="200" alt="Unifor">
+            {logo}
         </div>
         """, unsafe_allow_html=True)
         
@@ -1114,9 +1509,9 @@ def main():
         st.markdown('<p class="sub-header">Análise Prática da Alpha Serviços LTDA</p>', unsafe_allow_html=True)
         
         # Barra de progresso baseada na seção atual
-        sections = ['home', 'statements', 'liquidity', 'profitability', 'capital_structure', 'integrated_analysis', 'ai_consultant']
-        current_index = sections.index(st.session_state.current_section) if st.session_state.current_section in sections else 0
-        progress = (current_index + 1) / len(sections)
+        current_index = SECTIONS.index(st.session_state.current_section) if st.session_state.current_section in SECTIONS else 0
+        progress = (current_index + 1) / len(SECTIONS)
+        record_visit(st.session_state.current_section)
         
         st.markdown(f'<div class="progress-indicator" style="width: {progress * 100}%;"></div>', unsafe_allow_html=True)
         
@@ -1126,43 +1521,42 @@ def main():
             show_navigation()
             
         elif st.session_state.current_section == 'statements':
-            if st.button("← Voltar ao Menu", key="back_statements"):
-                st.session_state.current_section = 'home'
-                st.rerun()
+            st.button("← Voltar ao Menu", key="back_statements", on_click=go_to, args=('home',))
             show_statements()
             
         elif st.session_state.current_section == 'liquidity':
-            if st.button("← Voltar ao Menu", key="back_liquidity"):
-                st.session_state.current_section = 'home'
-                st.rerun()
+            st.button("← Voltar ao Menu", key="back_liquidity", on_click=go_to, args=('home',))
             show_liquidity_indicators()
             
         elif st.session_state.current_section == 'profitability':
-            if st.button("← Voltar ao Menu", key="back_profitability"):
-                st.session_state.current_section = 'home'
-                st.rerun()
+            st.button("← Voltar ao Menu", key="back_profitability", on_click=go_to, args=('home',))
             show_profitability_indicators()
             
         elif st.session_state.current_section == 'capital_structure':
-            if st.button("← Voltar ao Menu", key="back_capital"):
-                st.session_state.current_section = 'home'
-                st.rerun()
+            st.button("← Voltar ao Menu", key="back_capital", on_click=go_to, args=('home',))
             show_capital_structure()
             
         elif st.session_state.current_section == 'integrated_analysis':
-            if st.button("← Voltar ao Menu", key="back_integrated"):
-                st.session_state.current_section = 'home'
-                st.rerun()
+            st.button("← Voltar ao Menu", key="back_integrated", on_click=go_to, args=('home',))
             show_integrated_analysis()
             
         elif st.session_state.current_section == 'ai_consultant':
-            if st.button("← Voltar ao Menu", key="back_ai"):
-                st.session_state.current_section = 'home'
-                st.rerun()
+            st.button("← Voltar ao Menu", key="back_ai", on_click=go_to, args=('home',))
             show_ai_consultant()
+            
+        elif st.session_state.current_section == 'professor' and is_professor():
+            st.button("← Voltar ao Menu", key="back_professor", on_click=go_to, args=('home',))
+            show_professor_dashboard()
+        
+        show_payload_warning()
         
         # Sidebar com informações
-        with st.sidebar:
+        with st.sidebar, timed("sidebar"):
+            st.markdown("### 🎓 Identificação")
+            st.text_input("Turma", key="student_class", placeholder="Ex: ADM-2025.1-N1")
+            st.text_input("Matrícula", key="student_id", placeholder="Opcional")
+            
+            st.markdown("---")
             st.markdown("### 📊 Informações da Empresa")
             st.markdown(f"""
             **Nome:** {ALPHA_DATA['company_info']['name']}
@@ -1183,33 +1577,15 @@ def main():
             st.markdown("---")
             st.markdown("### 🧭 Navegação Rápida")
             
-            if st.button("🏠 Início", use_container_width=True):
-                st.session_state.current_section = 'home'
-                st.rerun()
-            
-            if st.button("📊 Demonstrações", use_container_width=True):
-                st.session_state.current_section = 'statements'
-                st.rerun()
-            
-            if st.button("💧 Liquidez", use_container_width=True):
-                st.session_state.current_section = 'liquidity'
-                st.rerun()
-            
-            if st.button("📈 Rentabilidade", use_container_width=True):
-                st.session_state.current_section = 'profitability'
-                st.rerun()
-            
-            if st.button("⚖️ Estrutura Capital", use_container_width=True):
-                st.session_state.current_section = 'capital_structure'
-                st.rerun()
-            
-            if st.button("🎯 Análise Integrada", use_container_width=True):
-                st.session_state.current_section = 'integrated_analysis'
-                st.rerun()
-            
-            if st.button("🤖 Consultoria IA", use_container_width=True):
-                st.session_state.current_section = 'ai_consultant'
-                st.rerun()
+            st.button("🏠 Início", use_container_width=True, on_click=go_to, args=('home',))
+            st.button("📊 Demonstrações", use_container_width=True, on_click=go_to, args=('statements',))
+            st.button("💧 Liquidez", use_container_width=True, on_click=go_to, args=('liquidity',))
+            st.button("📈 Rentabilidade", use_container_width=True, on_click=go_to, args=('profitability',))
+            st.button("⚖️ Estrutura Capital", use_container_width=True, on_click=go_to, args=('capital_structure',))
+            st.button("🎯 Análise Integrada", use_container_width=True, on_click=go_to, args=('integrated_analysis',))
+            st.button("🤖 Consultoria IA", use_container_width=True, on_click=go_to, args=('ai_consultant',))
+            if is_professor():
+                st.button("🎓 Painel do Professor", use_container_width=True, on_click=go_to, args=('professor',))
             
             st.markdown("---")
             st.markdown("### ℹ️ Sobre")
@@ -1218,11 +1594,147 @@ def main():
             
             Desenvolvido para estudantes de Administração e Ciências Contábeis da Unifor.
             """)
+            
+            if TELEMETRY_ENABLED and is_telemetry_admin():
+                show_telemetry_panel()
                 
     except Exception as e:
         st.error(f"Erro na aplicação: {str(e)}")
         st.markdown("**Detalhes do erro para debug:**")
         st.code(str(e))
+    finally:
+        if _RERUN is not None:
+            get_telemetry().finish_rerun(_RERUN)
+
+def is_telemetry_admin() -> bool:
+    """Sessão administrativa: aberta com ?admin=<TELEMETRY_ADMIN_TOKEN> na URL"""
+    if not TELEMETRY_ADMIN_TOKEN:
+        return False
+    token = st.query_params.get("admin")
+    if token and hmac.compare_digest(token, TELEMETRY_ADMIN_TOKEN):
+        st.session_state.telemetry_admin = True
+    return st.session_state.get("telemetry_admin", False)
+
+def show_telemetry_panel():
+    """Painel de desempenho (p50/p95 por seção e trecho), visível só para administradores"""
+    import pandas as pd
+    
+    telemetry = get_telemetry()
+    with st.expander("⏱️ Desempenho (admin)"):
+        rows = telemetry.percentiles()
+        if not rows:
+            st.caption("Ainda não há medições.")
+            return
+        
+        df = pd.DataFrame(rows).rename(columns={
+            "section": "Seção", "span": "Trecho", "count": "Amostras", "p50_ms": "p50 (ms)", "p95_ms": "p95 (ms)"
+        })
+        st.markdown("**Rerun completo por seção**")
+        st.dataframe(df[df["Trecho"] == "rerun"].drop(columns="Trecho"), hide_index=True, use_container_width=True)
+        
+        st.markdown(f"**Trechos da seção atual** ({st.session_state.current_section})")
+        current = df[(df["Seção"] == st.session_state.current_section) & (df["Trecho"] != "rerun")]
+        st.dataframe(current.drop(columns="Seção"), hide_index=True, use_container_width=True)
+        
+        payload = telemetry.payload_bytes()
+        raw_payload = telemetry.payload_bytes(raw=True)
+        st.caption(
+            "Reruns: " + ", ".join(f"{k} {v}" for k, v in sorted(telemetry.reruns().items()))
+            + " · Figuras enviadas (original → reduzido e compactado): "
+            + ", ".join(f"{k} {raw_payload.get(k, v) / 1024:,.0f} → {v / 1024:,.0f} KB" for k, v in sorted(payload.items()))
+        )
+        if TELEMETRY_PROMETHEUS:
+            st.caption(f"Métricas Prometheus em `{TELEMETRY_PROMETHEUS}`")
+        
+        from chat_history import memory_report
+        sessions = memory_report()
+        if sessions:
+            st.markdown(f"**Histórico da IA por sessão** (sessões ativas: {len(sessions)} · {sum(s['memory_bytes'] for s in sessions) / 1024:,.1f} KB em memória)")
+            df = pd.DataFrame(sessions).rename(columns={
+                "session_id": "Sessão", "total": "Consultas", "in_memory": "Em memória", "on_disk": "Em disco", "memory_bytes": "Bytes"
+            })
+            df["Sessão"] = df["Sessão"].str[:8]
+            st.dataframe(df, hide_index=True, use_container_width=True)
+
+def is_professor() -> bool:
+    """Sessão do professor: aberta com ?professor=<PROFESSOR_TOKEN> na URL"""
+    if not PROFESSOR_TOKEN:
+        return False
+    token = st.query_params.get("professor")
+    if token and hmac.compare_digest(token, PROFESSOR_TOKEN):
+        st.session_state.professor = True
+    return st.session_state.get("professor", False)
+
+@instrumented
+def show_professor_dashboard():
+    """Painel do professor: simulações, perguntas mais feitas e progresso das turmas"""
+    import numpy as np
+    import pandas as pd
+    from analysis import STATUS_EMOJIS
+    from indicators import STATUS_LABELS, classify_status
+    
+    st.markdown("## 🎓 Painel do Professor")
+    
+    store = get_submission_store()
+    if store is None:
+        st.warning("⚠️ Banco de atividades indisponível. Verifique o caminho em SUBMISSIONS_DB.")
+        return
+    store.flush()  # inclui os eventos que ainda estão na fila
+    
+    choice = st.selectbox("Turma", ["Todas as turmas", *store.classes()], key="professor_class")
+    class_id = None if choice == "Todas as turmas" else choice
+    
+    totals = store.totals(class_id)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Alunos", f"{totals['students']:,}".replace(",", "."))
+    col2.metric("Simulações", f"{totals['simulations']:,}".replace(",", "."))
+    col3.metric("Perguntas à IA", f"{totals['questions']:,}".replace(",", "."))
+    
+    # Distribuição dos cenários escolhidos no simulador de liquidez
+    st.markdown("### 💧 Simulações de Liquidez")
+    cells = np.array(store.simulation_grid(class_id), dtype=float).reshape(-1, 3)
+    if len(cells):
+        status = classify_status("liquidez_corrente", cells[:, 0] / cells[:, 1])
+        shares = np.bincount(status, weights=cells[:, 2], minlength=len(STATUS_LABELS)) / cells[:, 2].sum()
+        for col, code in zip(st.columns(len(STATUS_LABELS)), reversed(range(len(STATUS_LABELS)))):
+            col.metric(f"{STATUS_EMOJIS[code]} {STATUS_LABELS[code]}", f"{shares[code]:.0%}")
+        if PLOTLY_AVAILABLE:
+            from figures import build_simulation_choices_figure
+            show_figure("simulation_choices", build_simulation_choices_figure(cells))
+    else:
+        st.info("Nenhuma simulação registrada ainda.")
+    
+    st.markdown("### ❓ Perguntas Mais Feitas à IA")
+    questions = store.top_questions(class_id, limit=10)
+    if questions:
+        df = pd.DataFrame(questions, columns=["Pergunta", "Vezes", "Última vez"])
+        df["Última vez"] = pd.to_datetime(df["Última vez"], unit="s")
+        st.dataframe(df, hide_index=True, use_container_width=True)
+    else:
+        st.info("Nenhuma pergunta registrada ainda.")
+    
+    st.markdown("### 🧭 Seções Visitadas")
+    reach = store.section_reach(class_id)
+    if totals['students']:
+        st.bar_chart(pd.Series({SECTION_LABELS[s]: reach[s] / totals['students'] * 100 for s in SECTIONS}, name="% dos alunos"))
+    
+    st.markdown("### 📋 Progresso por Turma")
+    progress = store.class_progress()
+    if progress:
+        df = pd.DataFrame(progress)
+        df["progress"] *= 100
+        df["last_activity"] = pd.to_datetime(df["last_activity"], unit="s")
+        df = df.rename(columns={
+            "class_id": "Turma", "students": "Alunos", "sections_visited": "Seções (média)", "progress": "Progresso",
+            "simulations": "Simulações", "questions": "Perguntas", "last_activity": "Última atividade"
+        })
+        st.dataframe(
+            df, hide_index=True, use_container_width=True,
+            column_config={
+                "Seções (média)": st.column_config.NumberColumn(format="%.1f"),
+                "Progresso": st.column_config.ProgressColumn(format="%.0f%%", min_value=0, max_value=100),
+            }
+        )
 
 if __name__ == "__main__":
     main()
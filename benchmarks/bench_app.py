@@ -0,0 +1,284 @@
+"""Benchmarks de latência por rerun do app.
+
+O Gemini é substituído por um modelo local (ver ``conftest.py``). Grupos:
+
+- ``indicadores``: ``calculate_indicators`` e ``build_indicators`` sem cache;
+- ``status``: ``get_status_class`` e a classificação vetorizada de uma coorte;
+- ``figuras``: construção de cada figura das seções e ``prepare_figure``,
+  com os bytes enviados antes e depois da compactação (``figure_payload.py``);
+- ``renderizacao``: ``main()`` completo em cada seção via ``AppTest`` e uma
+  consulta à IA até a resposta chegar ao histórico;
+- ``painel``: consultas do painel do professor sobre um semestre de atividades;
+- ``setor``: percentis setoriais (``sector_benchmark.py``);
+- ``temporal``: análises de um histórico de várias empresas (``period_store.py``);
+- ``redução de pontos``: LTTB em séries longas (``downsampling.py``) e a
+  figura por período já reduzida e compactada.
+
+Uso:
+    pip install -r benchmarks/requirements.txt
+    pytest benchmarks --benchmark-json=benchmarks/results.json
+"""
+import itertools
+
+import numpy as np
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from conftest import APP_PATH, BENCHMARK_API_KEY
+from startup import SECTIONS
+
+from figures import FIGURE_BUILDERS, build_monte_carlo_figure
+from indicators import INDICATOR_NAMES, classify_indicators, compute_indicators
+
+RENDER_ROUNDS = 5
+COHORT_SIZE = 10_000
+MAX_AI_RERUNS = 200
+
+
+def bench_calculate_indicators(benchmark, app_module):
+    benchmark.group = "indicadores"
+    result = benchmark(app_module.calculate_indicators)
+    assert set(INDICATOR_NAMES) <= set(result)
+
+
+def bench_build_indicators_uncached(benchmark, app_module):
+    benchmark.group = "indicadores"
+    benchmark(app_module.build_indicators, app_module.ALPHA_DATA)
+
+
+@pytest.mark.parametrize("name", INDICATOR_NAMES)
+def bench_get_status_class(benchmark, app_module, name):
+    benchmark.group = "status"
+    value = app_module.calculate_indicators()[name]["value"]
+    assert benchmark(app_module.get_status_class, name, value).startswith("status-")
+
+
+def bench_classify_cohort(benchmark, app_module):
+    """Status dos sete indicadores para uma coorte de empresas, em chamadas vetorizadas"""
+    import pandas as pd
+
+    benchmark.group = "status"
+    rng = np.random.default_rng(app_module.MONTE_CARLO_SEED)
+    row = {**app_module.ALPHA_DATA["balance_sheet"], **app_module.ALPHA_DATA["income_statement"]}
+    frame = pd.DataFrame({line: value * rng.uniform(0.5, 1.5, COHORT_SIZE) for line, value in row.items()})
+    values = compute_indicators(frame)
+    status = benchmark(classify_indicators, values)
+    assert status.shape == (COHORT_SIZE, len(INDICATOR_NAMES))
+
+
+@pytest.mark.parametrize("name", sorted(FIGURE_BUILDERS))
+def bench_build_figure(benchmark, app_module, name):
+    benchmark.group = "figuras"
+    benchmark(FIGURE_BUILDERS[name], app_module.ALPHA_DATA)
+
+
+@pytest.mark.parametrize("name", sorted(FIGURE_BUILDERS))
+def bench_prepare_figure(benchmark, app_module, name):
+    """Redução, compactação e serialização de uma figura, com os bytes enviados antes e depois"""
+    benchmark.group = "figuras"
+    fig = FIGURE_BUILDERS[name](app_module.ALPHA_DATA)
+    entry = benchmark(app_module.prepare_figure, fig)
+    benchmark.extra_info["payload_bytes_before"] = entry["raw_bytes"]
+    benchmark.extra_info["payload_bytes_after"] = entry["bytes"]
+    assert entry["bytes"] <= entry["raw_bytes"]
+
+
+def bench_build_monte_carlo_figure(benchmark, app_module):
+    from monte_carlo import histograms, simulate
+
+    benchmark.group = "figuras"
+    hist = histograms(simulate(app_module.ALPHA_DATA, n_draws=100_000, seed=app_module.MONTE_CARLO_SEED))
+    benchmark(build_monte_carlo_figure, hist)
+
+
+def _new_app(section: str) -> AppTest:
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    # A chave falsa vale em qualquer diretório, mesmo sem (ou com outro) .streamlit/secrets.toml
+    at.secrets["GEMINI_API_KEY"] = BENCHMARK_API_KEY
+    at.session_state["current_section"] = section
+    return at
+
+
+def _run_without_errors(at: AppTest):
+    at.run()
+    errors = [str(e.value) for e in at.exception]
+    assert not errors, errors
+
+
+@pytest.mark.parametrize("section", SECTIONS)
+def bench_render_section(benchmark, section):
+    """Execução completa do script (``main()``) em uma seção, com caches já aquecidos"""
+    benchmark.group = "renderizacao"
+    benchmark.pedantic(
+        _run_without_errors,
+        setup=lambda: ((_new_app(section),), {}),
+        rounds=RENDER_ROUNDS,
+        warmup_rounds=1,
+    )
+
+
+def bench_ai_consultation(benchmark):
+    """Pergunta nova (sem cache de respostas) até a resposta aparecer no histórico"""
+    benchmark.group = "renderizacao"
+    questions = itertools.count()
+
+    def setup():
+        at = _new_app("ai_consultant")
+        at.run()
+        at.text_area(key="custom_question").set_value(f"Pergunta de benchmark {next(questions)}")
+        return (at,), {}
+
+    def ask(at: AppTest):
+        history = len(at.session_state["ai_chat_history"])
+        next(b for b in at.button if "Consultar" in b.label).click()
+        for _ in range(MAX_AI_RERUNS):
+            _run_without_errors(at)
+            if len(at.session_state["ai_chat_history"]) > history:
+                return
+        raise AssertionError("A consulta não terminou")
+
+    benchmark.pedantic(ask, setup=setup, rounds=RENDER_ROUNDS, warmup_rounds=1)
+
+
+SEMESTER_CLASSES = 40
+SEMESTER_STUDENTS = 5_000
+SEMESTER_SIMULATIONS = 100_000
+SEMESTER_QUESTIONS = 20_000
+
+
+@pytest.fixture(scope="module")
+def semester_store(tmp_path_factory, app_module):
+    """Banco de atividades com o volume de um semestre, gravado em lotes"""
+    from submissions import SubmissionStore
+
+    path = tmp_path_factory.mktemp("submissions") / "submissions.sqlite3"
+    store = SubmissionStore(str(path), app_module.SECTIONS, batch_size=5_000, flush_interval=0)
+    rng = np.random.default_rng(app_module.MONTE_CARLO_SEED)
+    classes = rng.integers(0, SEMESTER_CLASSES, SEMESTER_STUDENTS)
+
+    for student in rng.integers(0, SEMESTER_STUDENTS, SEMESTER_SIMULATIONS):
+        store.record_simulation(f"T{classes[student]:02d}", f"{student:07d}", rng.integers(50, 151), rng.integers(30, 101))
+    for student, question in zip(rng.integers(0, SEMESTER_STUDENTS, SEMESTER_QUESTIONS), rng.integers(0, 300, SEMESTER_QUESTIONS)):
+        store.record_question(f"T{classes[student]:02d}", f"{student:07d}", f"Pergunta frequente {question}")
+    for student in range(SEMESTER_STUDENTS):
+        for section in rng.choice(app_module.SECTIONS, rng.integers(1, len(app_module.SECTIONS) + 1), replace=False):
+            store.record_visit(f"T{classes[student]:02d}", f"{student:07d}", section)
+    store.flush()
+    yield store
+    store.close()
+
+
+@pytest.mark.parametrize("class_id", [None, "T07"], ids=["todas", "turma"])
+def bench_professor_dashboard(benchmark, semester_store, class_id):
+    """Consultas do painel do professor sobre um semestre de atividades"""
+    benchmark.group = "painel"
+
+    def queries():
+        return (
+            semester_store.classes(),
+            semester_store.totals(class_id),
+            semester_store.simulation_grid(class_id),
+            semester_store.top_questions(class_id),
+            semester_store.section_reach(class_id),
+            semester_store.class_progress(),
+        )
+
+    classes, totals, grid, *_ = benchmark(queries)
+    assert len(classes) == SEMESTER_CLASSES
+    assert sum(count for *_, count in grid) == totals["simulations"]
+
+
+PEER_COMPANIES = 50_000
+PEER_SECTORS = 8
+
+
+@pytest.fixture(scope="module")
+def sector_benchmark(app_module):
+    """Base setorial sintética: variações das demonstrações da Alpha em vários setores"""
+    import pandas as pd
+    from sector_benchmark import SectorBenchmark
+
+    rng = np.random.default_rng(app_module.MONTE_CARLO_SEED)
+    row = {**app_module.ALPHA_DATA["balance_sheet"], **app_module.ALPHA_DATA["income_statement"]}
+    frame = pd.DataFrame({line: value * rng.lognormal(0, 0.4, PEER_COMPANIES) for line, value in row.items()})
+    sectors = rng.integers(0, PEER_SECTORS, PEER_COMPANIES).astype(str)
+    return SectorBenchmark(compute_indicators(frame), sectors)
+
+
+def bench_sector_percentile_rank(benchmark, app_module, sector_benchmark):
+    """Percentil de um indicador no setor: duas buscas binárias no array ordenado"""
+    benchmark.group = "setor"
+    value = app_module.calculate_indicators()["liquidez_corrente"]["value"]
+    assert 0 <= benchmark(sector_benchmark.percentile_rank, "liquidez_corrente", value, "3") <= 100
+
+
+def bench_sector_percentile_ranks(benchmark, app_module, sector_benchmark):
+    """Percentis dos sete indicadores da saída de ``calculate_indicators``"""
+    benchmark.group = "setor"
+    ranks = benchmark(sector_benchmark.percentile_ranks, app_module.calculate_indicators(), "3")
+    assert set(ranks) == set(INDICATOR_NAMES)
+
+
+HISTORY_COMPANIES = 500
+HISTORY_QUARTERS = 40
+
+
+@pytest.fixture(scope="module")
+def period_history(app_module):
+    """Histórico sintético: 40 trimestres de 500 empresas, indexado por ``(company, period)``"""
+    import pandas as pd
+    from period_store import STATEMENT_LINES, sort_periods
+
+    rng = np.random.default_rng(app_module.MONTE_CARLO_SEED)
+    row = {**app_module.ALPHA_DATA["balance_sheet"], **app_module.ALPHA_DATA["income_statement"]}
+    index = pd.MultiIndex.from_product(
+        [[str(company) for company in range(HISTORY_COMPANIES)], [str(p) for p in pd.period_range("2016Q1", periods=HISTORY_QUARTERS, freq="Q")]],
+        names=["company", "period"],
+    )
+    frame = pd.DataFrame({line: row[line] * rng.lognormal(0, 0.3, len(index)) for line in STATEMENT_LINES}, index=index)
+    return sort_periods(frame)
+
+
+@pytest.mark.parametrize("analysis", ["vertical", "horizontal", "anual", "acumulados"])
+def bench_period_analysis(benchmark, period_history, analysis):
+    """Análises temporais de todas as empresas e períodos de uma vez"""
+    from period_store import horizontal_analysis, rolling_indicators, vertical_analysis, year_over_year
+
+    benchmark.group = "temporal"
+    function = {
+        "vertical": vertical_analysis,
+        "horizontal": horizontal_analysis,
+        "anual": year_over_year,
+        "acumulados": rolling_indicators,
+    }[analysis]
+    assert len(benchmark(function, period_history)) == HISTORY_COMPANIES * HISTORY_QUARTERS
+
+
+SERIES_POINTS = 1_000_000
+
+
+def bench_lttb(benchmark, app_module):
+    """Redução de uma série de um milhão de pontos ao orçamento de pontos da tela"""
+    from downsampling import lttb_indices
+
+    benchmark.group = "redução de pontos"
+    rng = np.random.default_rng(app_module.MONTE_CARLO_SEED)
+    x = np.arange(SERIES_POINTS, dtype=np.float64)
+    y = np.cumsum(rng.normal(size=SERIES_POINTS))
+    assert len(benchmark(lttb_indices, x, y, app_module.CHART_MAX_POINTS)) == app_module.CHART_MAX_POINTS
+
+
+def bench_prepare_period_figure(benchmark, app_module):
+    """Figura diária de quatro séries longas, com os bytes antes e depois da redução"""
+    import pandas as pd
+    from figures import build_period_series_figure
+
+    benchmark.group = "redução de pontos"
+    rng = np.random.default_rng(app_module.MONTE_CARLO_SEED)
+    days = pd.period_range("1970-01-01", periods=20_000, freq="D").astype(str)
+    frame = pd.DataFrame(np.cumsum(rng.normal(size=(len(days), 4)), axis=0), index=days, columns=list("ABCD"))
+    fig = build_period_series_figure(frame, "Séries diárias", "Valor")
+    entry = benchmark(app_module.prepare_figure, fig)
+    benchmark.extra_info["payload_bytes_before"] = entry["raw_bytes"]
+    benchmark.extra_info["payload_bytes_after"] = entry["bytes"]
+    assert benchmark.extra_info["payload_bytes_after"] < entry["raw_bytes"]
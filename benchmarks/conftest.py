@@ -0,0 +1,72 @@
+"""Configuração comum dos benchmarks: raiz do projeto no path e Gemini falso.
+
+O módulo ``google.generativeai`` é substituído antes de o app ser importado,
+para que nenhuma medição dependa da rede ou consuma cota da API.
+"""
+import importlib
+import importlib.machinery
+import os
+import sys
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Modelo local que responde imediatamente, com ou sem streaming"""
+
+    ANSWER = ("Resposta simulada ", "para o benchmark ", "do consultor financeiro.")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self._client = None  # como no SDK, trocado pelo cliente da chave em gemini_client.py
+
+    def generate_content(self, prompt, stream: bool = False):
+        self.calls += 1
+        if stream:
+            return iter([FakeResponse(chunk) for chunk in self.ANSWER])
+        return FakeResponse("".join(self.ANSWER))
+
+
+def install_fake_gemini():
+    """Registra o ``google.generativeai`` falso em ``sys.modules``"""
+    try:
+        # Carrega o namespace ``google`` real antes de acrescentar o módulo falso
+        importlib.import_module("google.ai.generativelanguage")
+        importlib.import_module("google.api_core.exceptions")
+    except ImportError:
+        pass
+
+    fake = types.ModuleType("google.generativeai")
+    fake.__spec__ = importlib.machinery.ModuleSpec("google.generativeai", None)
+    fake.GenerativeModel = FakeGenerativeModel
+    fake.configure = lambda **kwargs: None
+
+    google = sys.modules.setdefault("google", types.ModuleType("google"))
+    google.generativeai = fake
+    sys.modules["google.generativeai"] = fake
+
+
+BENCHMARK_API_KEY = "benchmark-fake-key"
+
+install_fake_gemini()
+os.environ["GEMINI_API_KEY"] = BENCHMARK_API_KEY
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    """Módulo do app importado uma vez, fora do runtime do Streamlit"""
+    import app
+    return app
@@ -0,0 +1,72 @@
+"""Bytes enviados ao navegador por rerun, por seção.
+
+Soma o tamanho serializado (protobuf) de todas as mensagens que o script
+envia em cada execução, via ``AppTest``: a primeira renderização da sessão
+e um rerun seguinte, já com a sessão aberta.
+
+Uso:
+    python benchmarks/payload.py [--output payload.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner  # noqa: E402
+
+from startup import SECTIONS  # noqa: E402
+
+_run_sizes = []
+_forward_msgs = LocalScriptRunner.forward_msgs
+
+
+def _recording_forward_msgs(self):
+    msgs = _forward_msgs(self)
+    _run_sizes.append({"bytes": sum(msg.ByteSize() for msg in msgs), "messages": len(msgs)})
+    return msgs
+
+
+LocalScriptRunner.forward_msgs = _recording_forward_msgs
+
+
+def measure_section(section: str):
+    """Bytes da primeira renderização e de um rerun da mesma sessão"""
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+    at.session_state["current_section"] = section
+    _run_sizes.clear()
+    at.run()
+    at.run()
+    errors = [str(e.value) for e in at.exception]
+    if errors:
+        raise RuntimeError(f"Erro ao renderizar '{section}': {errors}")
+    first, rerun = _run_sizes[0], _run_sizes[-1]
+    return {"first_run": first, "rerun": rerun}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="grava o resultado em JSON neste arquivo")
+    args = parser.parse_args()
+
+    os.environ.pop("GEMINI_API_KEY", None)
+    sections = {section: measure_section(section) for section in SECTIONS}
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "sections": sections,
+        "total_rerun_bytes": sum(s["rerun"]["bytes"] for s in sections.values()),
+    }
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Benchmark de inicialização a frio do app.
+
+Mede, em processos Python novos (como em uma réplica recém-criada):
+
+- o tempo de ``import app`` e os módulos mais caros segundo ``-X importtime``;
+- a latência da primeira renderização de cada seção via ``AppTest``.
+
+Uso:
+    python benchmarks/startup.py [--repeat 5] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SECTIONS = ['home', 'statements', 'liquidity', 'profitability', 'capital_structure', 'integrated_analysis', 'ai_consultant']
+
+IMPORT_SNIPPET = """
+import json, time
+start = time.perf_counter()
+import app
+print(json.dumps({"import_ms": (time.perf_counter() - start) * 1000}))
+"""
+
+RENDER_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=120)
+at.session_state["current_section"] = sys.argv[1]
+at.run()
+elapsed = (time.perf_counter() - start) * 1000
+errors = [str(e.value) for e in at.exception]
+print(json.dumps({"render_ms": elapsed, "errors": errors}))
+"""
+
+
+def _run_python(args, env=None):
+    """Executa um processo Python novo na raiz do projeto e devolve a última linha JSON"""
+    result = subprocess.run(
+        [sys.executable] + args,
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _bench_env():
+    env = dict(os.environ)
+    # Evita chamadas reais à API durante a medição
+    env.pop("GEMINI_API_KEY", None)
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def measure_import(repeat: int):
+    """Tempo de ``import app`` em processos novos"""
+    env = _bench_env()
+    return [_run_python(["-c", IMPORT_SNIPPET], env)["import_ms"] for _ in range(repeat)]
+
+
+def top_imports(limit: int = 10):
+    """Módulos importados diretamente por ``app`` com maior tempo acumulado"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=ROOT, env=_bench_env(), capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        # Cada nível de aninhamento acrescenta dois espaços; nível 1 = importado por app
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth != 1:
+            continue
+        rows.append({"module": name.strip(), "cumulative_ms": int(cumulative) / 1000})
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:limit]
+
+
+def measure_first_render(repeat: int):
+    """Latência da primeira renderização de cada seção em processos novos"""
+    env = _bench_env()
+    results = {}
+    for section in SECTIONS:
+        samples = []
+        for _ in range(repeat):
+            run = _run_python(["-c", RENDER_SNIPPET, section], env)
+            if run["errors"]:
+                raise RuntimeError(f"Erro ao renderizar '{section}': {run['errors']}")
+            samples.append(run["render_ms"])
+        results[section] = samples
+    return results
+
+
+def _summary(samples):
+    return {
+        "median_ms": round(statistics.median(samples), 1),
+        "min_ms": round(min(samples), 1),
+        "max_ms": round(max(samples), 1),
+        "samples": len(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="execuções por medição (padrão: 5)")
+    parser.add_argument("--output", help="grava o resultado em JSON neste arquivo")
+    args = parser.parse_args()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "import": _summary(measure_import(args.repeat)),
+        "top_imports": top_imports(),
+        "first_render": {
+            section: _summary(samples)
+            for section, samples in measure_first_render(args.repeat).items()
+        },
+    }
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Histórico da consultoria com IA com memória limitada por sessão.
+
+Cada sessão guarda em memória apenas as consultas mais recentes, em um buffer
+circular de registros compactos (tuplas nomeadas, sem dicionário por
+registro). Ao encher, a consulta mais antiga é transferida para um banco
+SQLite local em modo WAL, compartilhado por todas as sessões do processo, de
+onde o histórico completo pode ser consultado por páginas.
+
+O banco é um armazenamento temporário de sessões: registros mais antigos que
+``ttl_seconds`` são removidos ao abrir o banco e, depois, a cada
+``PRUNE_EVERY`` inserções.
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+import weakref
+from collections import deque
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+
+PRUNE_EVERY = 1000
+
+
+class ChatRecord(NamedTuple):
+    question: str
+    answer: str
+    timestamp: float
+
+
+class ChatHistoryStore:
+    """Registros transferidos da memória das sessões, em SQLite (WAL)"""
+
+    def __init__(self, path: str, ttl_seconds: Optional[float] = 7 * 24 * 3600):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._appends = 0
+        self._lock = threading.Lock()
+        # Uma conexão compartilhada pelas threads das sessões, serializada pelo lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chat_history (
+                session_id TEXT NOT NULL,
+                number INTEGER NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                timestamp REAL NOT NULL,
+                PRIMARY KEY (session_id, number)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chat_history_timestamp ON chat_history (timestamp)")
+        self._prune_expired()
+
+    def append(self, session_id: str, number: int, record: ChatRecord):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_history VALUES (?, ?, ?, ?, ?)",
+                (session_id, number, record.question, record.answer, record.timestamp),
+            )
+            self._appends += 1
+        if self._appends % PRUNE_EVERY == 0:
+            self._prune_expired()
+
+    def fetch(self, session_id: str, first: int, last: int) -> List[Tuple[int, ChatRecord]]:
+        """Consultas de número ``first`` a ``last``, da mais recente para a mais antiga"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT number, question, answer, timestamp FROM chat_history "
+                "WHERE session_id = ? AND number BETWEEN ? AND ? ORDER BY number DESC",
+                (session_id, first, last),
+            ).fetchall()
+        return [(number, ChatRecord(question, answer, timestamp)) for number, question, answer, timestamp in rows]
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM chat_history WHERE session_id = ?", (session_id,))
+
+    def prune(self, before: float) -> int:
+        """Remove registros anteriores a ``before`` (epoch) e devolve quantos foram removidos"""
+        with self._lock:
+            return self._conn.execute("DELETE FROM chat_history WHERE timestamp < ?", (before,)).rowcount
+
+    def _prune_expired(self):
+        if self.ttl_seconds is not None:
+            self.prune(time.time() - self.ttl_seconds)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Históricos vivos do processo, para o relatório de memória; somem com a sessão
+_HISTORIES: "weakref.WeakSet[ChatHistory]" = weakref.WeakSet()
+
+
+class ChatHistory:
+    """Consultas de uma sessão: as ``capacity`` mais recentes em memória, as demais no ``store``
+
+    Sem ``store``, as consultas que saem do buffer são descartadas.
+    """
+
+    def __init__(self, capacity: int = 3, store: Optional[ChatHistoryStore] = None):
+        if capacity <= 0:
+            raise ValueError("capacity deve ser positivo")
+        self.session_id = uuid.uuid4().hex
+        self.store = store
+        self._recent: deque = deque(maxlen=capacity)
+        # Consultas numeradas a partir de 1; sem store, as de número <= _dropped foram descartadas
+        self._total = 0
+        self._dropped = 0
+        _HISTORIES.add(self)
+
+    @property
+    def capacity(self) -> int:
+        return self._recent.maxlen
+
+    def __len__(self) -> int:
+        """Total de consultas da sessão, em memória e em disco"""
+        return self._total - self._dropped
+
+    def __bool__(self) -> bool:
+        return self._total > self._dropped
+
+    def append(self, question: str, answer: str, timestamp: Optional[float] = None):
+        if len(self._recent) == self._recent.maxlen:
+            number = self._total - len(self._recent) + 1
+            if self.store is not None:
+                self.store.append(self.session_id, number, self._recent[0])
+            else:
+                self._dropped = number
+        self._recent.append(ChatRecord(question, answer, time.time() if timestamp is None else timestamp))
+        self._total += 1
+
+    def recent(self, count: Optional[int] = None) -> List[Tuple[int, ChatRecord]]:
+        """``(número, registro)`` das consultas em memória, da mais recente para a mais antiga
+
+        Os números começam em 1, na ordem em que as consultas foram feitas.
+        """
+        records = list(self._recent)[::-1][:count]
+        return [(self._total - i, record) for i, record in enumerate(records)]
+
+    def page(self, number: int, size: int = 10, before: Optional[int] = None) -> List[Tuple[int, ChatRecord]]:
+        """Página ``number`` (a partir de 0) das consultas, da mais recente para a mais antiga
+
+        ``before`` limita a paginação às consultas de número menor, por exemplo
+        para listar só as que não aparecem em ``recent()``.
+        """
+        newest = self._total if before is None else min(before - 1, self._total)
+        last = newest - number * size
+        first = max(last - size + 1, self._dropped + 1)
+        if last < first:
+            return []
+
+        in_memory_from = self._total - len(self._recent) + 1
+        records = [(n, self._recent[n - in_memory_from]) for n in range(last, max(first, in_memory_from) - 1, -1)]
+        if first < in_memory_from and self.store is not None:
+            records += self.store.fetch(self.session_id, first, min(last, in_memory_from - 1))
+        return records
+
+    def page_count(self, size: int = 10, before: Optional[int] = None) -> int:
+        newest = self._total if before is None else min(before - 1, self._total)
+        available = max(newest - self._dropped, 0)
+        return (available + size - 1) // size
+
+    def clear(self):
+        """Apaga o histórico; a numeração recomeça em 1"""
+        if self.store is not None:
+            self.store.delete(self.session_id)
+        self.session_id = uuid.uuid4().hex
+        self._recent.clear()
+        self._total = self._dropped = 0
+
+    def memory_bytes(self) -> int:
+        """Memória ocupada pelo buffer e pelos registros em memória"""
+        size = sys.getsizeof(self._recent)
+        for record in self._recent:
+            size += sys.getsizeof(record) + sum(sys.getsizeof(field) for field in record)
+        return size
+
+    def stats(self) -> Dict[str, Any]:
+        in_memory = len(self._recent)
+        return {
+            "session_id": self.session_id,
+            "total": len(self),
+            "in_memory": in_memory,
+            "on_disk": len(self) - in_memory,
+            "memory_bytes": self.memory_bytes(),
+        }
+
+
+def memory_report() -> List[Dict[str, Any]]:
+    """``stats()`` de cada sessão viva do processo, da que mais usa memória para a que menos usa"""
+    return sorted((history.stats() for history in list(_HISTORIES)), key=lambda s: s["memory_bytes"], reverse=True)
@@ -0,0 +1,420 @@
+"""Carregamento das demonstrações a partir de arquivos CSV, Parquet ou SPED-ECD.
+
+Os arquivos são lidos em blocos (ou linha a linha, no caso do SPED), de modo
+que exportações de vários gigabytes com milhares de empresas são processadas
+com memória limitada ao tamanho do resultado. O resultado é um DataFrame
+largo, com uma linha por empresa/período e uma coluna por linha das
+demonstrações -- o mesmo formato aceito por ``indicators.compute_indicators``.
+
+Formatos de CSV/Parquet aceitos:
+
+- longo: colunas ``company``, ``period``, ``line`` e ``value``;
+- largo: colunas ``company`` e ``period`` e uma coluna por linha
+  (``ativo_circulante``, ``receita_bruta`` ...), além das colunas opcionais
+  ``name``, ``segment``, ``size`` e ``challenge``.
+
+Cada arquivo carregado é guardado em um cache Parquet em disco, invalidado
+quando o arquivo de origem muda (tamanho ou data de modificação).
+"""
+import hashlib
+import os
+import unicodedata
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+BALANCE_SHEET_LINES = (
+    "ativo_circulante",
+    "ativo_nao_circulante",
+    "total_ativo",
+    "passivo_circulante",
+    "passivo_nao_circulante",
+    "patrimonio_liquido",
+    "total_passivo",
+)
+
+INCOME_STATEMENT_LINES = (
+    "receita_bruta",
+    "deducoes",
+    "receita_liquida",
+    "custo_mercadorias",
+    "lucro_bruto",
+    "despesas_vendas",
+    "despesas_administrativas",
+    "depreciacao",
+    "resultado_operacional",
+    "receitas_financeiras",
+    "despesas_financeiras",
+    "resultado_antes_ir",
+    "ir_csll",
+    "lucro_liquido",
+)
+
+COMPANY_INFO_COLUMNS = ("name", "segment", "size", "challenge")
+
+KEY_COLUMNS = ("company", "period")
+LONG_COLUMNS = KEY_COLUMNS + ("line", "value")
+
+DEFAULT_CHUNK_ROWS = 500_000
+
+# Incrementar quando o formato do resultado mudar, para invalidar caches antigos
+LOADER_VERSION = 3
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "STATEMENTS_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "statements")
+)
+
+
+def detect_format(path: str) -> str:
+    """Identifica o formato pelo nome do arquivo: ``csv``, ``parquet`` ou ``sped``"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".csv", ".gz", ".bz2", ".zip", ".xz"):
+        return "csv"
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    if ext == ".txt":
+        return "sped"
+    raise ValueError(f"Formato não reconhecido para '{path}'. Informe fmt='csv', 'parquet' ou 'sped'.")
+
+
+def load_statements(
+    path: str,
+    fmt: Optional[str] = None,
+    companies: Optional[Sequence[str]] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+    sped_mapping: Optional[Dict[str, str]] = None,
+) -> pd.DataFrame:
+    """Carrega as demonstrações de um arquivo para um DataFrame indexado por (company, period)
+
+    ``companies`` restringe o resultado às empresas informadas. Com
+    ``cache_dir=None`` o cache em disco não é usado.
+    """
+    fmt = fmt or detect_format(path)
+    cache_path = _cache_path(path, fmt, sped_mapping, cache_dir)
+
+    if cache_path and os.path.exists(cache_path):
+        frame = pd.read_parquet(cache_path)
+    else:
+        if fmt == "csv":
+            frame = _from_chunks(_csv_chunks(path, chunk_rows))
+        elif fmt == "parquet":
+            frame = _from_chunks(_parquet_chunks(path, chunk_rows))
+        elif fmt == "sped":
+            frame = _from_long_rows(iter_sped_rows(path, sped_mapping))
+        else:
+            raise ValueError(f"Formato desconhecido: {fmt}")
+
+        frame = complete_statements(frame)
+        if cache_path:
+            _write_cache(frame, cache_path)
+
+    if companies is not None:
+        wanted = [str(c) for c in companies]
+        frame = frame[frame.index.get_level_values("company").isin(wanted)]
+    return frame
+
+
+def to_alpha_data(frame: pd.DataFrame, company: str, period: Optional[str] = None) -> Dict[str, Any]:
+    """Converte uma empresa/período do DataFrame para o formato de ALPHA_DATA
+
+    Sem ``period``, usa o período mais recente da empresa.
+    """
+    try:
+        rows = frame.xs(str(company), level="company")
+    except KeyError:
+        raise KeyError(f"Empresa '{company}' não encontrada") from None
+    if period is None:
+        # Importado aqui: period_store depende deste módulo
+        from period_store import sort_periods
+
+        period = sort_periods(rows).index[-1]
+    row = rows.loc[period]
+
+    def number(line):
+        value = row.get(line)
+        return 0.0 if value is None or pd.isna(value) else float(value)
+
+    def text(column, default=""):
+        value = row.get(column)
+        return default if value is None or pd.isna(value) else str(value)
+
+    return {
+        "company_info": {
+            "company": str(company),
+            "name": text("name", str(company)),
+            "segment": text("segment"),
+            "size": text("size"),
+            "challenge": text("challenge"),
+            "period": str(period),
+        },
+        "balance_sheet": {line: number(line) for line in BALANCE_SHEET_LINES},
+        "income_statement": {line: number(line) for line in INCOME_STATEMENT_LINES},
+    }
+
+
+def complete_statements(frame: pd.DataFrame) -> pd.DataFrame:
+    """Preenche totais e subtotais ausentes a partir das linhas de entrada"""
+    frame = frame.copy()
+
+    def fill(line, values):
+        if line not in frame.columns:
+            frame[line] = values
+        else:
+            frame[line] = frame[line].fillna(values)
+
+    def col(line):
+        if line in frame.columns:
+            return frame[line].fillna(0.0)
+        return pd.Series(0.0, index=frame.index)
+
+    for line in BALANCE_SHEET_LINES + INCOME_STATEMENT_LINES:
+        if line not in frame.columns:
+            frame[line] = float("nan")
+
+    fill("total_ativo", col("ativo_circulante") + col("ativo_nao_circulante"))
+    fill("total_passivo", col("passivo_circulante") + col("passivo_nao_circulante") + col("patrimonio_liquido"))
+    fill("receita_liquida", col("receita_bruta") - col("deducoes"))
+    fill("lucro_bruto", col("receita_liquida") - col("custo_mercadorias"))
+    fill("resultado_operacional", col("lucro_bruto") - col("despesas_vendas") - col("despesas_administrativas") - col("depreciacao"))
+    fill("resultado_antes_ir", col("resultado_operacional") + col("receitas_financeiras") - col("despesas_financeiras"))
+    fill("lucro_liquido", col("resultado_antes_ir") - col("ir_csll"))
+
+    numeric = [c for c in frame.columns if c not in COMPANY_INFO_COLUMNS]
+    frame[numeric] = frame[numeric].fillna(0.0)
+    return frame
+
+
+# Leitura em blocos ---------------------------------------------------------
+
+def _csv_chunks(path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    header = pd.read_csv(path, nrows=0).columns
+    dtype = {column: "string" for column in ("company", "period", "line") + COMPANY_INFO_COLUMNS if column in header}
+    yield from pd.read_csv(path, chunksize=chunk_rows, dtype=dtype)
+
+
+def _parquet_chunks(path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    if not PARQUET_AVAILABLE:
+        raise ImportError("pyarrow é necessário para ler arquivos Parquet")
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+        yield batch.to_pandas()
+
+
+def _from_chunks(chunks: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """Agrega os blocos lidos, no formato longo ou largo, em um DataFrame largo"""
+    partials: List[pd.DataFrame] = []
+    layout = None
+
+    for chunk in chunks:
+        missing = [c for c in KEY_COLUMNS if c not in chunk.columns]
+        if missing:
+            raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(missing)}")
+        chunk["company"] = chunk["company"].astype(str)
+        chunk["period"] = chunk["period"].astype(str)
+
+        if layout is None:
+            layout = "long" if all(c in chunk.columns for c in LONG_COLUMNS) else "wide"
+
+        if layout == "long":
+            partial = chunk.groupby(["company", "period", "line"], sort=False)["value"].sum().unstack("line")
+        else:
+            partial = chunk.set_index(["company", "period"])
+        partials.append(partial)
+
+        # Consolida periodicamente para manter a memória proporcional ao resultado
+        if len(partials) >= 16:
+            partials = [_combine(partials, layout)]
+
+    if not partials:
+        return pd.DataFrame(index=pd.MultiIndex.from_arrays([[], []], names=list(KEY_COLUMNS)))
+    return _combine(partials, layout)
+
+
+def _combine(partials: List[pd.DataFrame], layout: str) -> pd.DataFrame:
+    combined = pd.concat(partials)
+    if layout == "long":
+        # Linhas repetidas (ex.: subcontas) são somadas
+        return combined.groupby(level=["company", "period"], sort=True).sum(min_count=1)
+    # No formato largo, a última ocorrência de cada empresa/período prevalece
+    return combined[~combined.index.duplicated(keep="last")].sort_index()
+
+
+def _from_long_rows(rows: Iterable[tuple]) -> pd.DataFrame:
+    values: Dict[tuple, Dict[str, Any]] = {}
+    for company, period, line, value in rows:
+        values.setdefault((company, period), {})[line] = value
+    if not values:
+        return pd.DataFrame(index=pd.MultiIndex.from_arrays([[], []], names=list(KEY_COLUMNS)))
+    frame = pd.DataFrame.from_dict(values, orient="index")
+    frame.index = pd.MultiIndex.from_tuples(frame.index, names=list(KEY_COLUMNS))
+    return frame.sort_index()
+
+
+# SPED-ECD ----------------------------------------------------------------
+
+# Descrições usuais das linhas aglutinadoras do Balanço (J100) e da DRE (J150)
+SPED_DESCRIPTION_MAPPING = {
+    "ATIVO CIRCULANTE": "ativo_circulante",
+    "ATIVO NAO CIRCULANTE": "ativo_nao_circulante",
+    "ATIVO": "total_ativo",
+    "TOTAL DO ATIVO": "total_ativo",
+    "PASSIVO CIRCULANTE": "passivo_circulante",
+    "PASSIVO NAO CIRCULANTE": "passivo_nao_circulante",
+    "PATRIMONIO LIQUIDO": "patrimonio_liquido",
+    "PASSIVO": "total_passivo",
+    "TOTAL DO PASSIVO": "total_passivo",
+    "PASSIVO E PATRIMONIO LIQUIDO": "total_passivo",
+    "RECEITA BRUTA": "receita_bruta",
+    "RECEITA BRUTA DE VENDAS": "receita_bruta",
+    "RECEITA OPERACIONAL BRUTA": "receita_bruta",
+    "DEDUCOES DA RECEITA": "deducoes",
+    "DEDUCOES DA RECEITA BRUTA": "deducoes",
+    "RECEITA LIQUIDA": "receita_liquida",
+    "RECEITA OPERACIONAL LIQUIDA": "receita_liquida",
+    "CUSTO DAS MERCADORIAS VENDIDAS": "custo_mercadorias",
+    "CUSTO DOS SERVICOS PRESTADOS": "custo_mercadorias",
+    "CUSTO DAS MERCADORIAS/SERVICOS": "custo_mercadorias",
+    "LUCRO BRUTO": "lucro_bruto",
+    "DESPESAS COM VENDAS": "despesas_vendas",
+    "DESPESAS DE VENDAS": "despesas_vendas",
+    "DESPESAS ADMINISTRATIVAS": "despesas_administrativas",
+    "DEPRECIACAO": "depreciacao",
+    "DEPRECIACAO E AMORTIZACAO": "depreciacao",
+    "RESULTADO OPERACIONAL": "resultado_operacional",
+    "RECEITAS FINANCEIRAS": "receitas_financeiras",
+    "DESPESAS FINANCEIRAS": "despesas_financeiras",
+    "RESULTADO ANTES DO IRPJ E CSLL": "resultado_antes_ir",
+    "RESULTADO ANTES DO IR E CSLL": "resultado_antes_ir",
+    "LUCRO ANTES DO IR E CSLL": "resultado_antes_ir",
+    "IRPJ E CSLL": "ir_csll",
+    "IRPJ/CSLL": "ir_csll",
+    "PROVISAO PARA IR E CSLL": "ir_csll",
+    "LUCRO LIQUIDO": "lucro_liquido",
+    "LUCRO LIQUIDO DO EXERCICIO": "lucro_liquido",
+    "LUCRO LIQUIDO DO PERIODO": "lucro_liquido",
+}
+
+# Natureza de cada linha: devedora (ativo e despesas) ou credora (passivo, PL,
+# receitas e resultados). O saldo do lado da natureza é positivo; do lado oposto,
+# negativo (prejuízos, PL negativo, estornos)
+SPED_DEBIT_LINES = frozenset({
+    "ativo_circulante", "ativo_nao_circulante", "total_ativo",
+    "deducoes", "custo_mercadorias", "despesas_vendas", "despesas_administrativas",
+    "depreciacao", "despesas_financeiras", "ir_csll",
+})
+
+
+def _normalize_description(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).upper()
+    for prefix in ("(-)", "(+)", "(=)", "(+/-)", "(-/+)"):
+        if text.startswith(prefix):
+            text = text[len(prefix):]
+    return " ".join(text.split())
+
+
+def _sped_number(text: str) -> float:
+    return float(text.replace(".", "").replace(",", ".")) if text else 0.0
+
+
+def _sped_signed(line: str, value: str, indicator: str) -> float:
+    """Valor com sinal pelo indicador D/C em relação à natureza da linha (sem indicador, positivo)"""
+    amount = abs(_sped_number(value))
+    indicator = indicator.strip().upper()
+    natural = "D" if line in SPED_DEBIT_LINES else "C"
+    return -amount if indicator in ("D", "C") and indicator != natural else amount
+
+
+def _sped_date(text: str) -> str:
+    # DDMMAAAA -> AAAA-MM-DD
+    return f"{text[4:8]}-{text[2:4]}-{text[0:2]}" if len(text) == 8 else text
+
+
+def iter_sped_rows(path: str, mapping: Optional[Dict[str, str]] = None) -> Iterator[tuple]:
+    """Lê um arquivo SPED-ECD linha a linha e produz tuplas (company, period, line, value)
+
+    Usa o registro 0000 (CNPJ e data final) e os registros J100 (Balanço) e
+    J150 (DRE) do leiaute 9 em diante. ``mapping`` associa códigos de
+    aglutinação (COD_AGL) a linhas das demonstrações; sem ele, as linhas são
+    reconhecidas pela descrição (veja ``SPED_DESCRIPTION_MAPPING``). Como em
+    ALPHA_DATA, despesas e deduções são positivas; o sinal vem do indicador
+    D/C final (IND_DC_CTA_FIN) em relação à natureza da linha, de modo que
+    prejuízos e PL negativo (ou estornos de despesa) ficam negativos.
+
+    O nome empresarial (NOME do 0000) sai como a coluna ``name``, uma vez por
+    empresa e período, junto da primeira linha reconhecida.
+    """
+    company, period, name = None, None, None
+    seen = set()
+
+    with open(path, "r", encoding="latin-1") as f:
+        for raw in f:
+            if not raw.startswith("|"):
+                continue
+            fields = raw.rstrip("\r\n").split("|")[1:-1]
+            reg = fields[0] if fields else ""
+
+            if reg == "0000":
+                # |0000|LECD|DT_INI|DT_FIN|NOME|CNPJ|...
+                period = _sped_date(fields[3])
+                name = fields[4].strip()
+                company = fields[5]
+                seen = set()
+            elif reg == "J100":
+                # |J100|COD_AGL|IND_COD_AGL|NIVEL_AGL|COD_AGL_SUP|IND_GRP_BAL|DESCR_COD_AGL|VL_CTA_INI|IND_DC_CTA_INI|VL_CTA_FIN|IND_DC_CTA_FIN|...
+                code, description, value, indicator = fields[1], fields[6], fields[9], fields[10] if len(fields) > 10 else ""
+            elif reg == "J150":
+                # |J150|NU_ORDEM|COD_AGL|IND_COD_AGL|NIVEL_AGL|COD_AGL_SUP|DESCR_COD_AGL|VL_CTA_INI_|IND_DC_CTA_INI_|VL_CTA_FIN|IND_DC_CTA_FIN|...
+                code, description, value, indicator = fields[2], fields[6], fields[9], fields[10] if len(fields) > 10 else ""
+            elif reg == "9999":
+                break
+            else:
+                continue
+
+            if reg not in ("J100", "J150") or company is None:
+                continue
+
+            if mapping is not None:
+                line = mapping.get(code)
+            else:
+                line = SPED_DESCRIPTION_MAPPING.get(_normalize_description(description))
+
+            # Apenas a primeira linha aglutinadora de cada tipo é considerada
+            if line and line not in seen:
+                if not seen and name:
+                    yield company, period, "name", name
+                seen.add(line)
+                yield company, period, line, _sped_signed(line, value, indicator)
+
+
+# Cache em disco -----------------------------------------------------------
+
+def _cache_path(path: str, fmt: str, sped_mapping: Optional[Dict[str, str]], cache_dir: Optional[str]) -> Optional[str]:
+    if not cache_dir or not PARQUET_AVAILABLE:
+        return None
+    stat = os.stat(path)
+    identity = "|".join([
+        os.path.abspath(path),
+        str(stat.st_size),
+        str(stat.st_mtime_ns),
+        fmt,
+        repr(sorted(sped_mapping.items())) if sped_mapping else "",
+        str(LOADER_VERSION),
+    ])
+    digest = hashlib.sha256(identity.encode("utf-8")).hexdigest()[:24]
+    return os.path.join(cache_dir, f"{digest}.parquet")
+
+
+def _write_cache(frame: pd.DataFrame, cache_path: str):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    # Escrita atômica: outro processo nunca lê um arquivo pela metade
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    frame.to_parquet(tmp_path)
+    os.replace(tmp_path, cache_path)
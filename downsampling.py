@@ -0,0 +1,121 @@
+"""Redução de séries longas antes do envio das figuras ao navegador.
+
+Com muitos períodos ou empresas, uma linha do Plotly pode ter dezenas de
+milhares de pontos, mas a tela só mostra algumas centenas. O
+Largest-Triangle-Three-Buckets (LTTB) escolhe, em cada faixa da série, o
+ponto que forma o maior triângulo com o ponto já escolhido na faixa anterior
+e a média da faixa seguinte. Picos e vales ficam preservados, ao contrário
+de uma amostragem a cada N pontos.
+
+``downsample_figure`` aplica o LTTB às linhas (``scatter``) de uma figura e
+passa as linhas para WebGL (``scattergl``) quando a figura, já reduzida,
+ainda tem pontos demais para o SVG.
+"""
+from typing import Tuple
+
+import numpy as np
+import plotly.graph_objects as go
+
+SCATTER_TYPES = ("scatter", "scattergl")
+# Propriedades com um valor por ponto, reduzidas junto com x e y
+POINT_PROPERTIES = ("customdata", "text", "hovertext")
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """Posições dos ``n_out`` pontos escolhidos pelo LTTB, em ordem crescente
+
+    O primeiro e o último ponto sempre ficam. ``x`` deve estar em ordem
+    crescente (datas são aceitas); valores não finitos em ``y`` nunca são
+    preferidos a um ponto válido da mesma faixa.
+    """
+    x = _numeric(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if len(x) != n:
+        raise ValueError("x e y devem ter o mesmo tamanho")
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    if n_out < 3:
+        raise ValueError("n_out deve ser pelo menos 3")
+
+    # Faixas entre o primeiro e o último ponto, com a média de cada uma calculada de uma vez
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    finite = np.isfinite(y)
+    y_filled = np.where(finite, y, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = np.add.reduceat(x[:-1], edges[:-1]) / counts
+        mean_y = np.add.reduceat(y_filled[:-1], edges[:-1]) / np.add.reduceat(finite[:-1], edges[:-1])
+    # A faixa seguinte à última é o próprio último ponto
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    ax, ay = x[0], y[0]
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        cx, cy = next_x[bucket], next_y[bucket]
+        # Área (em dobro) do triângulo a-b-c para cada candidato b da faixa
+        area = np.abs((ax - cx) * (y[start:stop] - ay) - (ax - x[start:stop]) * (cy - ay))
+        best = start + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        selected[bucket + 1] = best
+        ax, ay = x[best], y[best]
+    return selected
+
+
+def lttb(x, y, n_out: int) -> Tuple[np.ndarray, np.ndarray]:
+    """``x`` e ``y`` reduzidos a ``n_out`` pontos"""
+    indices = lttb_indices(x, y, n_out)
+    return np.asarray(x)[indices], np.asarray(y)[indices]
+
+
+def downsample_figure(fig: go.Figure, max_points: int, webgl_threshold: int) -> go.Figure:
+    """Reduz cada linha a ``max_points`` pontos e usa WebGL acima de ``webgl_threshold`` pontos na figura
+
+    Devolve a própria ``fig`` quando nada muda; senão, uma figura nova (a
+    original não é alterada, pois pode estar em cache).
+    """
+    reduced = {}
+    for position, trace in enumerate(fig.data):
+        if trace.type in SCATTER_TYPES and trace.y is not None and trace.x is not None and len(trace.y) > max_points:
+            indices = lttb_indices(trace.x, trace.y, max_points)
+            props = trace.to_plotly_json()
+            for key in ("x", "y") + POINT_PROPERTIES:
+                values = props.get(key)
+                if values is not None and not isinstance(values, str) and len(values) == len(trace.y):
+                    props[key] = np.asarray(values)[indices]
+            reduced[position] = props
+
+    points = sum(
+        len(reduced[position]["y"]) if position in reduced else len(trace.y)
+        for position, trace in enumerate(fig.data) if trace.type in SCATTER_TYPES and trace.y is not None
+    )
+    webgl = points > webgl_threshold
+    if not reduced and not (webgl and any(trace.type == "scatter" for trace in fig.data)):
+        return fig
+
+    traces = []
+    for position, trace in enumerate(fig.data):
+        if trace.type == "scatter" and webgl:
+            props = reduced.get(position) or trace.to_plotly_json()
+            props.pop("type", None)
+            # Propriedades só do SVG (como cliponaxis) são descartadas
+            trace = go.Scattergl(props, skip_invalid=True)
+        elif position in reduced:
+            trace = type(trace)(reduced[position])
+        traces.append(trace)
+    return go.Figure(data=traces, layout=fig.layout)
+
+
+def _numeric(x) -> np.ndarray:
+    """Eixo x como números: datas viram nanossegundos e rótulos de texto viram posições"""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    if x.dtype.kind in "biuf":
+        return x.astype(np.float64)
+    try:
+        return x.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    except (ValueError, TypeError):
+        return np.arange(len(x), dtype=np.float64)
@@ -0,0 +1,123 @@
+"""JSON compacto das figuras e orçamento de bytes por página.
+
+O ``st.plotly_chart`` envia a figura inteira a cada rerun, incluindo o
+template do tema (um bloco de estilos para cada tipo de gráfico do Plotly)
+e os números com precisão total. ``compact_figure`` deixa no template só os
+tipos de gráfico que a figura usa e grava os números com no máximo
+``tolerance`` de erro absoluto: arrays ``float64`` passam para ``float32``
+(metade dos bytes no formato binário do Plotly) e listas de números são
+arredondadas. ``figure_json`` serializa com o orjson, quando instalado --
+o mesmo codificador que o Plotly usa no envio pelo Streamlit.
+"""
+import base64
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+try:
+    import orjson  # noqa: F401 (usado pelo plotly.io como codificador)
+    JSON_ENGINE = "orjson"
+except ImportError:
+    JSON_ENGINE = "json"
+
+# Muito abaixo das 2 casas decimais mostradas nos rótulos e no hover
+COMPACT_TOLERANCE = 1e-4
+
+
+def strip_template_data(layout: Dict[str, Any], trace_types) -> Dict[str, Any]:
+    """Layout com o template restrito aos estilos dos tipos de gráfico em ``trace_types``"""
+    template = layout.get("template")
+    if not template or "data" not in template:
+        return layout
+    data = {kind: styles for kind, styles in template["data"].items() if kind in trace_types}
+    return {**layout, "template": {**template, "data": data}}
+
+
+def compact_numbers(value, tolerance: float = COMPACT_TOLERANCE):
+    """Cópia de ``value`` (dicionários, listas, arrays e números) com números mais curtos
+
+    Arrays ``float64`` viram ``float32`` quando nenhum valor muda mais que
+    ``tolerance``; números soltos e listas de números são arredondados às
+    casas decimais que ``tolerance`` permite.
+    """
+    decimals = max(0, int(np.ceil(-np.log10(tolerance))))
+    return _compact(value, tolerance, decimals)
+
+
+def _compact(value, tolerance: float, decimals: int):
+    if isinstance(value, dict):
+        if "bdata" in value and "dtype" in value:
+            # Array já no formato binário do Plotly ({"dtype", "bdata", "shape"})
+            array = np.frombuffer(base64.b64decode(value["bdata"]), dtype=value["dtype"])
+            if "shape" in value:
+                array = array.reshape([int(size) for size in str(value["shape"]).split(",")])
+            narrow = _compact(array, tolerance, decimals)
+            return value if narrow is array else narrow
+        return {key: _compact(item, tolerance, decimals) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_compact(item, tolerance, decimals) for item in value]
+    if isinstance(value, np.ndarray):
+        if value.dtype == np.float64:
+            narrow = value.astype(np.float32)
+            with np.errstate(invalid="ignore"):
+                error = np.abs(narrow.astype(np.float64) - value)
+            if not np.any(error > tolerance):  # NaN e inf se mantêm em float32
+                return narrow
+        return value
+    if isinstance(value, float):
+        return round(value, decimals) if np.isfinite(value) else value
+    return value
+
+
+def compact_figure(fig: go.Figure, tolerance: float = COMPACT_TOLERANCE) -> go.Figure:
+    """Nova figura com o template restrito aos tipos usados e números compactos"""
+    spec = fig.to_plotly_json()
+    trace_types = {trace.get("type", "scatter") for trace in spec["data"]}
+    layout = strip_template_data(spec["layout"], trace_types)
+    return go.Figure(
+        data=compact_numbers(spec["data"], tolerance),
+        layout=compact_numbers(layout, tolerance),
+        frames=spec.get("frames"),
+    )
+
+
+def figure_json(fig: go.Figure) -> str:
+    """JSON da figura como o ``st.plotly_chart`` o envia ao navegador"""
+    return pio.to_json(fig, validate=False, engine=JSON_ENGINE)
+
+
+class PayloadBudget:
+    """Bytes de figuras enviados em uma página (um rerun), comparados com um orçamento"""
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self.figures: Dict[str, int] = {}
+        self.closed = False
+
+    def add(self, figure: str, nbytes: int):
+        if not self.closed:
+            self.figures[figure] = self.figures.get(figure, 0) + nbytes
+
+    @property
+    def total(self) -> int:
+        return sum(self.figures.values())
+
+    @property
+    def exceeded(self) -> bool:
+        return self.budget_bytes > 0 and self.total > self.budget_bytes
+
+    def largest(self, count: int = 3) -> List[Tuple[str, int]]:
+        return sorted(self.figures.items(), key=lambda item: item[1], reverse=True)[:count]
+
+    def close(self) -> Optional[str]:
+        """Encerra a contagem da página; devolve um aviso se o orçamento foi ultrapassado"""
+        self.closed = True
+        if not self.exceeded:
+            return None
+        largest = ", ".join(f"{name} ({nbytes / 1024:,.0f} KB)" for name, nbytes in self.largest())
+        return (
+            f"Os gráficos desta página somam {self.total / 1024:,.0f} KB, acima do orçamento de "
+            f"{self.budget_bytes / 1024:,.0f} KB por página. Maiores: {largest}."
+        )
@@ -0,0 +1,431 @@
+"""Construtores das figuras Plotly das seções de análise.
+
+Cada construtor recebe um dicionário no formato de ALPHA_DATA e devolve um
+``go.Figure`` pronto, sem depender do Streamlit.
+"""
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from indicators import (
+    SIMULATOR_AC_RANGE, SIMULATOR_PC_RANGE, STATUS_LABELS, compute_indicators, simulator_liquidity_grid, statements_to_frame,
+)
+
+
+def _company_name(data: Dict[str, Any]) -> str:
+    return data.get("company_info", {}).get("name") or "Alpha Serviços LTDA"
+
+
+def _indicator_values(data: Dict[str, Any]):
+    """Valores dos indicadores para a única linha de ``data``"""
+    return compute_indicators(statements_to_frame(data)).iloc[0]
+
+
+def build_balance_sheet_figure(data: Dict[str, Any]) -> go.Figure:
+    """Composição do Ativo e do Passivo + PL"""
+    bs = data["balance_sheet"]
+
+    fig = make_subplots(
+        rows=1, cols=2,
+        specs=[[{"type": "pie"}, {"type": "pie"}]],
+        subplot_titles=("Composição do Ativo", "Composição do Passivo + PL")
+    )
+
+    # Ativo
+    fig.add_trace(go.Pie(
+        labels=["Ativo Circulante", "Ativo não Circulante"],
+        values=[bs['ativo_circulante'], bs['ativo_nao_circulante']],
+        name="Ativo",
+        marker_colors=['#3B82F6', '#1E40AF']
+    ), row=1, col=1)
+
+    # Passivo + PL
+    fig.add_trace(go.Pie(
+        labels=["Passivo Circulante", "Passivo não Circulante", "Patrimônio Líquido"],
+        values=[bs['passivo_circulante'], bs['passivo_nao_circulante'], bs['patrimonio_liquido']],
+        name="Passivo + PL",
+        marker_colors=['#EF4444', '#F97316', '#10B981']
+    ), row=1, col=2)
+
+    fig.update_layout(
+        title=f"Estrutura Patrimonial da {_company_name(data)}",
+        height=500
+    )
+    return fig
+
+
+def build_dre_waterfall_figure(data: Dict[str, Any]) -> go.Figure:
+    """Formação do resultado a partir da Receita Líquida"""
+    is_ = data["income_statement"]
+
+    fig = go.Figure(go.Waterfall(
+        name="DRE",
+        orientation="v",
+        measure=["absolute", "relative", "relative", "relative", "relative", "relative", "relative", "relative", "relative", "relative", "total"],
+        x=["Receita Líquida", "Custo", "Desp. Vendas", "Desp. Admin", "Depreciação", "Rec. Financ.", "Desp. Financ.", "IRPJ/CSLL", "", "", "Lucro Líquido"],
+        textposition="outside",
+        text=[f"R$ {is_['receita_liquida']:,.0f}", f"-R$ {is_['custo_mercadorias']:,.0f}",
+              f"-R$ {is_['despesas_vendas']:,.0f}", f"-R$ {is_['despesas_administrativas']:,.0f}",
+              f"-R$ {is_['depreciacao']:,.0f}", f"R$ {is_['receitas_financeiras']:,.0f}",
+              f"-R$ {is_['despesas_financeiras']:,.0f}", f"-R$ {is_['ir_csll']:,.0f}",
+              "", "", f"R$ {is_['lucro_liquido']:,.0f}"],
+        y=[is_['receita_liquida'], -is_['custo_mercadorias'], -is_['despesas_vendas'],
+           -is_['despesas_administrativas'], -is_['depreciacao'], is_['receitas_financeiras'],
+           -is_['despesas_financeiras'], -is_['ir_csll'], 0, 0, is_['lucro_liquido']],
+        connector={"line": {"color": "rgb(63, 63, 63)"}},
+    ))
+
+    fig.update_layout(
+        title=f"Formação do Resultado - {_company_name(data)}",
+        showlegend=False,
+        height=500
+    )
+    return fig
+
+
+def build_margins_figure(data: Dict[str, Any]) -> go.Figure:
+    """Comparativo das margens bruta, operacional e líquida"""
+    values = _indicator_values(data)
+
+    fig = go.Figure()
+
+    margens = ["Margem Bruta", "Margem Operacional", "Margem Líquida"]
+    valores = [float(values["margem_bruta"]), float(values["margem_operacional"]), float(values["margem_liquida"])]
+    cores = ['#10B981', '#3B82F6', '#8B5CF6']
+
+    fig.add_trace(go.Bar(
+        x=margens,
+        y=valores,
+        marker_color=cores,
+        text=[f"{v:.1f}%" for v in valores],
+        textposition='auto',
+    ))
+
+    fig.update_layout(
+        title="Evolução das Margens de Rentabilidade",
+        yaxis_title="Percentual (%)",
+        height=400
+    )
+    return fig
+
+
+def build_revenue_composition_figure(data: Dict[str, Any]) -> go.Figure:
+    """Decomposição da Receita Líquida em lucro e custos"""
+    is_ = data["income_statement"]
+
+    fig = go.Figure(data=[go.Pie(
+        labels=['Lucro Líquido', 'Custos e Despesas'],
+        values=[is_['lucro_liquido'], is_['receita_liquida'] - is_['lucro_liquido']],
+        hole=.3,
+        marker_colors=['#10B981', '#EF4444']
+    )])
+
+    fig.update_layout(
+        title="Composição da Receita",
+        height=300
+    )
+    return fig
+
+
+def build_cost_structure_figure(data: Dict[str, Any]) -> go.Figure:
+    """Estrutura de custos e despesas da DRE"""
+    is_ = data["income_statement"]
+
+    custos_despesas = {
+        'Custo das Mercadorias': is_['custo_mercadorias'],
+        'Despesas de Vendas': is_['despesas_vendas'],
+        'Despesas Administrativas': is_['despesas_administrativas'],
+        'Depreciação': is_['depreciacao'],
+        'Despesas Financeiras Líquidas': is_['despesas_financeiras'] - is_['receitas_financeiras'],
+        'IRPJ/CSLL': is_['ir_csll']
+    }
+
+    fig = go.Figure(data=[go.Pie(
+        labels=list(custos_despesas.keys()),
+        values=list(custos_despesas.values()),
+        hole=.3
+    )])
+
+    fig.update_layout(
+        title="Estrutura de Custos",
+        height=300
+    )
+    return fig
+
+
+def build_financing_structure_figure(data: Dict[str, Any]) -> go.Figure:
+    """Estrutura de financiamento entre capital próprio e de terceiros"""
+    bs = data["balance_sheet"]
+
+    fig = go.Figure(data=[go.Pie(
+        labels=['Patrimônio Líquido', 'Passivo Circulante', 'Passivo não Circulante'],
+        values=[bs['patrimonio_liquido'], bs['passivo_circulante'], bs['passivo_nao_circulante']],
+        marker_colors=['#10B981', '#EF4444', '#F97316'],
+        hole=.4
+    )])
+
+    fig.update_layout(
+        title="Estrutura de Financiamento",
+        height=400
+    )
+    return fig
+
+
+def _radar_scores(values) -> Dict[str, float]:
+    """Indicadores normalizados para 0-100 nos eixos do radar"""
+    return {
+        'Liquidez Corrente': min(values["liquidez_corrente"] * 50, 100),  # Normalizar para 0-100
+        'Liquidez Geral': min(values["liquidez_geral"] * 100, 100),
+        'Margem Bruta': min(values["margem_bruta"] * 2, 100),
+        'Margem Líquida': min(values["margem_liquida"] * 5, 100),
+        'Estrutura Capital': max(100 - (values["divida_patrimonio"] * 50), 0)  # Inverter para que menor dívida = melhor
+    }
+
+
+def build_radar_figure(data: Dict[str, Any], sector_quartiles: Optional[Dict[str, Tuple[float, float, float]]] = None,
+                       sector: str = "Setor") -> go.Figure:
+    """Radar de performance com os indicadores normalizados para 0-100
+
+    Com ``sector_quartiles`` (``SectorBenchmark.sector_quartiles``), sobrepõe a
+    faixa entre o 1º e o 3º quartil do setor e a mediana.
+    """
+    values = _indicator_values(data)
+
+    # Normalizar indicadores para o radar (0-100)
+    radar_data = _radar_scores(values)
+
+    fig = go.Figure()
+
+    if sector_quartiles:
+        # Na Estrutura Capital o eixo é invertido, então a borda de cada eixo é o menor/maior escore
+        q1, median, q3 = (_radar_scores({name: q[i] for name, q in sector_quartiles.items()}) for i in range(3))
+        axes = list(radar_data.keys())
+        inner = [float(min(q1[axis], q3[axis])) for axis in axes]
+        outer = [float(max(q1[axis], q3[axis])) for axis in axes]
+        # Polígono fechado do contorno externo e, no sentido inverso, do interno: o preenchimento fica só entre os dois
+        fig.add_trace(go.Scatterpolar(
+            r=outer + outer[:1] + inner[:1] + inner[::-1],
+            theta=axes + axes[:1] + axes[:1] + axes[::-1],
+            fill='toself',
+            fillcolor='rgba(148, 163, 184, 0.3)',
+            line=dict(width=0),
+            name=f"{sector}: 1º a 3º quartil",
+            hoverinfo="skip",
+        ))
+        fig.add_trace(go.Scatterpolar(
+            r=[float(median[axis]) for axis in axes] + [float(median[axes[0]])],
+            theta=axes + axes[:1],
+            mode='lines',
+            line=dict(color='#64748B', dash='dash'),
+            name=f"{sector}: mediana",
+        ))
+
+    fig.add_trace(go.Scatterpolar(
+        r=[float(v) for v in radar_data.values()],
+        theta=list(radar_data.keys()),
+        fill='toself',
+        name=_company_name(data),
+        line_color='#3B82F6'
+    ))
+
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 100]
+            )),
+        showlegend=True,
+        title="Radar de Performance Financeira",
+        height=500
+    )
+    return fig
+
+
+def build_liquidity_grid_figure(data: Dict[str, Any]) -> go.Figure:
+    """Mapa de cenários de liquidez com faixas de status e a posição atual da empresa"""
+    bs = data["balance_sheet"]
+    grid = simulator_liquidity_grid()
+
+    ac_mil = grid["ativo_circulante"] / 1000
+    pc_mil = grid["passivo_circulante"] / 1000
+    customdata = np.stack([grid["liquidez_corrente"], grid["capital_giro"]], axis=-1)
+
+    fig = go.Figure()
+
+    # Faixas discretas: vermelho (< 1,0), amarelo (1,0 a 1,5) e verde (>= 1,5)
+    fig.add_trace(go.Heatmap(
+        x=ac_mil,
+        y=pc_mil,
+        z=grid["status"],
+        customdata=customdata,
+        zmin=0,
+        zmax=2,
+        colorscale=[
+            [0.0, '#FCA5A5'], [1 / 3, '#FCA5A5'],
+            [1 / 3, '#FDE68A'], [2 / 3, '#FDE68A'],
+            [2 / 3, '#6EE7B7'], [1.0, '#6EE7B7'],
+        ],
+        colorbar=dict(
+            title="Status",
+            tickvals=[1 / 3, 1, 5 / 3],
+            ticktext=list(STATUS_LABELS),
+        ),
+        hovertemplate=(
+            "Ativo Circulante: R$ %{x:.0f} mil<br>"
+            "Passivo Circulante: R$ %{y:.0f} mil<br>"
+            "Liquidez Corrente: %{customdata[0]:.2f}<br>"
+            "Capital de Giro: R$ %{customdata[1]:,.0f}<extra></extra>"
+        ),
+    ))
+
+    fig.add_trace(go.Scatter(
+        x=[bs['ativo_circulante'] / 1000],
+        y=[bs['passivo_circulante'] / 1000],
+        mode="markers",
+        marker=dict(symbol="x", size=14, color="#1E293B"),
+        name=f"{_company_name(data)} (atual)",
+        hovertemplate="Situação atual<extra></extra>",
+    ))
+
+    fig.update_layout(
+        title="Mapa de Cenários de Liquidez Corrente",
+        xaxis_title="Ativo Circulante (R$ mil)",
+        yaxis_title="Passivo Circulante (R$ mil)",
+        height=450,
+        legend=dict(orientation="h", y=-0.2)
+    )
+    return fig
+
+
+def build_monte_carlo_figure(hist: Dict[str, Dict[str, np.ndarray]]) -> go.Figure:
+    """Histogramas da simulação de Monte Carlo (margem, lucro e liquidez)"""
+    panels = [
+        ("margem_liquida", "Margem Líquida (%)", '#8B5CF6'),
+        ("lucro_liquido", "Lucro Líquido (R$)", '#10B981'),
+        ("liquidez_corrente", "Liquidez Corrente", '#3B82F6'),
+    ]
+
+    def subplot_title(name: str, title: str) -> str:
+        # Sorteios extremos ficam fora das faixas (ver monte_carlo.PERCENTILE_WINDOW)
+        outside = hist[name].get("below", 0) + hist[name].get("above", 0)
+        if not outside:
+            return title
+        share = outside / hist[name]["total"] * 100
+        return f"{title}<br><sup>{share:.1f}% dos cenários fora do gráfico</sup>"
+
+    fig = make_subplots(rows=1, cols=3, subplot_titles=[subplot_title(name, title) for name, title, _ in panels])
+
+    for col, (name, title, color) in enumerate(panels, start=1):
+        counts = hist[name]["counts"]
+        edges = hist[name]["edges"]
+        total = hist[name].get("total", counts.sum())
+        fig.add_trace(go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=counts / total * 100,
+            width=np.diff(edges),
+            marker_color=color,
+            name=title,
+            hovertemplate="%{x:,.2f}: %{y:.2f}% dos cenários<extra></extra>",
+        ), row=1, col=col)
+
+    fig.update_layout(
+        title="Distribuição dos Resultados Simulados",
+        yaxis_title="% dos cenários",
+        showlegend=False,
+        bargap=0,
+        height=380
+    )
+    return fig
+
+
+def build_simulation_choices_figure(cells: np.ndarray) -> go.Figure:
+    """Quantas vezes os alunos escolheram cada combinação do simulador de liquidez
+
+    ``cells`` tem uma linha ``(ativo, passivo, contagem)`` por combinação, em R$ mil.
+    """
+    ac = np.arange(SIMULATOR_AC_RANGE[0], SIMULATOR_AC_RANGE[1] + 1)
+    pc = np.arange(SIMULATOR_PC_RANGE[0], SIMULATOR_PC_RANGE[1] + 1)
+    counts = np.zeros((len(pc), len(ac)))
+    if len(cells):
+        cols = np.clip(cells[:, 0] - ac[0], 0, len(ac) - 1).astype(int)
+        rows = np.clip(cells[:, 1] - pc[0], 0, len(pc) - 1).astype(int)
+        np.add.at(counts, (rows, cols), cells[:, 2])
+    counts[counts == 0] = np.nan  # células nunca escolhidas ficam em branco
+
+    fig = go.Figure(go.Heatmap(
+        x=ac,
+        y=pc,
+        z=counts,
+        colorscale="Blues",
+        colorbar=dict(title="Simulações"),
+        hovertemplate=(
+            "Ativo Circulante: R$ %{x:.0f} mil<br>"
+            "Passivo Circulante: R$ %{y:.0f} mil<br>"
+            "Simulações: %{z:,.0f}<extra></extra>"
+        ),
+    ))
+    # Fronteiras das faixas de status da liquidez corrente (1,0 e 1,5)
+    for ratio, color in ((1.0, '#EF4444'), (1.5, '#10B981')):
+        fig.add_trace(go.Scatter(
+            x=pc * ratio, y=pc, mode="lines", line=dict(color=color, dash="dash"),
+            name=f"LC = {ratio:.1f}".replace(".", ","), hoverinfo="skip",
+        ))
+
+    fig.update_layout(
+        title="Cenários Simulados pelos Alunos",
+        xaxis_title="Ativo Circulante (R$ mil)",
+        yaxis_title="Passivo Circulante (R$ mil)",
+        xaxis_range=[ac[0] - 0.5, ac[-1] + 0.5],
+        yaxis_range=[pc[0] - 0.5, pc[-1] + 0.5],
+        height=450,
+        legend=dict(orientation="h", y=-0.2)
+    )
+    return fig
+
+
+def build_period_series_figure(frame, title: str, yaxis_title: str, labels: Optional[Dict[str, str]] = None) -> go.Figure:
+    """Uma linha por coluna de ``frame`` (indexado por período) ao longo dos períodos
+
+    Rótulos de período que são datas (``2024``, ``2024Q1``, ``2024-03``) viram o
+    início do período no eixo x, que fica em escala de tempo.
+    """
+    import pandas as pd
+
+    try:
+        x = np.array([pd.Period(str(label)).start_time for label in frame.index], dtype="datetime64[ns]")
+    except (ValueError, TypeError):
+        x = np.asarray(frame.index.astype(str))
+    labels = labels or {}
+
+    fig = go.Figure()
+    for column in frame.columns:
+        fig.add_trace(go.Scatter(
+            x=x,
+            y=frame[column].to_numpy(dtype=np.float64),
+            mode="lines+markers" if len(frame) <= 60 else "lines",
+            name=labels.get(column, column),
+        ))
+
+    fig.update_layout(
+        title=title,
+        yaxis_title=yaxis_title,
+        hovermode="x unified",
+        height=400,
+        legend=dict(orientation="h", y=-0.2)
+    )
+    return fig
+
+
+# Registro das figuras por nome, usado pelo cache de figuras do app
+FIGURE_BUILDERS = {
+    "balance_sheet": build_balance_sheet_figure,
+    "dre_waterfall": build_dre_waterfall_figure,
+    "margins": build_margins_figure,
+    "revenue_composition": build_revenue_composition_figure,
+    "cost_structure": build_cost_structure_figure,
+    "financing_structure": build_financing_structure_figure,
+    "radar": build_radar_figure,
+    "liquidity_grid": build_liquidity_grid_figure,
+}
@@ -0,0 +1,151 @@
+"""Grafo de fórmulas da DRE e dos indicadores com recálculo incremental.
+
+As linhas de entrada (receita bruta, custos, contas do Balanço) são nós
+folha; linhas derivadas da DRE e indicadores são nós calculados a partir de
+suas dependências. Ao alterar uma entrada, apenas os nós que dependem dela
+são recalculados, e o grafo informa quais valores efetivamente mudaram.
+"""
+from graphlib import TopologicalSorter
+from typing import Callable, Dict, Any, List, Mapping, Set, Tuple
+
+import numpy as np
+
+
+def _ratio(numerator: float, denominator: float, scale: float = 1.0) -> float:
+    """Divisão com o mesmo tratamento de zero de ``compute_indicators`` (inf/NaN)"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return float(np.float64(numerator) / np.float64(denominator) * scale)
+
+
+# Nó calculado: (dependências, função das dependências na mesma ordem)
+Formula = Tuple[Tuple[str, ...], Callable[..., float]]
+
+FORMULAS: Dict[str, Formula] = {
+    # DRE
+    "receita_liquida": (("receita_bruta", "deducoes"), lambda rb, ded: rb - ded),
+    "lucro_bruto": (("receita_liquida", "custo_mercadorias"), lambda rl, cmv: rl - cmv),
+    "resultado_operacional": (
+        ("lucro_bruto", "despesas_vendas", "despesas_administrativas", "depreciacao"),
+        lambda lb, dv, da, dep: lb - dv - da - dep,
+    ),
+    "resultado_antes_ir": (
+        ("resultado_operacional", "receitas_financeiras", "despesas_financeiras"),
+        lambda ro, rf, df: ro + rf - df,
+    ),
+    "lucro_liquido": (("resultado_antes_ir", "ir_csll"), lambda rai, ir: rai - ir),
+    # Indicadores
+    "liquidez_corrente": (("ativo_circulante", "passivo_circulante"), _ratio),
+    "liquidez_geral": (
+        ("ativo_circulante", "passivo_circulante", "passivo_nao_circulante"),
+        lambda ac, pc, pnc: _ratio(ac, pc + pnc),
+    ),
+    "capital_giro": (("ativo_circulante", "passivo_circulante"), lambda ac, pc: ac - pc),
+    "margem_bruta": (("lucro_bruto", "receita_liquida"), lambda lb, rl: _ratio(lb, rl, 100)),
+    "margem_operacional": (("resultado_operacional", "receita_liquida"), lambda ro, rl: _ratio(ro, rl, 100)),
+    "margem_liquida": (("lucro_liquido", "receita_liquida"), lambda ll, rl: _ratio(ll, rl, 100)),
+    "divida_patrimonio": (
+        ("passivo_circulante", "passivo_nao_circulante", "patrimonio_liquido"),
+        lambda pc, pnc, pl: _ratio(pc + pnc, pl),
+    ),
+}
+
+
+class FormulaGraph:
+    """Valores das linhas e indicadores, mantidos consistentes com as entradas"""
+
+    def __init__(self, inputs: Mapping[str, float], formulas: Mapping[str, Formula] = FORMULAS):
+        self._formulas = dict(formulas)
+        self.inputs = sorted({dep for deps, _ in self._formulas.values() for dep in deps} - set(self._formulas))
+
+        missing = [name for name in self.inputs if name not in inputs]
+        if missing:
+            raise ValueError(f"Entradas ausentes: {', '.join(missing)}")
+
+        sorter = TopologicalSorter({name: deps for name, (deps, _) in self._formulas.items()})
+        self._order = [name for name in sorter.static_order() if name in self._formulas]
+        self._position = {name: i for i, name in enumerate(self._order)}
+
+        self._dependents: Dict[str, List[str]] = {}
+        for name, (deps, _) in self._formulas.items():
+            for dep in deps:
+                self._dependents.setdefault(dep, []).append(name)
+
+        self.values: Dict[str, float] = {name: float(inputs[name]) for name in self.inputs}
+        self.evaluations = 0
+        for name in self._order:
+            self._evaluate(name)
+
+    @classmethod
+    def from_statements(cls, data: Dict[str, Any]) -> "FormulaGraph":
+        """Cria o grafo a partir de um dicionário no formato de ALPHA_DATA, recalculando as linhas derivadas"""
+        return cls({**data["balance_sheet"], **data["income_statement"]})
+
+    def __getitem__(self, name: str) -> float:
+        return self.values[name]
+
+    def dependents(self, name: str) -> Set[str]:
+        """Todos os nós que dependem, direta ou indiretamente, de ``name``"""
+        found: Set[str] = set()
+        stack = [name]
+        while stack:
+            for child in self._dependents.get(stack.pop(), ()):
+                if child not in found:
+                    found.add(child)
+                    stack.append(child)
+        return found
+
+    def update(self, **changes: float) -> Dict[str, Tuple[float, float]]:
+        """Altera entradas e recalcula somente seus dependentes
+
+        Retorna ``{nome: (valor_anterior, valor_novo)}`` para cada entrada ou
+        nó calculado cujo valor mudou. Um nó cujas dependências não mudaram
+        de fato não é reavaliado, mesmo que esteja a jusante de uma entrada
+        alterada.
+        """
+        unknown = [name for name in changes if name not in self.values]
+        derived = [name for name in changes if name in self._formulas]
+        if unknown or derived:
+            raise ValueError(f"Somente entradas podem ser alteradas: {', '.join(unknown + derived)}")
+
+        changed: Dict[str, Tuple[float, float]] = {}
+        for name, value in changes.items():
+            old = self.values[name]
+            if float(value) != old:
+                self.values[name] = float(value)
+                changed[name] = (old, float(value))
+
+        pending = sorted({child for name in changed for child in self._dependents.get(name, ())}, key=self._position.get)
+        queued = set(pending)
+        # Avalia em ordem topológica; filhos só entram na fila se o valor mudou
+        while pending:
+            name = pending.pop(0)
+            old = self.values[name]
+            new = self._evaluate(name)
+            if not _same(old, new):
+                changed[name] = (old, new)
+                for child in self._dependents.get(name, ()):
+                    if child not in queued:
+                        queued.add(child)
+                        pending.append(child)
+                pending.sort(key=self._position.get)
+        return changed
+
+    def inconsistencies(self, data: Dict[str, Any]) -> Dict[str, Tuple[float, float]]:
+        """Linhas derivadas gravadas em ``data`` que divergem da fórmula: ``{nome: (gravado, calculado)}``"""
+        stored = {**data["balance_sheet"], **data["income_statement"]}
+        return {
+            name: (float(stored[name]), self.values[name])
+            for name in self._order
+            if name in stored and not np.isclose(stored[name], self.values[name])
+        }
+
+    def _evaluate(self, name: str) -> float:
+        deps, func = self._formulas[name]
+        value = float(func(*(self.values[dep] for dep in deps)))
+        self.values[name] = value
+        self.evaluations += 1
+        return value
+
+
+def _same(a: float, b: float) -> bool:
+    return a == b or (np.isnan(a) and np.isnan(b))
@@ -0,0 +1,86 @@
+"""Clientes do Gemini reutilizáveis, um por chave de API.
+
+``genai.configure`` altera uma configuração global do processo, o que mistura
+chaves quando várias sessões usam chaves diferentes. Aqui cada chave recebe
+seu próprio ``GenerativeServiceClient`` e seus handles de modelo, criados uma
+única vez e reaproveitados em todas as consultas.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict
+
+import google.generativeai as genai
+from google.ai import generativelanguage as glm
+from google.api_core import exceptions as google_exceptions
+
+# Erros que indicam chave inválida, revogada ou rotacionada
+AUTH_ERRORS = (google_exceptions.PermissionDenied, google_exceptions.Unauthenticated)
+
+
+def key_fingerprint(api_key: str) -> str:
+    """Identificador da chave que não expõe seu valor"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class GeminiClient:
+    """Cliente vinculado a uma chave, com um handle por modelo"""
+
+    def __init__(self, api_key: str):
+        self.fingerprint = key_fingerprint(api_key)
+        self._service = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+        self._models: Dict[str, genai.GenerativeModel] = {}
+        self._lock = threading.Lock()
+
+    def model(self, name: str) -> genai.GenerativeModel:
+        """Retorna o handle do modelo, criando-o na primeira chamada"""
+        with self._lock:
+            model = self._models.get(name)
+            if model is None:
+                model = genai.GenerativeModel(name)
+                # O SDK só expõe o cliente global; o handle passa a usar o desta chave.
+                # ``_client`` é interno: a versão do SDK está fixada em requirements.txt
+                # e a verificação abaixo falha de forma explícita se ele mudar.
+                if "_client" not in vars(model):
+                    raise RuntimeError(
+                        "Esta versão do google-generativeai não tem GenerativeModel._client; "
+                        "use a versão indicada em requirements.txt"
+                    )
+                model._client = self._service
+                self._models[name] = model
+            return model
+
+
+class GeminiClientRegistry:
+    """Clientes por chave de API, com descarte LRU das chaves menos usadas"""
+
+    def __init__(self, max_keys: int = 16):
+        self.max_keys = max_keys
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, api_key: str) -> GeminiClient:
+        """Retorna o cliente da chave, criando-o se necessário"""
+        fingerprint = key_fingerprint(api_key)
+        with self._lock:
+            client = self._clients.get(fingerprint)
+            if client is not None:
+                self._clients.move_to_end(fingerprint)
+                return client
+
+        client = GeminiClient(api_key)
+        with self._lock:
+            # Outra thread pode ter criado o cliente enquanto este era montado
+            client = self._clients.setdefault(fingerprint, client)
+            self._clients.move_to_end(fingerprint)
+            while len(self._clients) > self.max_keys:
+                self._clients.popitem(last=False)
+        return client
+
+    def invalidate(self, api_key: str):
+        """Descarta o cliente de uma chave (ex.: chave revogada ou rotacionada)"""
+        with self._lock:
+            self._clients.pop(key_fingerprint(api_key), None)
+
+    def __len__(self) -> int:
+        return len(self._clients)
@@ -0,0 +1,189 @@
+"""Motor vetorizado de indicadores financeiros.
+
+Recebe um DataFrame com uma linha por empresa/período e as linhas do
+Balanço Patrimonial e da DRE como colunas, e calcula todos os indicadores
+em uma única passada com NumPy.
+"""
+import operator
+from typing import Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+# Linhas do Balanço Patrimonial e da DRE usadas pelos indicadores
+BALANCE_SHEET_COLUMNS = (
+    "ativo_circulante",
+    "passivo_circulante",
+    "passivo_nao_circulante",
+    "patrimonio_liquido",
+)
+
+INCOME_STATEMENT_COLUMNS = (
+    "receita_liquida",
+    "lucro_bruto",
+    "resultado_operacional",
+    "lucro_liquido",
+)
+
+REQUIRED_COLUMNS = BALANCE_SHEET_COLUMNS + INCOME_STATEMENT_COLUMNS
+
+INDICATOR_NAMES = (
+    "liquidez_corrente",
+    "liquidez_geral",
+    "capital_giro",
+    "margem_bruta",
+    "margem_operacional",
+    "margem_liquida",
+    "divida_patrimonio",
+)
+
+
+def statements_to_frame(data: Dict[str, Any]) -> pd.DataFrame:
+    """Converte um dicionário no formato de ALPHA_DATA em um DataFrame de uma linha"""
+    row = {**data["balance_sheet"], **data["income_statement"]}
+    return pd.DataFrame([row])
+
+
+def compute_indicators(frame: pd.DataFrame) -> pd.DataFrame:
+    """Calcula todos os indicadores para todas as linhas de uma só vez
+
+    Divisões por zero resultam em ``inf``/``NaN`` em vez de exceção, para que
+    uma empresa com dados incompletos não interrompa o lote inteiro.
+    """
+    missing = [col for col in REQUIRED_COLUMNS if col not in frame.columns]
+    if missing:
+        raise ValueError(f"Colunas ausentes no DataFrame: {', '.join(missing)}")
+
+    cols = {col: frame[col].to_numpy(dtype=np.float64) for col in REQUIRED_COLUMNS}
+    ac = cols["ativo_circulante"]
+    pc = cols["passivo_circulante"]
+    pnc = cols["passivo_nao_circulante"]
+    pl = cols["patrimonio_liquido"]
+    rl = cols["receita_liquida"]
+    divida_total = pc + pnc
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = {
+            "liquidez_corrente": ac / pc,
+            "liquidez_geral": ac / divida_total,
+            "capital_giro": ac - pc,
+            "margem_bruta": cols["lucro_bruto"] / rl * 100,
+            "margem_operacional": cols["resultado_operacional"] / rl * 100,
+            "margem_liquida": cols["lucro_liquido"] / rl * 100,
+            "divida_patrimonio": divida_total / pl,
+        }
+
+    return pd.DataFrame(result, index=frame.index, columns=list(INDICATOR_NAMES))
+
+
+# Faixas do simulador de liquidez (em R$ mil), iguais às dos sliders do app
+SIMULATOR_AC_RANGE = (50, 150)
+SIMULATOR_PC_RANGE = (30, 100)
+
+# Códigos de status, na ordem de STATUS_LABELS
+STATUS_DANGER, STATUS_WARNING, STATUS_GOOD = 0, 1, 2
+STATUS_LABELS = ("Preocupante", "Atenção", "Saudável")
+
+# Faixas de status por indicador: (comparação, limite saudável, limite de atenção).
+# O valor é saudável se ``valor <comparação> limite saudável``, de atenção se
+# passar no limite de atenção e preocupante caso contrário; sem limite de
+# atenção, o indicador só tem as faixas saudável e preocupante.
+STATUS_THRESHOLDS = {
+    "liquidez_corrente": (">=", 1.5, 1.0),
+    "liquidez_geral": (">=", 1.0, 0.8),
+    "capital_giro": (">", 0, None),
+    "margem_bruta": (">=", 20, 10),
+    "margem_operacional": (">=", 20, 10),
+    "margem_liquida": (">=", 20, 10),
+    "divida_patrimonio": ("<=", 0.5, 1.0),
+}
+
+# Os operadores servem tanto para escalares quanto para arrays NumPy
+_COMPARISONS = {">=": operator.ge, ">": operator.gt, "<=": operator.le, "<": operator.lt}
+
+
+def classify_status(indicator_name: str, values) -> np.ndarray:
+    """Códigos de status de um array de valores do indicador, em uma única chamada vetorizada
+
+    ``NaN`` (divisão por zero sem sentido) cai na faixa preocupante.
+    """
+    comparison, good, warning = STATUS_THRESHOLDS[indicator_name]
+    compare = _COMPARISONS[comparison]
+    values = np.asarray(values, dtype=np.float64)
+    conditions, choices = [compare(values, good)], [STATUS_GOOD]
+    if warning is not None:
+        conditions.append(compare(values, warning))
+        choices.append(STATUS_WARNING)
+    return np.select(conditions, choices, default=STATUS_DANGER).astype(np.int8)
+
+
+def classify_indicators(frame: pd.DataFrame) -> pd.DataFrame:
+    """Status de todos os indicadores de ``compute_indicators``, uma coluna por indicador"""
+    return pd.DataFrame(
+        {name: classify_status(name, frame[name].to_numpy()) for name in STATUS_THRESHOLDS if name in frame.columns},
+        index=frame.index,
+    )
+
+
+def status_code(indicator_name: str, value: float) -> Optional[int]:
+    """Status de um único valor, pelas mesmas faixas; ``None`` para indicadores sem faixas"""
+    bands = STATUS_THRESHOLDS.get(indicator_name)
+    if bands is None:
+        return None
+    comparison, good, warning = bands
+    compare = _COMPARISONS[comparison]
+    if compare(value, good):
+        return STATUS_GOOD
+    if warning is not None and compare(value, warning):
+        return STATUS_WARNING
+    return STATUS_DANGER
+
+
+def liquidity_scenario_grid(ativo_circulante, passivo_circulante) -> Dict[str, np.ndarray]:
+    """Calcula liquidez corrente, capital de giro e status para todas as combinações
+
+    As matrizes têm uma linha por valor de Passivo Circulante e uma coluna por
+    valor de Ativo Circulante.
+    """
+    ac = np.asarray(ativo_circulante, dtype=np.float64)
+    pc = np.asarray(passivo_circulante, dtype=np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lc = ac[np.newaxis, :] / pc[:, np.newaxis]
+    cg = ac[np.newaxis, :] - pc[:, np.newaxis]
+    status = classify_status("liquidez_corrente", lc)
+
+    return {
+        "ativo_circulante": ac,
+        "passivo_circulante": pc,
+        "liquidez_corrente": lc,
+        "capital_giro": cg,
+        "status": status,
+    }
+
+
+def simulator_liquidity_grid() -> Dict[str, np.ndarray]:
+    """Grade completa do simulador, em reais, com passo de R$ 1 mil"""
+    ac = np.arange(SIMULATOR_AC_RANGE[0], SIMULATOR_AC_RANGE[1] + 1) * 1000
+    pc = np.arange(SIMULATOR_PC_RANGE[0], SIMULATOR_PC_RANGE[1] + 1) * 1000
+    return liquidity_scenario_grid(ac, pc)
+
+
+def lookup_scenario(grid: Dict[str, np.ndarray], ativo_circulante: float, passivo_circulante: float) -> Dict[str, float]:
+    """Busca na grade o cenário mais próximo dos valores informados"""
+    col = _nearest_index(grid["ativo_circulante"], ativo_circulante)
+    row = _nearest_index(grid["passivo_circulante"], passivo_circulante)
+    return {
+        "liquidez_corrente": float(grid["liquidez_corrente"][row, col]),
+        "capital_giro": float(grid["capital_giro"][row, col]),
+        "status": int(grid["status"][row, col]),
+    }
+
+
+def _nearest_index(axis: np.ndarray, value: float) -> int:
+    idx = int(np.searchsorted(axis, value))
+    if idx >= len(axis):
+        return len(axis) - 1
+    if idx > 0 and abs(axis[idx - 1] - value) <= abs(axis[idx] - value):
+        return idx - 1
+    return idx
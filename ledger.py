@@ -0,0 +1,235 @@
+"""Agregação do livro razão em Balanço Patrimonial e DRE.
+
+Recebe lançamentos contábeis (débito/crédito por conta) e um plano de contas
+que associa cada conta a uma linha das demonstrações, e produz os dicionários
+``balance_sheet`` e ``income_statement`` no formato de ALPHA_DATA, incluindo
+as sublinhas exibidas em ``show_statements`` (Disponibilidades, Clientes,
+Fornecedores, Empréstimos CP/LP etc.).
+
+O estado mantido é apenas o saldo líquido por empresa, mês e linha. Cada lote
+de lançamentos é agregado com ``groupby`` e somado a esse estado, de modo que
+acrescentar um dia de lançamentos não exige reprocessar o razão inteiro.
+
+As contas de resultado são tratadas como não encerradas: o resultado
+acumulado até a data do Balanço é somado a Lucros Acumulados.
+"""
+from typing import Dict, Iterable, Mapping, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# Sublinhas do Balanço e a linha a que pertencem
+BALANCE_SHEET_SUBLINES = {
+    "disponibilidades": "ativo_circulante",
+    "clientes": "ativo_circulante",
+    "estoques": "ativo_circulante",
+    "imobilizado": "ativo_nao_circulante",
+    "fornecedores": "passivo_circulante",
+    "obrigacoes_trabalhistas": "passivo_circulante",
+    "emprestimos_cp": "passivo_circulante",
+    "emprestimos_lp": "passivo_nao_circulante",
+    "capital_social": "patrimonio_liquido",
+    "lucros_acumulados": "patrimonio_liquido",
+}
+
+# Linhas de entrada da DRE; subtotais são derivados
+INCOME_STATEMENT_INPUTS = (
+    "receita_bruta",
+    "deducoes",
+    "custo_mercadorias",
+    "despesas_vendas",
+    "despesas_administrativas",
+    "depreciacao",
+    "receitas_financeiras",
+    "despesas_financeiras",
+    "ir_csll",
+)
+
+LINES = tuple(BALANCE_SHEET_SUBLINES) + INCOME_STATEMENT_INPUTS
+
+# Natureza credora: saldo = crédito - débito; as demais usam débito - crédito
+CREDIT_NATURE = {
+    "fornecedores", "obrigacoes_trabalhistas", "emprestimos_cp", "emprestimos_lp",
+    "capital_social", "lucros_acumulados", "receita_bruta", "receitas_financeiras",
+}
+
+_LINE_INDEX = {line: code for code, line in enumerate(LINES)}
+_SIGNS = np.array([-1.0 if line in CREDIT_NATURE else 1.0 for line in LINES])
+_INCOME_CODES = np.array([_LINE_INDEX[line] for line in INCOME_STATEMENT_INPUTS])
+
+DEFAULT_COMPANY = "default"
+
+
+class LedgerAggregator:
+    """Saldos agregados do razão, atualizados de forma incremental
+
+    ``chart_of_accounts`` associa o código de cada conta a uma das linhas em
+    ``LINES``; pode ser um dicionário ou um DataFrame com colunas ``account``
+    e ``line``. Contas fora do plano são ignoradas e contabilizadas em
+    ``unmapped_entries``/``unmapped_amount``.
+    """
+
+    def __init__(self, chart_of_accounts: Union[Mapping[str, str], pd.DataFrame]):
+        if isinstance(chart_of_accounts, pd.DataFrame):
+            chart_of_accounts = dict(zip(chart_of_accounts["account"].astype(str), chart_of_accounts["line"]))
+
+        unknown = sorted(set(chart_of_accounts.values()) - set(LINES))
+        if unknown:
+            raise ValueError(f"Linhas desconhecidas no plano de contas: {', '.join(unknown)}")
+
+        self._accounts = pd.Index([str(a) for a in chart_of_accounts])
+        # get_indexer devolve -1 para contas fora do plano, que cai no marcador final
+        self._line_by_account = np.array(
+            [_LINE_INDEX[chart_of_accounts[a]] for a in chart_of_accounts] + [-1], dtype=np.int64
+        )
+        self._totals = pd.Series(dtype=np.float64, index=_empty_index())
+        self.entries = 0
+        self.unmapped_entries = 0
+        self.unmapped_amount = 0.0
+
+    def append(self, entries: pd.DataFrame) -> "LedgerAggregator":
+        """Agrega um lote de lançamentos ao estado atual
+
+        Colunas: ``date``, ``account``, ``debit`` e ``credit`` (ou ``amount``
+        com ``side`` D/C) e, opcionalmente, ``company``.
+        """
+        if entries.empty:
+            return self
+
+        # Contas e empresas são fatoradas uma vez por lote; o resto opera sobre códigos inteiros
+        account_codes, accounts = pd.factorize(entries["account"])
+        line_codes = self._line_by_account[self._accounts.get_indexer(accounts.astype(str))][account_codes]
+        net = _net_amounts(entries)
+
+        mapped = line_codes >= 0
+        if not mapped.all():
+            self.unmapped_entries += int((~mapped).sum())
+            self.unmapped_amount += float(np.abs(net[~mapped]).sum())
+
+        if "company" in entries.columns:
+            company_codes, companies = pd.factorize(entries["company"])
+            companies = companies.astype(str)
+        else:
+            company_codes, companies = np.zeros(len(entries), dtype=np.int64), pd.Index([DEFAULT_COMPANY])
+        months = pd.to_datetime(entries["date"]).to_numpy().astype("datetime64[M]")
+
+        batch = pd.DataFrame({
+            "company": company_codes[mapped],
+            "month": months[mapped],
+            "line": line_codes[mapped],
+            "net": net[mapped],
+        })
+        partial = batch.groupby(["company", "month", "line"], sort=False)["net"].sum()
+        partial.index = partial.index.set_levels(companies[partial.index.levels[0]], level="company")
+
+        self._totals = self._totals.add(partial, fill_value=0.0)
+        self.entries += len(entries)
+        return self
+
+    def append_csv(self, path: str, chunk_rows: int = 1_000_000) -> "LedgerAggregator":
+        """Agrega um arquivo CSV de lançamentos lido em blocos"""
+        for chunk in pd.read_csv(path, chunksize=chunk_rows, dtype={"account": str, "company": str}):
+            self.append(chunk)
+        return self
+
+    def companies(self) -> Iterable[str]:
+        return self._totals.index.get_level_values("company").unique().tolist()
+
+    def balance_frame(self, as_of: Optional[str] = None) -> pd.DataFrame:
+        """Balanço de todas as empresas na data (fim do mês de ``as_of``), uma linha por empresa"""
+        totals = self._totals
+        if as_of is not None:
+            totals = totals[totals.index.get_level_values("month") <= np.datetime64(pd.Timestamp(as_of), "M")]
+        by_line = _line_matrix(totals.groupby(level=["company", "line"]).sum())
+
+        balances = by_line * _SIGNS + 0.0  # + 0.0: linhas credoras zeradas saem 0,00, não -0,00
+        # Resultado ainda não encerrado incorporado a Lucros Acumulados
+        result = -(by_line[:, _INCOME_CODES].sum(axis=1))
+        frame = pd.DataFrame(balances[:, :len(BALANCE_SHEET_SUBLINES)], columns=list(BALANCE_SHEET_SUBLINES), index=_companies_of(totals))
+        frame["lucros_acumulados"] += result
+
+        for group in ("ativo_circulante", "ativo_nao_circulante", "passivo_circulante", "passivo_nao_circulante", "patrimonio_liquido"):
+            members = [sub for sub, parent in BALANCE_SHEET_SUBLINES.items() if parent == group]
+            frame[group] = frame[members].sum(axis=1)
+        frame["total_ativo"] = frame["ativo_circulante"] + frame["ativo_nao_circulante"]
+        frame["total_passivo"] = frame["passivo_circulante"] + frame["passivo_nao_circulante"] + frame["patrimonio_liquido"]
+        return frame
+
+    def income_frame(self, start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+        """DRE de todas as empresas entre os meses de ``start`` e ``end`` (inclusive)"""
+        totals = self._totals
+        months = totals.index.get_level_values("month")
+        mask = np.ones(len(totals), dtype=bool)
+        if start is not None:
+            mask &= months >= np.datetime64(pd.Timestamp(start), "M")
+        if end is not None:
+            mask &= months <= np.datetime64(pd.Timestamp(end), "M")
+        totals = totals[mask]
+        by_line = _line_matrix(totals.groupby(level=["company", "line"]).sum())
+
+        values = by_line[:, _INCOME_CODES] * _SIGNS[_INCOME_CODES] + 0.0
+        frame = pd.DataFrame(values, columns=list(INCOME_STATEMENT_INPUTS), index=_companies_of(totals))
+
+        frame["receita_liquida"] = frame["receita_bruta"] - frame["deducoes"]
+        frame["lucro_bruto"] = frame["receita_liquida"] - frame["custo_mercadorias"]
+        frame["resultado_operacional"] = frame["lucro_bruto"] - frame["despesas_vendas"] - frame["despesas_administrativas"] - frame["depreciacao"]
+        frame["resultado_antes_ir"] = frame["resultado_operacional"] + frame["receitas_financeiras"] - frame["despesas_financeiras"]
+        frame["lucro_liquido"] = frame["resultado_antes_ir"] - frame["ir_csll"]
+        return frame[[
+            "receita_bruta", "deducoes", "receita_liquida", "custo_mercadorias", "lucro_bruto",
+            "despesas_vendas", "despesas_administrativas", "depreciacao", "resultado_operacional",
+            "receitas_financeiras", "despesas_financeiras", "resultado_antes_ir", "ir_csll", "lucro_liquido",
+        ]]
+
+    def statements(self, company: str = DEFAULT_COMPANY, as_of: Optional[str] = None, start: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """Dicionários ``balance_sheet`` e ``income_statement`` de uma empresa
+
+        O Balanço é levantado em ``as_of`` e a DRE cobre de ``start`` a ``as_of``.
+        Sem ``start``, a DRE é a do exercício: de janeiro do ano de ``as_of``
+        (ou do último mês com lançamentos, sem ``as_of``) até ``as_of``.
+        """
+        if start is None and len(self._totals):
+            end = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp(self._totals.index.get_level_values("month").max())
+            start = f"{end.year}-01"
+        balance = self.balance_frame(as_of)
+        income = self.income_frame(start, as_of)
+        if company not in balance.index:
+            raise KeyError(f"Empresa '{company}' sem lançamentos")
+        return {
+            "balance_sheet": {k: float(v) for k, v in balance.loc[company].items()},
+            # Sem lançamentos de resultado no período, a DRE sai zerada
+            "income_statement": {k: float(v) for k, v in income.reindex([company], fill_value=0.0).iloc[0].items()},
+        }
+
+
+def _empty_index() -> pd.MultiIndex:
+    return pd.MultiIndex.from_arrays(
+        [np.array([], dtype=object), np.array([], dtype="datetime64[M]"), np.array([], dtype=np.int64)],
+        names=["company", "month", "line"],
+    )
+
+
+def _net_amounts(entries: pd.DataFrame) -> np.ndarray:
+    """Valor líquido de cada lançamento: débito positivo, crédito negativo"""
+    if "debit" in entries.columns or "credit" in entries.columns:
+        debit = entries["debit"].fillna(0).to_numpy(dtype=np.float64) if "debit" in entries.columns else 0.0
+        credit = entries["credit"].fillna(0).to_numpy(dtype=np.float64) if "credit" in entries.columns else 0.0
+        return np.broadcast_to(debit - credit, (len(entries),)).copy()
+    amount = entries["amount"].to_numpy(dtype=np.float64)
+    side = entries["side"].astype(str).str.upper().to_numpy()
+    return np.where(side == "D", amount, -amount)
+
+
+def _companies_of(totals: pd.Series) -> pd.Index:
+    return pd.Index(sorted(totals.index.get_level_values("company").unique()), name="company")
+
+
+def _line_matrix(by_company_line: pd.Series) -> np.ndarray:
+    """Matriz empresa × linha (na ordem de ``LINES``) com os saldos débito - crédito"""
+    companies = _companies_of(by_company_line)
+    matrix = np.zeros((len(companies), len(LINES)))
+    if len(by_company_line):
+        rows = companies.get_indexer(by_company_line.index.get_level_values("company"))
+        cols = by_company_line.index.get_level_values("line").to_numpy()
+        np.add.at(matrix, (rows, cols), by_company_line.to_numpy())
+    return matrix
@@ -0,0 +1,196 @@
+"""Simulação de Monte Carlo vetorizada sobre as linhas da DRE.
+
+Cada linha de entrada da DRE (e do Balanço, para a liquidez) recebe uma
+distribuição. Os sorteios são propagados pela cascata da DRE como arrays
+NumPy, sem laços em Python, e o resultado são as distribuições de
+``margem_liquida``, ``lucro_liquido`` e ``liquidez_corrente``.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Linhas sorteadas; as demais (receita líquida, lucro bruto etc.) são derivadas
+DRE_INPUT_LINES = (
+    "receita_bruta",
+    "deducoes",
+    "custo_mercadorias",
+    "despesas_vendas",
+    "despesas_administrativas",
+    "depreciacao",
+    "receitas_financeiras",
+    "despesas_financeiras",
+)
+
+# Percentis que limitam os histogramas e a média/desvio do resumo: margens e liquidez
+# são razões, e um denominador sorteado perto de zero gera valores extremos que,
+# sem o corte, colocariam quase todos os cenários em uma única faixa
+PERCENTILE_WINDOW = (0.5, 99.5)
+
+BALANCE_INPUT_LINES = (
+    "ativo_circulante",
+    "passivo_circulante",
+)
+
+INPUT_LINES = DRE_INPUT_LINES + BALANCE_INPUT_LINES
+
+OUTPUTS = ("margem_liquida", "lucro_liquido", "liquidez_corrente")
+
+# Especificação de distribuição: (tipo, *parâmetros)
+#   ("constant", valor)
+#   ("normal", média, desvio)
+#   ("uniform", mínimo, máximo)
+#   ("triangular", mínimo, moda, máximo)
+#   ("lognormal", média, desvio)  -- média e desvio na escala original
+Distribution = Tuple
+
+
+def default_distributions(data: Dict[str, Any], cv: float = 0.10) -> Dict[str, Distribution]:
+    """Distribuições normais centradas nos valores da empresa, com coeficiente de variação ``cv``"""
+    values = {**data["income_statement"], **data["balance_sheet"]}
+    return {line: ("normal", values[line], abs(values[line]) * cv) for line in INPUT_LINES}
+
+
+def effective_tax_rate(data: Dict[str, Any]) -> float:
+    """Alíquota efetiva de IRPJ/CSLL sobre o resultado antes do IR"""
+    is_ = data["income_statement"]
+    if is_["resultado_antes_ir"] <= 0:
+        return 0.0
+    return is_["ir_csll"] / is_["resultado_antes_ir"]
+
+
+def sample_line(rng: np.random.Generator, spec: Distribution, n: int) -> np.ndarray:
+    """Sorteia ``n`` valores de uma linha conforme sua distribuição"""
+    kind, *params = spec
+    if kind == "constant":
+        return np.full(n, float(params[0]))
+    if kind == "normal":
+        mean, std = params
+        return rng.normal(mean, std, n)
+    if kind == "uniform":
+        low, high = params
+        return rng.uniform(low, high, n)
+    if kind == "triangular":
+        low, mode, high = params
+        return rng.triangular(low, mode, high, n)
+    if kind == "lognormal":
+        mean, std = params
+        sigma2 = np.log1p((std / mean) ** 2)
+        return rng.lognormal(np.log(mean) - sigma2 / 2, np.sqrt(sigma2), n)
+    raise ValueError(f"Distribuição desconhecida: {kind}")
+
+
+def propagate(samples: Dict[str, np.ndarray], tax_rate: float) -> Dict[str, np.ndarray]:
+    """Propaga os sorteios pela cascata da DRE e calcula os indicadores"""
+    receita_liquida = samples["receita_bruta"] - samples["deducoes"]
+    resultado_antes_ir = receita_liquida - samples["custo_mercadorias"]
+    resultado_antes_ir -= samples["despesas_vendas"]
+    resultado_antes_ir -= samples["despesas_administrativas"]
+    resultado_antes_ir -= samples["depreciacao"]
+    resultado_antes_ir += samples["receitas_financeiras"]
+    resultado_antes_ir -= samples["despesas_financeiras"]
+
+    # IR/CSLL só incide sobre resultado positivo
+    lucro_liquido = resultado_antes_ir - np.maximum(resultado_antes_ir, 0.0) * tax_rate
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margem_liquida = lucro_liquido / receita_liquida * 100
+        liquidez_corrente = samples["ativo_circulante"] / samples["passivo_circulante"]
+
+    return {
+        "margem_liquida": margem_liquida,
+        "lucro_liquido": lucro_liquido,
+        "liquidez_corrente": liquidez_corrente,
+    }
+
+
+def _simulate_chunk(distributions: Dict[str, Distribution], tax_rate: float, n: int, seed) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    samples = {line: sample_line(rng, distributions[line], n) for line in INPUT_LINES}
+    return propagate(samples, tax_rate)
+
+
+def simulate(
+    data: Dict[str, Any],
+    distributions: Optional[Dict[str, Distribution]] = None,
+    n_draws: int = 1_000_000,
+    seed: Optional[int] = None,
+    processes: Optional[int] = None,
+    chunk_size: int = 250_000,
+) -> Dict[str, np.ndarray]:
+    """Executa a simulação e retorna um array de ``n_draws`` valores por indicador
+
+    Com ``processes`` > 1, os sorteios são divididos em blocos de ``chunk_size``
+    e distribuídos em um pool de processos, cada bloco com sua própria semente
+    derivada de ``seed`` (o resultado é reprodutível para a mesma divisão).
+    """
+    dists = default_distributions(data)
+    if distributions:
+        dists.update(distributions)
+    tax_rate = effective_tax_rate(data)
+
+    if not processes or processes <= 1:
+        return _simulate_chunk(dists, tax_rate, n_draws, seed)
+
+    sizes = [chunk_size] * (n_draws // chunk_size)
+    if n_draws % chunk_size:
+        sizes.append(n_draws % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    workers = min(processes, len(sizes), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunks = list(pool.map(_simulate_chunk, [dists] * len(sizes), [tax_rate] * len(sizes), sizes, seeds))
+
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in OUTPUTS}
+
+
+def _window(finite: np.ndarray, window: Tuple[float, float] = None) -> Tuple[float, float]:
+    low, high = np.percentile(finite, window or PERCENTILE_WINDOW)
+    return float(low), float(high)
+
+
+def summarize(results: Dict[str, np.ndarray], percentiles: Sequence[float] = (5, 25, 50, 75, 95)) -> Dict[str, Dict[str, float]]:
+    """Estatísticas descritivas de cada indicador simulado
+
+    Média e desvio são calculados só dentro de ``PERCENTILE_WINDOW``
+    (``media_aparada`` e ``desvio_aparado``); ``fora_da_janela`` é a fração
+    dos sorteios que ficou de fora.
+    """
+    summary = {}
+    for name, values in results.items():
+        finite = values[np.isfinite(values)]
+        pct = np.percentile(finite, percentiles)
+        low, high = _window(finite)
+        inside = (finite >= low) & (finite <= high)
+        trimmed = finite[inside]
+        summary[name] = {
+            "media_aparada": float(trimmed.mean()),
+            "desvio_aparado": float(trimmed.std()),
+            **{f"p{int(p)}": float(v) for p, v in zip(percentiles, pct)},
+            "prob_negativo": float((finite < 0).mean()),
+            "fora_da_janela": float(1 - inside.mean()),
+        }
+    return summary
+
+
+def histograms(results: Dict[str, np.ndarray], bins: int = 60) -> Dict[str, Dict[str, Any]]:
+    """Histogramas dos indicadores, para exibição sem enviar todos os sorteios ao navegador
+
+    As faixas cobrem só ``PERCENTILE_WINDOW`` dos sorteios; ``below`` e
+    ``above`` contam os que ficaram abaixo e acima do gráfico, e ``total``
+    inclui todos os sorteios finitos.
+    """
+    hist = {}
+    for name, values in results.items():
+        finite = values[np.isfinite(values)]
+        low, high = _window(finite)
+        counts, edges = np.histogram(finite, bins=bins, range=(low, high))
+        hist[name] = {
+            "counts": counts,
+            "edges": edges,
+            "below": int((finite < low).sum()),
+            "above": int((finite > high).sum()),
+            "total": int(len(finite)),
+        }
+    return hist
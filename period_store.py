@@ -0,0 +1,278 @@
+"""Histórico de períodos das demonstrações, em Parquet, e análises temporais.
+
+Cada empresa tem um diretório próprio (``company=<id>``, no estilo Hive) com
+um arquivo Parquet por gravação. Acrescentar períodos cria só um arquivo novo:
+os anteriores nunca são reescritos. Se um período já gravado for enviado de
+novo com outros valores (uma republicação), a gravação mais recente prevalece
+na leitura; envios idênticos ao que já está gravado são ignorados.
+
+As análises recebem o DataFrame largo de ``PeriodStore.read`` (uma linha por
+período, uma coluna por linha das demonstrações) -- ou de
+``PeriodStore.read_all``, com índice ``(company, period)`` -- e calculam
+todos os períodos de uma vez, sem laços por período.
+"""
+import os
+import time
+import uuid
+from typing import Dict, Any, List, Optional, Union
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+from data_sources import BALANCE_SHEET_LINES, INCOME_STATEMENT_LINES
+from indicators import compute_indicators
+
+STATEMENT_LINES = BALANCE_SHEET_LINES + INCOME_STATEMENT_LINES
+WRITTEN_AT_COLUMN = "_written_at"
+
+
+class PeriodStore:
+    """Períodos das demonstrações por empresa, em arquivos Parquet só acrescentados"""
+
+    def __init__(self, root: str):
+        if not PARQUET_AVAILABLE:
+            raise ImportError("pyarrow é necessário para o histórico de períodos")
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _company_dir(self, company: str) -> str:
+        return os.path.join(self.root, f"company={quote(str(company), safe='')}")
+
+    def companies(self) -> List[str]:
+        return sorted(
+            unquote(name.split("=", 1)[1]) for name in os.listdir(self.root)
+            if name.startswith("company=") and os.path.isdir(os.path.join(self.root, name))
+        )
+
+    def version(self, company: str) -> str:
+        """Identifica o conteúdo gravado da empresa (muda a cada gravação), para chaves de cache"""
+        directory = self._company_dir(company)
+        if not os.path.isdir(directory):
+            return ""
+        return ",".join(sorted(name for name in os.listdir(directory) if name.endswith(".parquet")))
+
+    def append(self, company: str, statements: Union[pd.DataFrame, Dict[str, Any]], period: Optional[str] = None) -> int:
+        """Grava os períodos novos ou alterados em um novo arquivo e devolve quantos foram gravados
+
+        ``statements`` é um DataFrame largo indexado por período ou um dicionário no
+        formato de ALPHA_DATA (o período vem de ``period`` ou de ``company_info["period"]``).
+        """
+        frame = _as_period_frame(statements, period)
+        stored = self.read(company)
+        if not stored.empty:
+            # Só o que ainda não está gravado com os mesmos valores
+            common = frame.index.intersection(stored.index)
+            same = (frame.loc[common].to_numpy() == stored.loc[common, list(STATEMENT_LINES)].to_numpy()).all(axis=1)
+            frame = frame.drop(common[same])
+        if frame.empty:
+            return 0
+
+        directory = self._company_dir(company)
+        os.makedirs(directory, exist_ok=True)
+        written_at = time.time_ns()
+        table = pa.Table.from_pandas(frame.assign(**{WRITTEN_AT_COLUMN: written_at}).reset_index(), preserve_index=False)
+        name = f"part-{written_at:020d}-{uuid.uuid4().hex[:8]}.parquet"
+        path = os.path.join(directory, name)
+        tmp_path = os.path.join(directory, f".{name}.tmp")  # arquivos com "." são ignorados pelo pyarrow
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)  # leitores nunca veem um arquivo pela metade
+        return len(frame)
+
+    def read(self, company: str) -> pd.DataFrame:
+        """Períodos da empresa, em ordem cronológica, com a gravação mais recente de cada um"""
+        directory = self._company_dir(company)
+        files = sorted(name for name in os.listdir(directory) if name.endswith(".parquet")) if os.path.isdir(directory) else []
+        if not files:
+            return pd.DataFrame(columns=list(STATEMENT_LINES), index=pd.Index([], name="period"), dtype=np.float64)
+        frame = pd.concat(pq.read_table(os.path.join(directory, name)).to_pandas() for name in files)
+        return _latest_versions(frame, ["period"])
+
+    def read_all(self) -> pd.DataFrame:
+        """Todas as empresas, indexadas por ``(company, period)``"""
+        if not self.companies():
+            return pd.DataFrame(
+                columns=list(STATEMENT_LINES), dtype=np.float64,
+                index=pd.MultiIndex.from_arrays([[], []], names=["company", "period"]),
+            )
+        frame = pq.read_table(self.root, partitioning="hive").to_pandas()
+        frame["company"] = frame["company"].astype(str)
+        return _latest_versions(frame, ["company", "period"])
+
+    def periods(self, company: str) -> List[str]:
+        return list(self.read(company).index)
+
+
+def _as_period_frame(statements: Union[pd.DataFrame, Dict[str, Any]], period: Optional[str]) -> pd.DataFrame:
+    if isinstance(statements, dict):
+        period = period or statements.get("company_info", {}).get("period")
+        if not period:
+            raise ValueError("Informe o período das demonstrações")
+        row = {**statements["balance_sheet"], **statements["income_statement"]}
+        frame = pd.DataFrame([row], index=pd.Index([str(period)], name="period"))
+    else:
+        frame = statements.copy()
+        if "period" in frame.columns:
+            frame = frame.set_index("period")
+        elif "period" in (frame.index.names or []) and frame.index.nlevels > 1:
+            frame = frame.droplevel([name for name in frame.index.names if name != "period"])
+        frame.index = frame.index.astype(str).rename("period")
+    if frame.index.has_duplicates:
+        raise ValueError("Períodos repetidos nas demonstrações")
+    return frame.reindex(columns=list(STATEMENT_LINES)).astype(np.float64).fillna(0.0)
+
+
+def _latest_versions(frame: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    frame["period"] = frame["period"].astype(str)
+    frame = frame.sort_values(WRITTEN_AT_COLUMN, kind="stable").drop_duplicates(keys, keep="last")
+    frame = frame.set_index(keys)[list(STATEMENT_LINES)]
+    return sort_periods(frame)
+
+
+# Períodos ----------------------------------------------------------------
+
+def parse_period(label: str) -> pd.Period:
+    """``pd.Period`` de um rótulo como ``2024``, ``2024Q1``, ``2024-03`` ou ``2024-03-31``"""
+    try:
+        return pd.Period(label)
+    except (ValueError, TypeError):
+        raise ValueError(f"Período não reconhecido como data: '{label}'") from None
+
+
+def _period_or_none(label: str) -> Optional[pd.Period]:
+    try:
+        return parse_period(label)
+    except ValueError:
+        return None
+
+
+def sort_periods(frame: pd.DataFrame) -> pd.DataFrame:
+    """Ordena os períodos cronologicamente (por empresa, se houver); rótulos que não são datas ficam em ordem alfabética"""
+    labels = frame.index.get_level_values("period")
+    try:
+        starts = {label: parse_period(label).start_time for label in labels.unique()}
+    except ValueError:
+        return frame.sort_index()
+    keys = [labels.map(starts).to_numpy()]
+    if "company" in frame.index.names:
+        keys.append(pd.factorize(frame.index.get_level_values("company"), sort=True)[0])
+    return frame.iloc[np.lexsort(keys)]  # a última chave é a principal
+
+
+def _groups(frame: pd.DataFrame):
+    """Agrupamento por empresa quando o índice tem ``company``; senão, o histórico inteiro é um grupo"""
+    if "company" in frame.index.names:
+        return frame.groupby(level="company", sort=False)
+    return frame.groupby(np.zeros(len(frame), dtype=np.int8), sort=False)
+
+
+# Análises ----------------------------------------------------------------
+
+def vertical_analysis(frame: pd.DataFrame) -> pd.DataFrame:
+    """Cada linha do Balanço em % do Ativo Total e cada linha da DRE em % da Receita Líquida"""
+    result = pd.DataFrame(index=frame.index)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        total_ativo = frame["total_ativo"].to_numpy(dtype=np.float64)[:, None]
+        receita = frame["receita_liquida"].to_numpy(dtype=np.float64)[:, None]
+        bs = [line for line in BALANCE_SHEET_LINES if line in frame.columns]
+        dre = [line for line in INCOME_STATEMENT_LINES if line in frame.columns]
+        result[bs] = frame[bs].to_numpy(dtype=np.float64) / total_ativo * 100
+        result[dre] = frame[dre].to_numpy(dtype=np.float64) / receita * 100
+    return result
+
+
+def horizontal_analysis(frame: pd.DataFrame, base_period: Optional[str] = None) -> pd.DataFrame:
+    """Números-índice de cada linha: o período base (o primeiro, se não informado) vale 100"""
+    values = frame[[line for line in STATEMENT_LINES if line in frame.columns]]
+    if base_period is None:
+        base = _groups(values).transform("first")
+    else:
+        if "company" in values.index.names:
+            base = values.xs(str(base_period), level="period").reindex(values.index.get_level_values("company"))
+            base.index = values.index
+        else:
+            base = values.loc[str(base_period)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return values / base * 100
+
+
+def period_indicators(frame: pd.DataFrame) -> pd.DataFrame:
+    """Indicadores de todos os períodos, em uma única chamada do motor vetorizado"""
+    return compute_indicators(frame)
+
+
+def rolling_indicators(frame: pd.DataFrame, window: int = 4) -> pd.DataFrame:
+    """Indicadores com a DRE acumulada nos últimos ``window`` períodos (ex.: 12 meses com trimestres)
+
+    As linhas do Balanço são saldos e ficam com o valor do fim de cada janela.
+    Os períodos sem ``window`` anteriores disponíveis (da mesma empresa) ficam
+    ``NaN``, assim como as janelas com lacunas: com um trimestre faltando, as
+    4 linhas anteriores cobririam mais de 12 meses. Rótulos que não são datas
+    não permitem achar lacunas e são contados por linha.
+    """
+    if window < 1:
+        raise ValueError("window deve ser positivo")
+    flows = [line for line in INCOME_STATEMENT_LINES if line in frame.columns]
+    summed = frame.copy()
+    summed[flows] = frame[flows].rolling(window, min_periods=window).sum()
+    # A janela corrida passa por cima da troca de empresa; descarta as que misturam empresas
+    incomplete = _groups(frame).cumcount().to_numpy() < window - 1
+    incomplete |= _spans_gap(frame.index.get_level_values("period"), window)
+    result = compute_indicators(summed)
+    result.loc[incomplete] = np.nan
+    return result
+
+
+def _spans_gap(labels: pd.Index, window: int) -> np.ndarray:
+    """Linhas cuja janela de ``window`` linhas cobre mais que ``window`` períodos consecutivos"""
+    gap = np.zeros(len(labels), dtype=bool)
+    if window < 2 or len(labels) < window:
+        return gap
+    codes, unique = pd.factorize(labels)
+    periods = [_period_or_none(label) for label in unique]
+    # Posição de cada período na sua frequência (2024Q1 -> 216); NaN para rótulos que não são datas
+    ordinal = np.array([np.nan if p is None else p.ordinal for p in periods], dtype=np.float64)[codes]
+    freq = np.array(["" if p is None else p.freqstr for p in periods], dtype=object)[codes]
+    first, last = np.arange(len(labels) - window + 1), np.arange(window - 1, len(labels))
+    dated = ~np.isnan(ordinal[first]) & ~np.isnan(ordinal[last])
+    gap[last] = dated & ((ordinal[last] - ordinal[first] != window - 1) | (freq[last] != freq[first]))
+    return gap
+
+
+def year_over_year(frame: pd.DataFrame, relative: bool = True) -> pd.DataFrame:
+    """Variação de cada coluna em relação ao mesmo período do ano anterior
+
+    Os períodos são alinhados pela data (``2025Q1`` com ``2024Q1``, ``2025-03``
+    com ``2024-03``), não pela posição, então lacunas no histórico não
+    deslocam a comparação. Com ``relative=False``, devolve a diferença
+    absoluta (útil para indicadores já em %, como as margens). Períodos com
+    rótulos que não são datas (``1º tri/2024``) não têm ano anterior e ficam
+    ``NaN``.
+    """
+    codes, labels = pd.factorize(frame.index.get_level_values("period"))
+    # Um número por período distinto; o ano anterior só existe se estiver no histórico
+    periods = [_period_or_none(label) for label in labels]
+    lookup = {period: code for code, period in enumerate(periods) if period is not None}
+    previous_code = np.array([
+        -1 if period is None else lookup.get((period.start_time - pd.DateOffset(years=1)).to_period(period.freq), -1)
+        for period in periods
+    ], dtype=np.int64)[codes]
+    if "company" in frame.index.names:
+        companies = pd.factorize(frame.index.get_level_values("company"))[0]
+    else:
+        companies = np.zeros(len(frame), dtype=np.int64)
+    current_key = companies * len(labels) + codes
+    position = pd.Index(current_key).get_indexer(np.where(previous_code >= 0, companies * len(labels) + previous_code, -1))
+
+    values = frame.to_numpy(dtype=np.float64)
+    previous = np.where((position >= 0)[:, None], values[position], np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = (values - previous) / np.abs(previous) * 100 if relative else values - previous
+    return pd.DataFrame(change, index=frame.index, columns=frame.columns)
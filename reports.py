@@ -0,0 +1,477 @@
+"""Geração de relatórios em lote, sem o Streamlit.
+
+Para cada empresa de um arquivo de demonstrações (CSV, Parquet ou SPED-ECD,
+lido por ``data_sources``) gera um relatório HTML, XLSX e/ou PDF com o
+Balanço, a DRE, os indicadores e as figuras do app. As empresas são enviadas
+em lotes a um pool de processos e o progresso é exibido no terminal.
+
+Cada relatório concluído é registrado em ``manifest.jsonl`` com o hash das
+demonstrações. Ao repetir o comando (por exemplo, depois de uma interrupção),
+empresas já geradas com os mesmos dados são puladas e só os formatos que
+faltam são produzidos. Os arquivos são gravados de forma atômica, então uma
+interrupção nunca deixa um relatório pela metade.
+
+O HTML referencia ``plotly.min.js`` e ``app.css``, copiados uma única vez
+para a pasta de saída. XLSX requer ``openpyxl`` (ou ``xlsxwriter``); PDF
+requer ``kaleido`` (figuras em SVG) e ``weasyprint``.
+
+Uso:
+    python reports.py dados/empresas.csv -o relatorios --formats html,xlsx --workers 8
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Any, Iterable, List, Optional, Sequence, Tuple
+
+from analysis import (
+    BALANCE_SHEET_LAYOUT, BALANCE_SHEET_SUBLINE_LABELS, DRE_LINES, INDICATOR_LABELS,
+    build_indicators, format_brl, format_indicator, get_status_class, module_available, statements_version,
+)
+
+FORMATS = ("html", "xlsx", "pdf")
+
+MANIFEST_FILE = "manifest.jsonl"
+FAILURES_FILE = "falhas.jsonl"
+CSS_FILE = "app.css"
+
+# Figuras incluídas nos relatórios, na ordem das seções do app. O mapa de
+# cenários de liquidez fica de fora: é igual para todas as empresas e é o
+# maior dos gráficos.
+REPORT_FIGURES = (
+    "balance_sheet",
+    "dre_waterfall",
+    "margins",
+    "revenue_composition",
+    "cost_structure",
+    "financing_structure",
+    "radar",
+)
+
+DEFAULT_CHUNK_SIZE = 16
+
+# Estilos próprios do relatório, somados a app.css
+REPORT_CSS = """
+body { max-width: 1100px; margin: 2rem auto; padding: 0 1rem; font-family: 'Inter', sans-serif; color: #1E293B; }
+.report-grid { display: grid; grid-template-columns: repeat(auto-fill, minmax(320px, 1fr)); gap: 1rem; }
+.data-table { width: 100%; }
+.data-table td.value { text-align: right; white-space: nowrap; }
+.data-table tr.subline td { padding-left: 1.5rem; color: #475569; }
+.data-table tr.total td { font-weight: 700; }
+.figure { page-break-inside: avoid; margin: 1rem 0; }
+.figure svg { width: 100%; height: auto; }
+footer { margin-top: 2rem; color: #64748B; font-size: 0.8rem; }
+"""
+
+
+def check_formats(formats: Sequence[str]):
+    """Valida os formatos pedidos e suas dependências antes de iniciar o lote"""
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown:
+        raise ValueError(f"Formatos desconhecidos: {', '.join(unknown)} (use {', '.join(FORMATS)})")
+    if not formats:
+        raise ValueError("Nenhum formato informado")
+    if "xlsx" in formats and not (module_available("openpyxl") or module_available("xlsxwriter")):
+        raise ValueError("Relatórios XLSX requerem o pacote openpyxl ou xlsxwriter")
+    if "pdf" in formats:
+        if not module_available("kaleido"):
+            raise ValueError("Relatórios PDF requerem o pacote kaleido para exportar as figuras")
+        try:
+            import weasyprint  # noqa: F401
+        except (ImportError, OSError) as e:
+            raise ValueError(f"Relatórios PDF requerem o weasyprint e suas bibliotecas de sistema: {e}") from None
+
+
+def report_stem(company: str) -> str:
+    """Nome de arquivo seguro para a empresa; nomes alterados ganham um sufixo para não colidir"""
+    stem = re.sub(r"[^\w.-]+", "_", str(company)).strip("._") or "empresa"
+    if stem != str(company):
+        stem += "-" + hashlib.sha256(str(company).encode("utf-8")).hexdigest()[:8]
+    return stem
+
+
+def render_html(data: Dict[str, Any], indicators: Dict[str, Dict[str, Any]], figures: Iterable[str], plotly_js: Optional[str] = None) -> str:
+    """Documento HTML do relatório
+
+    ``figures`` são os trechos HTML (ou SVG) de cada figura; ``plotly_js`` é o
+    caminho relativo do plotly.js, omitido quando as figuras são estáticas.
+    """
+    info = data.get("company_info", {})
+    bs = data["balance_sheet"]
+    is_ = data["income_statement"]
+    name = html.escape(info.get("name", ""))
+
+    cards = "".join(f"""
+    <div class="metric-card">
+        <div class="metric-title">{INDICATOR_LABELS[key]}</div>
+        <div class="metric-value {get_status_class(key, ind["value"])}">{html.escape(format_indicator(key, ind["value"]))}</div>
+        <div class="metric-interpretation">{html.escape(ind["interpretation"])}</div>
+        <hr>
+        <strong>Fórmula:</strong> {html.escape(ind["formula"])}<br>
+        <strong>Cálculo:</strong> {html.escape(ind["calculation"])}
+    </div>""" for key, ind in indicators.items())
+
+    dre = "".join(
+        f'<tr class="{"total" if label.startswith("(=)") else ""}"><td>{html.escape(label)}</td><td class="value">{format_brl(is_[key])}</td></tr>'
+        for label, key in DRE_LINES
+    )
+
+    figures_html = "".join(f'<div class="figure">{figure}</div>' for figure in figures)
+    script = f'<script src="{plotly_js}"></script>' if plotly_js else ""
+    details = " · ".join(html.escape(info[key]) for key in ("segment", "size", "period") if info.get(key))
+
+    return f"""<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<title>Análise Financeira - {name}</title>
+<link rel="stylesheet" href="{CSS_FILE}">
+<style>{REPORT_CSS}</style>
+{script}
+</head>
+<body>
+<h1 class="main-header">{name}</h1>
+<p class="sub-header">{details}</p>
+<h2>📊 Demonstrações Contábeis</h2>
+<div class="report-grid">
+<table class="data-table"><tr><th colspan="2">ATIVO</th></tr>{_balance_rows(bs, "ativo")}</table>
+<table class="data-table"><tr><th colspan="2">PASSIVO + PL</th></tr>{_balance_rows(bs, "passivo")}</table>
+</div>
+<h3>Demonstração do Resultado do Exercício</h3>
+<table class="data-table">{dre}</table>
+<h2>📈 Indicadores</h2>
+<div class="report-grid">{cards}</div>
+<h2>🎯 Gráficos</h2>
+{figures_html}
+<footer>Adm Academy - Análise Financeira · gerado em {time.strftime("%d/%m/%Y %H:%M")}</footer>
+</body>
+</html>
+"""
+
+
+def _balance_rows(bs: Dict[str, Any], side: str) -> str:
+    groups, (total, total_label) = BALANCE_SHEET_LAYOUT[side]
+    rows = []
+    for line, label, sublines in groups:
+        rows.append(f'<tr class="total"><td>{label}</td><td class="value">{format_brl(bs[line])}</td></tr>')
+        rows += [
+            f'<tr class="subline"><td>{BALANCE_SHEET_SUBLINE_LABELS[key]}</td><td class="value">{format_brl(bs[key])}</td></tr>'
+            for key in sublines if key in bs
+        ]
+    rows.append(f'<tr class="total"><td>{total_label}</td><td class="value">{format_brl(bs[total])}</td></tr>')
+    return "".join(rows)
+
+
+def write_xlsx(data: Dict[str, Any], indicators: Dict[str, Dict[str, Any]], path: str):
+    """Planilha com as abas Balanço, DRE e Indicadores"""
+    import pandas as pd
+    from indicators import STATUS_LABELS, status_code
+
+    bs = data["balance_sheet"]
+    balance = []
+    for side in ("ativo", "passivo"):
+        groups, (total, total_label) = BALANCE_SHEET_LAYOUT[side]
+        for line, label, sublines in groups:
+            balance.append((label, bs[line]))
+            balance += [(f"  {BALANCE_SHEET_SUBLINE_LABELS[key]}", bs[key]) for key in sublines if key in bs]
+        balance.append((total_label, bs[total]))
+
+    is_ = data["income_statement"]
+    indicator_rows = [
+        (INDICATOR_LABELS[key], ind["value"], STATUS_LABELS[status_code(key, ind["value"])],
+         ind["formula"], ind["calculation"], ind["interpretation"])
+        for key, ind in indicators.items()
+    ]
+
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame(balance, columns=["Item", "Valor"]).to_excel(writer, sheet_name="Balanço", index=False)
+        pd.DataFrame([(label, is_[key]) for label, key in DRE_LINES], columns=["Item", "Valor"]).to_excel(writer, sheet_name="DRE", index=False)
+        pd.DataFrame(indicator_rows, columns=["Indicador", "Valor", "Status", "Fórmula", "Cálculo", "Interpretação"]).to_excel(writer, sheet_name="Indicadores", index=False)
+
+
+def generate_report(data: Dict[str, Any], output_dir: str, stem: str, formats: Sequence[str], plotly_js: Optional[str] = None) -> Dict[str, str]:
+    """Gera os formatos pedidos para uma empresa e devolve ``{formato: arquivo}``"""
+    from figures import FIGURE_BUILDERS
+
+    indicators = build_indicators(data)
+    figures = [FIGURE_BUILDERS[name](data) for name in REPORT_FIGURES]
+    files = {}
+
+    if "html" in formats:
+        snippets = [fig.to_html(full_html=False, include_plotlyjs=False, config={"displaylogo": False}) for fig in figures]
+        files["html"] = _write_atomic(output_dir, f"{stem}.html", render_html(data, indicators, snippets, plotly_js).encode("utf-8"))
+
+    if "xlsx" in formats:
+        files["xlsx"] = _write_atomic(output_dir, f"{stem}.xlsx", writer=lambda path: write_xlsx(data, indicators, path))
+
+    if "pdf" in formats:
+        import weasyprint
+
+        svgs = [fig.to_image(format="svg").decode("utf-8") for fig in figures]
+        document = weasyprint.HTML(string=render_html(data, indicators, svgs), base_url=output_dir)
+        files["pdf"] = _write_atomic(output_dir, f"{stem}.pdf", writer=document.write_pdf)
+
+    return files
+
+
+def _write_atomic(output_dir: str, name: str, content: Optional[bytes] = None, writer: Optional[Callable[[str], Any]] = None) -> str:
+    """Grava em um arquivo temporário e renomeia: o arquivo final nunca fica incompleto"""
+    path = os.path.join(output_dir, name)
+    tmp_path = f"{path}.{os.getpid()}.tmp{os.path.splitext(name)[1]}"
+    try:
+        if writer is None:
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+        else:
+            writer(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return name
+
+
+def _render_chunk(output_dir: str, plotly_js: Optional[str], tasks: List[Tuple[str, str, Dict[str, Any], Tuple[str, ...]]]) -> List[Dict[str, Any]]:
+    """Executado nos processos do pool: gera os relatórios de um lote de empresas
+
+    Uma falha fica restrita à empresa e é devolvida como ``error``, sem
+    interromper o restante do lote.
+    """
+    results = []
+    for company, version, data, formats in tasks:
+        try:
+            files = generate_report(data, output_dir, report_stem(company), formats, plotly_js)
+            results.append({"company": company, "version": version, "files": files})
+        except Exception as e:
+            results.append({"company": company, "version": version, "error": f"{type(e).__name__}: {e}"})
+    return results
+
+
+def load_manifest(output_dir: str) -> Dict[str, Dict[str, Any]]:
+    """Último registro de cada empresa em ``manifest.jsonl``"""
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    done: Dict[str, Dict[str, Any]] = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # linha truncada por uma interrupção
+            previous = done.get(entry["company"])
+            if previous is not None and previous["version"] == entry["version"]:
+                entry["files"] = {**previous["files"], **entry["files"]}
+            done[entry["company"]] = entry
+    return done
+
+
+def missing_formats(entry: Optional[Dict[str, Any]], version: str, formats: Sequence[str], output_dir: str) -> Tuple[str, ...]:
+    """Formatos ainda não gerados para os dados atuais da empresa"""
+    if entry is None or entry["version"] != version:
+        return tuple(formats)
+    return tuple(
+        fmt for fmt in formats
+        if fmt not in entry["files"] or not os.path.exists(os.path.join(output_dir, entry["files"][fmt]))
+    )
+
+
+class Progress:
+    """Linha de progresso no terminal, atualizada no máximo a cada ``interval`` segundos"""
+
+    def __init__(self, total: int, stream=sys.stderr, interval: float = 0.5):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.stream = stream
+        self.interval = interval
+        self.started = time.monotonic()
+        self._last = 0.0
+
+    def update(self, done: int = 0, failed: int = 0):
+        self.done += done
+        self.failed += failed
+        now = time.monotonic()
+        if now - self._last >= self.interval or self.done + self.failed >= self.total:
+            self._last = now
+            self.stream.write("\r" + self.line(now))
+            self.stream.flush()
+
+    def line(self, now: Optional[float] = None) -> str:
+        elapsed = (now or time.monotonic()) - self.started
+        finished = self.done + self.failed
+        rate = finished / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - finished) / rate if rate > 0 else float("nan")
+        pct = finished / self.total * 100 if self.total else 100.0
+        eta_text = time.strftime("%H:%M:%S", time.gmtime(eta)) if eta == eta else "--:--:--"
+        return f"[{finished}/{self.total}] {pct:5.1f}% · {rate:.1f} relatórios/s · restante {eta_text} · falhas {self.failed}"
+
+    def close(self):
+        self.stream.write("\n")
+        self.stream.flush()
+
+
+def run_batch(
+    source: str,
+    output_dir: str,
+    formats: Sequence[str] = ("html",),
+    companies: Optional[Sequence[str]] = None,
+    period: Optional[str] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    force: bool = False,
+    progress: Optional[Progress] = None,
+) -> Dict[str, int]:
+    """Gera os relatórios de todas as empresas de ``source`` e devolve as contagens
+
+    Empresas já registradas no manifesto com os mesmos dados são puladas,
+    salvo com ``force``. Falhas são gravadas em ``falhas.jsonl``.
+    """
+    from data_sources import load_statements, to_alpha_data
+
+    formats = tuple(dict.fromkeys(formats))
+    check_formats(formats)
+    os.makedirs(output_dir, exist_ok=True)
+
+    frame = load_statements(source, companies=companies)
+    available = frame.index.get_level_values("company").unique().tolist()
+    if companies is not None:
+        not_found = sorted(set(map(str, companies)) - set(available))
+        if not_found:
+            raise ValueError(f"Empresas não encontradas em '{source}': {', '.join(not_found[:10])}")
+
+    plotly_js = _copy_static_files(output_dir) if "html" in formats else None
+    done = {} if force else load_manifest(output_dir)
+    counts = {"total": len(available), "skipped": 0, "generated": 0, "failed": 0}
+
+    with open(os.path.join(output_dir, MANIFEST_FILE), "a", encoding="utf-8") as manifest, \
+            open(os.path.join(output_dir, FAILURES_FILE), "a", encoding="utf-8") as failures:
+
+        def record(results: List[Dict[str, Any]]) -> Tuple[int, int]:
+            ok = failed = 0
+            for result in results:
+                if "error" in result:
+                    failures.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    failed += 1
+                else:
+                    manifest.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    ok += 1
+            manifest.flush()
+            failures.flush()
+            counts["generated"] += ok
+            counts["failed"] += failed
+            return ok, failed
+
+        tasks = []
+        for company in available:
+            try:
+                data = to_alpha_data(frame, company, period)
+            except KeyError as e:
+                record([{"company": company, "version": None, "error": f"KeyError: {e}"}])
+                continue
+            version = statements_version(data)
+            todo = missing_formats(done.get(company), version, formats, output_dir)
+            if todo:
+                tasks.append((company, version, data, todo))
+            else:
+                counts["skipped"] += 1
+        if not tasks:
+            return counts
+
+        progress = progress or Progress(len(tasks))
+        chunks = iter([tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)])
+        workers = workers or os.cpu_count() or 1
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Poucos lotes em voo por processo: memória limitada mesmo com milhares de empresas
+            pending = set()
+            while True:
+                for chunk in chunks:
+                    pending.add(pool.submit(_render_chunk, output_dir, plotly_js, chunk))
+                    if len(pending) >= workers * 2:
+                        break
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    progress.update(*record(future.result()))
+
+    progress.close()
+    return counts
+
+
+def _copy_static_files(output_dir: str) -> str:
+    """Copia ``app.css`` e o plotly.js (com a versão no nome) para a pasta de saída"""
+    import plotly
+    from plotly.offline import get_plotlyjs
+    from static_assets import ASSETS_DIR, CSS_FILE as SOURCE_CSS
+
+    with open(os.path.join(ASSETS_DIR, SOURCE_CSS), "rb") as f:
+        _write_if_changed(output_dir, CSS_FILE, f.read())
+
+    plotly_js = f"plotly-{plotly.__version__}.min.js"
+    if not os.path.exists(os.path.join(output_dir, plotly_js)):
+        _write_atomic(output_dir, plotly_js, get_plotlyjs().encode("utf-8"))
+    return plotly_js
+
+
+def _write_if_changed(output_dir: str, name: str, content: bytes):
+    path = os.path.join(output_dir, name)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            if f.read() == content:
+                return
+    _write_atomic(output_dir, name, content)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Gera relatórios de análise financeira em lote")
+    parser.add_argument("source", help="arquivo de demonstrações (CSV, Parquet ou SPED-ECD)")
+    parser.add_argument("-o", "--output", default="relatorios", help="pasta de saída (padrão: relatorios)")
+    parser.add_argument("--formats", default="html", help=f"formatos separados por vírgula: {', '.join(FORMATS)}")
+    parser.add_argument("--companies", help="empresas separadas por vírgula (padrão: todas)")
+    parser.add_argument("--companies-file", help="arquivo com uma empresa por linha")
+    parser.add_argument("--period", help="período das demonstrações (padrão: o mais recente de cada empresa)")
+    parser.add_argument("--workers", type=int, default=None, help="processos em paralelo (padrão: número de CPUs)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="empresas por tarefa enviada ao pool")
+    parser.add_argument("--force", action="store_true", help="gera novamente relatórios já registrados no manifesto")
+    args = parser.parse_args(argv)
+
+    companies = None
+    if args.companies:
+        companies = [c.strip() for c in args.companies.split(",") if c.strip()]
+    if args.companies_file:
+        with open(args.companies_file, encoding="utf-8") as f:
+            companies = (companies or []) + [line.strip() for line in f if line.strip()]
+
+    try:
+        counts = run_batch(
+            args.source,
+            args.output,
+            formats=[fmt.strip() for fmt in args.formats.split(",") if fmt.strip()],
+            companies=companies,
+            period=args.period,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            force=args.force,
+        )
+    except (ValueError, KeyError, OSError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    print(
+        f"{counts['generated']} gerados, {counts['skipped']} já existentes, "
+        f"{counts['failed']} falhas (de {counts['total']} empresas) em {args.output}"
+    )
+    if counts["failed"]:
+        print(f"Detalhes das falhas em {os.path.join(args.output, FAILURES_FILE)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Cache LRU com expiração (TTL) para respostas da consultoria com IA.
+
+Compartilhado por todas as sessões do processo: perguntas repetidas (como as
+perguntas sugeridas clicadas pela turma inteira ao mesmo tempo) são
+respondidas sem nova chamada à API.
+"""
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza caixa, acentuação composta e espaços para comparar perguntas"""
+    text = unicodedata.normalize("NFKC", text or "")
+    return " ".join(text.casefold().split())
+
+
+def make_key(prompt: str, context: str = "", model: str = "") -> str:
+    """Chave do cache a partir da pergunta, do contexto e do modelo"""
+    raw = "\x00".join((normalize_text(prompt), normalize_text(context), model))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Cache LRU limitado em tamanho, com TTL e contadores de acerto/erro"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 6 * 3600, clock=time.monotonic):
+        if max_entries <= 0:
+            raise ValueError("max_entries deve ser positivo")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """Retorna a resposta armazenada ou ``None`` se ausente/expirada"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if self._clock() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: str):
+        """Armazena uma resposta, descartando a menos usada se o limite for atingido"""
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove todas as respostas armazenadas"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        """Contadores de uso do cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
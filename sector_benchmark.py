@@ -0,0 +1,135 @@
+"""Comparação dos indicadores com empresas do mesmo setor.
+
+A base de pares é um arquivo de demonstrações no formato de ``data_sources``
+(CSV, Parquet ou SPED-ECD), com o setor de cada empresa na coluna
+``segment``. Os indicadores de todas as empresas são calculados de uma vez
+por ``indicators.compute_indicators`` e, para cada setor e indicador, os
+valores ficam guardados em um array ordenado. O percentil de uma empresa é
+então uma busca binária nesse array, e os quartis são calculados uma única
+vez, na carga.
+"""
+import bisect
+import math
+from typing import Dict, Any, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from indicators import INDICATOR_NAMES, compute_indicators
+from response_cache import normalize_text
+
+SECTOR_COLUMN = "segment"
+QUARTILES = (0.25, 0.5, 0.75)
+
+
+class SectorBenchmark:
+    """Arrays ordenados de cada indicador por setor; ``sector=None`` compara com todas as empresas"""
+
+    def __init__(self, indicators: pd.DataFrame, sectors: Sequence[str]):
+        if len(sectors) != len(indicators):
+            raise ValueError("indicators e sectors devem ter o mesmo número de linhas")
+        sectors = pd.Series(np.asarray(sectors, dtype=object), index=indicators.index).fillna("").astype(str).str.strip()
+
+        self._sorted: Dict[Optional[str], Dict[str, np.ndarray]] = {}
+        # Vistas sem cópia dos mesmos arrays, para a busca escalar com bisect
+        self._views: Dict[Optional[str], Dict[str, memoryview]] = {}
+        self._quartiles: Dict[Optional[str], Dict[str, Tuple[float, float, float]]] = {}
+        self._counts: Dict[Optional[str], int] = {}
+
+        groups = [(None, indicators)] + [(sector, group) for sector, group in indicators.groupby(sectors.to_numpy()) if sector]
+        for sector, group in groups:
+            self._counts[sector] = len(group)
+            self._sorted[sector] = {}
+            self._views[sector] = {}
+            self._quartiles[sector] = {}
+            for name in INDICATOR_NAMES:
+                values = group[name].to_numpy(dtype=np.float64)
+                # Divisões por zero (inf/NaN) não entram na distribuição
+                values = np.sort(values[np.isfinite(values)])
+                self._sorted[sector][name] = values
+                self._views[sector][name] = memoryview(values)
+                self._quartiles[sector][name] = (
+                    tuple(float(q) for q in np.quantile(values, QUARTILES)) if len(values) else (np.nan,) * len(QUARTILES)
+                )
+        self._lookup = {normalize_text(sector): sector for sector in self._counts if sector is not None}
+
+    @classmethod
+    def from_statements(cls, frame: pd.DataFrame, sector_column: str = SECTOR_COLUMN, period: Optional[str] = None) -> "SectorBenchmark":
+        """Base de pares a partir de um DataFrame de ``data_sources.load_statements``
+
+        Sem ``period``, usa o período mais recente de cada empresa.
+        """
+        if sector_column not in frame.columns:
+            raise ValueError(f"Coluna de setor ausente: {sector_column}")
+        if period is not None:
+            frame = frame[frame.index.get_level_values("period") == str(period)]
+        else:
+            from period_store import sort_periods
+
+            # Ordem cronológica, não alfabética: "03/2025" vem depois de "12/2024"
+            frame = sort_periods(frame).groupby(level="company", sort=False).tail(1)
+        return cls(compute_indicators(frame), frame[sector_column])
+
+    @classmethod
+    def from_file(cls, path: str, sector_column: str = SECTOR_COLUMN, period: Optional[str] = None, **load_kwargs) -> "SectorBenchmark":
+        """Carrega a base de pares com ``data_sources.load_statements`` (e seu cache Parquet)"""
+        from data_sources import load_statements
+
+        return cls.from_statements(load_statements(path, **load_kwargs), sector_column, period)
+
+    def sectors(self) -> List[str]:
+        return sorted(sector for sector in self._counts if sector is not None)
+
+    def find_sector(self, name: str) -> Optional[str]:
+        """Setor da base com o mesmo nome, ignorando caixa e espaços extras"""
+        return self._lookup.get(normalize_text(name))
+
+    def company_count(self, sector: Optional[str] = None) -> int:
+        self._check(sector)
+        return self._counts[sector]
+
+    def percentile_rank(self, name: str, value, sector: Optional[str] = None):
+        """Percentual das empresas do setor com valor menor que ``value`` (empates contam pela metade)
+
+        Aceita um valor ou um array de valores. Retorna ``NaN`` para valores não
+        finitos ou quando o setor não tem valores do indicador.
+        """
+        self._check(sector)
+        if isinstance(value, (int, float)):
+            # Caminho escalar sem arrays intermediários: duas buscas binárias na vista do array
+            view = self._views[sector][name]
+            if not len(view) or not math.isfinite(value):
+                return math.nan
+            return (bisect.bisect_left(view, value) + bisect.bisect_right(view, value)) * 50.0 / len(view)
+
+        values = self._sorted[sector][name]
+        value = np.asarray(value, dtype=np.float64)
+        if len(values) == 0:
+            rank = np.full(value.shape, np.nan)
+        else:
+            below = np.searchsorted(values, value, side="left")
+            at_or_below = np.searchsorted(values, value, side="right")
+            rank = np.where(np.isfinite(value), (below + at_or_below) * (50.0 / len(values)), np.nan)
+        return float(rank) if rank.ndim == 0 else rank
+
+    def percentile_ranks(self, indicators: Mapping[str, Any], sector: Optional[str] = None) -> Dict[str, float]:
+        """Percentil de cada indicador, a partir da saída de ``calculate_indicators`` ou de ``{nome: valor}``"""
+        ranks = {}
+        for name in INDICATOR_NAMES:
+            if name in indicators:
+                item = indicators[name]
+                ranks[name] = self.percentile_rank(name, item["value"] if isinstance(item, Mapping) else item, sector)
+        return ranks
+
+    def quartiles(self, name: str, sector: Optional[str] = None) -> Tuple[float, float, float]:
+        """1º quartil, mediana e 3º quartil do indicador no setor"""
+        self._check(sector)
+        return self._quartiles[sector][name]
+
+    def sector_quartiles(self, sector: Optional[str] = None) -> Dict[str, Tuple[float, float, float]]:
+        self._check(sector)
+        return dict(self._quartiles[sector])
+
+    def _check(self, sector: Optional[str]):
+        if sector not in self._counts:
+            raise KeyError(f"Setor '{sector}' não encontrado na base de comparação")
@@ -0,0 +1,204 @@
+"""Arquivos estáticos do app: CSS, fontes e logo com nomes por conteúdo.
+
+Os originais ficam em ``assets/`` (``app.css``, ``fonts/<Família>-<peso>.woff2``
+e ``unifor-logo.png``). ``build_assets`` copia cada arquivo para ``static/``
+com o hash do conteúdo no nome (``app.3f9c2a1b7d4e.css``), gera as regras
+``@font-face`` apontando para as fontes locais e grava um ``manifest.json``.
+Como o nome muda sempre que o conteúdo muda, o navegador pode manter os
+arquivos em cache sem risco de servir uma versão antiga.
+
+As fontes e o logo não acompanham o repositório: precisam ser baixados uma
+vez, com acesso à internet, por ``python static_assets.py fetch`` e então
+adicionados a ``assets/``. O app nunca os busca em servidores externos, então,
+enquanto faltarem, o CSS recorre à Source Sans (já carregada pelo Streamlit) e
+às fontes do sistema no lugar de Poppins e Inter, e o cabeçalho mostra o nome
+da Unifor em texto no lugar do logo.
+
+Uso:
+    python static_assets.py fetch   # baixa fontes e logo para assets/
+    python static_assets.py build   # gera static/ (o app também faz isso ao iniciar)
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import urllib.request
+from typing import Dict, Any, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ASSETS_DIR = os.path.join(ROOT, "assets")
+STATIC_DIR = os.path.join(ROOT, "static")
+
+# Prefixo relativo das URLs servidas pelo Streamlit com server.enableStaticServing
+STATIC_URL_PREFIX = "app/static/"
+
+CSS_FILE = "app.css"
+LOGO_FILE = "unifor-logo.png"
+FONTS_DIR = "fonts"
+MANIFEST_FILE = "manifest.json"
+
+# Origem das cópias locais, usada só por ``fetch``
+GOOGLE_FONTS_URL = (
+    "https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800"
+    "&family=Poppins:wght@300;400;500;600;700;800&display=swap"
+)
+LOGO_URL = "https://www.unifor.br/documents/392178/3101527/logo.png"
+
+# O Google Fonts só devolve woff2 para navegadores que o suportam
+_WOFF2_USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+_FONT_FILE_RE = re.compile(r"^(?P<family>[A-Za-z]+)-(?P<weight>\d{3})\.woff2$")
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def hashed_name(name: str, data: bytes) -> str:
+    """``app.css`` -> ``app.<hash>.css``"""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{content_hash(data)}{ext}"
+
+
+def font_face_css(fonts: List[Tuple[str, int, str]]) -> str:
+    """Regras ``@font-face`` para ``(família, peso, url)``"""
+    return "".join(
+        f"@font-face {{ font-family: '{family}'; font-style: normal; font-weight: {weight}; "
+        f"font-display: swap; src: url('{url}') format('woff2'); }}\n"
+        for family, weight, url in fonts
+    )
+
+
+def fallback_css(assets_dir: str = ASSETS_DIR) -> str:
+    """CSS para injeção inline quando os arquivos estáticos não são servidos"""
+    with open(os.path.join(assets_dir, CSS_FILE), encoding="utf-8") as f:
+        return f.read()
+
+
+def build_assets(assets_dir: str = ASSETS_DIR, static_dir: str = STATIC_DIR) -> Dict[str, Any]:
+    """Gera ``static_dir`` a partir de ``assets_dir`` e devolve o manifesto
+
+    O manifesto traz os nomes com hash (relativos a ``static_dir``) de ``css``,
+    ``logo`` (ou ``None``) e de cada fonte. Arquivos de versões anteriores
+    são removidos.
+    """
+    manifest: Dict[str, Any] = {"css": None, "logo": None, "fonts": {}}
+    written = set()
+
+    faces = []
+    fonts_src = os.path.join(assets_dir, FONTS_DIR)
+    for name in sorted(os.listdir(fonts_src)) if os.path.isdir(fonts_src) else []:
+        match = _FONT_FILE_RE.match(name)
+        if not match:
+            continue
+        # Fontes variáveis repetem o mesmo arquivo em todos os pesos: mesmo conteúdo, mesma URL
+        target = _publish(os.path.join(fonts_src, name), os.path.join(FONTS_DIR, f"{match['family']}.woff2"), static_dir)
+        written.add(target)
+        manifest["fonts"][name] = target
+        faces.append((match["family"], int(match["weight"]), STATIC_URL_PREFIX + target))
+
+    with open(os.path.join(assets_dir, CSS_FILE), encoding="utf-8") as f:
+        css = f.read()
+    css = font_face_css(faces) + css
+    manifest["css"] = _publish_bytes(css.encode("utf-8"), CSS_FILE, static_dir)
+    written.add(manifest["css"])
+
+    logo = os.path.join(assets_dir, LOGO_FILE)
+    if os.path.exists(logo):
+        manifest["logo"] = _publish(logo, LOGO_FILE, static_dir)
+        written.add(manifest["logo"])
+
+    _write_if_changed(os.path.join(static_dir, MANIFEST_FILE), json.dumps(manifest, indent=2).encode("utf-8"))
+    written.add(MANIFEST_FILE)
+    _remove_stale(static_dir, written)
+    return manifest
+
+
+def fetch_assets(assets_dir: str = ASSETS_DIR, timeout: float = 30) -> List[str]:
+    """Baixa as fontes (subconjunto latin, woff2) e o logo para ``assets_dir``"""
+    css = _download(GOOGLE_FONTS_URL, timeout).decode("utf-8")
+    saved = []
+    os.makedirs(os.path.join(assets_dir, FONTS_DIR), exist_ok=True)
+    downloads: Dict[str, bytes] = {}
+    for family, weight, url in _latin_font_faces(css):
+        if url not in downloads:
+            downloads[url] = _download(url, timeout)
+        path = os.path.join(assets_dir, FONTS_DIR, f"{family}-{weight}.woff2")
+        _write_if_changed(path, downloads[url])
+        saved.append(path)
+
+    path = os.path.join(assets_dir, LOGO_FILE)
+    _write_if_changed(path, _download(LOGO_URL, timeout))
+    saved.append(path)
+    return saved
+
+
+def _latin_font_faces(css: str) -> List[Tuple[str, int, str]]:
+    """Extrai ``(família, peso, url)`` dos blocos ``/* latin */`` do CSS do Google Fonts"""
+    faces = []
+    for match in re.finditer(r"/\*\s*([\w-]+)\s*\*/\s*@font-face\s*\{(.*?)\}", css, re.S):
+        subset, block = match.groups()
+        if subset != "latin":
+            continue
+        family = re.search(r"font-family:\s*'([^']+)'", block).group(1).replace(" ", "")
+        weight = int(re.search(r"font-weight:\s*(\d+)", block).group(1))
+        url = re.search(r"url\(([^)]+)\)", block).group(1)
+        faces.append((family, weight, url))
+    return faces
+
+
+def _download(url: str, timeout: float) -> bytes:
+    request = urllib.request.Request(url, headers={"User-Agent": _WOFF2_USER_AGENT})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+
+def _publish(source: str, name: str, static_dir: str) -> str:
+    with open(source, "rb") as f:
+        return _publish_bytes(f.read(), name, static_dir)
+
+
+def _publish_bytes(data: bytes, name: str, static_dir: str) -> str:
+    """Grava ``data`` em ``static_dir`` com o hash no nome e devolve o caminho relativo"""
+    target = hashed_name(name, data).replace(os.sep, "/")
+    path = os.path.join(static_dir, target)
+    if not os.path.exists(path):
+        _write_if_changed(path, data)
+    return target
+
+
+def _write_if_changed(path: str, data: bytes):
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _remove_stale(static_dir: str, keep: set):
+    for dirpath, _, filenames in os.walk(static_dir):
+        for filename in filenames:
+            relative = os.path.relpath(os.path.join(dirpath, filename), static_dir).replace(os.sep, "/")
+            if relative not in keep:
+                os.remove(os.path.join(dirpath, filename))
+
+
+def main(argv: Optional[List[str]] = None):
+    command = (argv or sys.argv[1:] or ["build"])[0]
+    if command == "fetch":
+        for path in fetch_assets():
+            print(f"baixado: {os.path.relpath(path, ROOT)}")
+    elif command == "build":
+        print(json.dumps(build_assets(), indent=2))
+    else:
+        print(__doc__)
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
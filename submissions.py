@@ -0,0 +1,331 @@
+"""Registro das atividades dos alunos para o painel do professor.
+
+Guarda em SQLite (modo WAL) as simulações de liquidez (valores de Ativo e
+Passivo Circulante escolhidos nos sliders), as perguntas feitas à IA e as
+seções visitadas por aluno e turma. Os eventos entram em uma fila em memória
+e são gravados em lote, numa única transação, quando a fila atinge
+``batch_size`` ou a cada ``flush_interval`` segundos. Se a gravação falha (banco
+bloqueado, disco cheio), o lote volta para a fila e é gravado na próxima
+tentativa; só quando a fila passa de ``max_pending`` os eventos mais antigos
+são descartados, com registro no log.
+
+Na mesma transação, cada lote atualiza tabelas pré-agregadas (contagem por
+célula da grade do simulador, contagem por pergunta normalizada e totais por
+aluno), de modo que as consultas do painel leem milhares de linhas
+agregadas em vez de centenas de milhares de eventos.
+"""
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from response_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS simulations (
+    id INTEGER PRIMARY KEY,
+    class_id TEXT NOT NULL,
+    student TEXT NOT NULL,
+    ativo_circulante INTEGER NOT NULL,
+    passivo_circulante INTEGER NOT NULL,
+    timestamp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS simulations_class_time ON simulations (class_id, timestamp);
+
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    class_id TEXT NOT NULL,
+    student TEXT NOT NULL,
+    question_key TEXT NOT NULL,
+    question TEXT NOT NULL,
+    timestamp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS questions_class_time ON questions (class_id, timestamp);
+
+-- Agregados atualizados a cada lote
+CREATE TABLE IF NOT EXISTS simulation_grid (
+    class_id TEXT NOT NULL,
+    ativo_circulante INTEGER NOT NULL,
+    passivo_circulante INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (class_id, ativo_circulante, passivo_circulante)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS question_counts (
+    class_id TEXT NOT NULL,
+    question_key TEXT NOT NULL,
+    question TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    last_asked REAL NOT NULL,
+    PRIMARY KEY (class_id, question_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS question_counts_top ON question_counts (class_id, count DESC);
+
+CREATE TABLE IF NOT EXISTS students (
+    class_id TEXT NOT NULL,
+    student TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    simulations INTEGER NOT NULL DEFAULT 0,
+    questions INTEGER NOT NULL DEFAULT 0,
+    sections INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (class_id, student)
+) WITHOUT ROWID;
+"""
+
+# Eventos da fila: (tipo, turma, aluno, carga, timestamp)
+SIMULATION, QUESTION, VISIT = "simulation", "question", "visit"
+
+
+class SubmissionStore:
+    """Fila de eventos com gravação em lote e consultas agregadas para o painel
+
+    ``sections`` define a ordem dos bits da máscara de seções visitadas de
+    cada aluno; deve ser sempre a mesma lista para um mesmo banco.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        sections: Sequence[str],
+        batch_size: int = 200,
+        flush_interval: float = 2.0,
+        max_pending: int = 100_000,
+    ):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.sections = tuple(sections)
+        self._section_bits = {section: 1 << i for i, section in enumerate(self.sections)}
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.flushed_events = 0
+        self.dropped_events = 0
+        # Depois de uma falha, só a thread periódica tenta de novo, sem travar o rerun
+        self._retry_after = 0.0
+
+        self._pending: List[tuple] = []
+        self._pending_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        self._stop = threading.Event()
+        self._flusher = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_periodically, name="submissions-flush", daemon=True)
+            self._flusher.start()
+        atexit.register(self.close)
+
+    # Registro -------------------------------------------------------------
+
+    def record_simulation(self, class_id: str, student: str, ativo_circulante: float, passivo_circulante: float):
+        """Valores do simulador em R$ mil, como nos sliders"""
+        self._enqueue((SIMULATION, class_id, student, (int(ativo_circulante), int(passivo_circulante)), time.time()))
+
+    def record_question(self, class_id: str, student: str, question: str):
+        question = question.strip()
+        if question:
+            self._enqueue((QUESTION, class_id, student, question, time.time()))
+
+    def record_visit(self, class_id: str, student: str, section: str):
+        bit = self._section_bits.get(section)
+        if bit is not None:
+            self._enqueue((VISIT, class_id, student, bit, time.time()))
+
+    def _enqueue(self, event: tuple):
+        with self._pending_lock:
+            self._pending.append(event)
+            full = len(self._pending) >= self.batch_size
+        if full and time.time() >= self._retry_after:
+            self._try_flush()
+
+    def flush(self) -> int:
+        """Grava os eventos pendentes e atualiza os agregados em uma única transação"""
+        with self._pending_lock:
+            events, self._pending = self._pending, []
+        if not events:
+            return 0
+
+        simulations, questions = [], []
+        grid: Counter = Counter()
+        question_counts: Dict[Tuple[str, str], list] = {}
+        # (turma, aluno) -> [primeiro, último, simulações, perguntas, máscara de seções]
+        students: Dict[Tuple[str, str], list] = defaultdict(lambda: [float("inf"), 0.0, 0, 0, 0])
+
+        for kind, class_id, student, payload, timestamp in events:
+            totals = students[(class_id, student)]
+            totals[0] = min(totals[0], timestamp)
+            totals[1] = max(totals[1], timestamp)
+            if kind == SIMULATION:
+                simulations.append((class_id, student, payload[0], payload[1], timestamp))
+                grid[(class_id, payload[0], payload[1])] += 1
+                totals[2] += 1
+            elif kind == QUESTION:
+                key = normalize_text(payload)[:500]
+                questions.append((class_id, student, key, payload, timestamp))
+                entry = question_counts.setdefault((class_id, key), [payload, 0, 0.0])
+                entry[1] += 1
+                entry[2] = max(entry[2], timestamp)
+                totals[3] += 1
+            else:
+                totals[4] |= payload
+
+        try:
+            self._write(events, simulations, questions, grid, question_counts, students)
+        except sqlite3.Error:
+            self._requeue(events)
+            raise
+        self.flushed_events += len(events)
+        return len(events)
+
+    def _write(self, events, simulations, questions, grid, question_counts, students):
+        with self._db_lock:
+            conn = self._conn
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    "INSERT INTO simulations (class_id, student, ativo_circulante, passivo_circulante, timestamp) VALUES (?, ?, ?, ?, ?)",
+                    simulations,
+                )
+                conn.executemany(
+                    "INSERT INTO questions (class_id, student, question_key, question, timestamp) VALUES (?, ?, ?, ?, ?)",
+                    questions,
+                )
+                conn.executemany(
+                    "INSERT INTO simulation_grid VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (class_id, ativo_circulante, passivo_circulante) DO UPDATE SET count = count + excluded.count",
+                    [(*key, count) for key, count in grid.items()],
+                )
+                conn.executemany(
+                    "INSERT INTO question_counts VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (class_id, question_key) DO UPDATE SET "
+                    "count = count + excluded.count, last_asked = MAX(last_asked, excluded.last_asked)",
+                    [(class_id, key, text, count, last) for (class_id, key), (text, count, last) in question_counts.items()],
+                )
+                conn.executemany(
+                    "INSERT INTO students VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (class_id, student) DO UPDATE SET "
+                    "first_seen = MIN(first_seen, excluded.first_seen), last_seen = MAX(last_seen, excluded.last_seen), "
+                    "simulations = simulations + excluded.simulations, questions = questions + excluded.questions, "
+                    "sections = sections | excluded.sections",
+                    [(*key, *totals) for key, totals in students.items()],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+
+    def _requeue(self, events: List[tuple]):
+        """Devolve um lote não gravado ao início da fila, descartando os mais antigos acima de ``max_pending``"""
+        with self._pending_lock:
+            pending = events + self._pending
+            overflow = len(pending) - self.max_pending
+            if overflow > 0:
+                pending = pending[overflow:]
+                self.dropped_events += overflow
+                logger.error("Fila de atividades cheia: %d eventos mais antigos descartados (%d no total)", overflow, self.dropped_events)
+            self._pending = pending
+
+    def _try_flush(self):
+        try:
+            self.flush()
+            self._retry_after = 0.0
+        except sqlite3.Error as error:
+            self._retry_after = time.time() + self.flush_interval
+            logger.warning("Falha ao gravar atividades (%s); %d eventos aguardam nova tentativa", error, len(self._pending))
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.flush_interval):
+            self._try_flush()
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._try_flush()
+        if self._pending:
+            self.dropped_events += len(self._pending)
+            logger.error("Encerrando com %d eventos de atividades não gravados", len(self._pending))
+        with self._db_lock:
+            self._conn.close()
+
+    # Consultas do painel --------------------------------------------------
+
+    def _query(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        with self._db_lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def classes(self) -> List[str]:
+        return [row[0] for row in self._query("SELECT DISTINCT class_id FROM students ORDER BY class_id")]
+
+    def totals(self, class_id: Optional[str] = None) -> Dict[str, Any]:
+        """Alunos, simulações e perguntas da turma (ou de todas)"""
+        where, params = _class_filter(class_id)
+        students, simulations, questions, last_seen = self._query(
+            f"SELECT COUNT(*), COALESCE(SUM(simulations), 0), COALESCE(SUM(questions), 0), MAX(last_seen) FROM students {where}",
+            params,
+        )[0]
+        return {"students": students, "simulations": simulations, "questions": questions, "last_activity": last_seen}
+
+    def simulation_grid(self, class_id: Optional[str] = None) -> List[Tuple[int, int, int]]:
+        """``(ativo, passivo, contagem)`` por célula da grade do simulador (R$ mil)"""
+        where, params = _class_filter(class_id)
+        return self._query(
+            f"SELECT ativo_circulante, passivo_circulante, SUM(count) FROM simulation_grid {where} "
+            "GROUP BY ativo_circulante, passivo_circulante",
+            params,
+        )
+
+    def top_questions(self, class_id: Optional[str] = None, limit: int = 10) -> List[Tuple[str, int, float]]:
+        """``(pergunta, vezes, última vez)`` das perguntas mais feitas, agrupadas por texto normalizado"""
+        if class_id is not None:
+            return self._query(
+                "SELECT question, count, last_asked FROM question_counts WHERE class_id = ? ORDER BY count DESC LIMIT ?",
+                (class_id, limit),
+            )
+        return self._query(
+            "SELECT MIN(question), SUM(count) AS total, MAX(last_asked) FROM question_counts "
+            "GROUP BY question_key ORDER BY total DESC LIMIT ?",
+            (limit,),
+        )
+
+    def class_progress(self) -> List[Dict[str, Any]]:
+        """Uma linha por turma: alunos, seções visitadas em média e atividade"""
+        visited = " + ".join(f"((sections >> {i}) & 1)" for i in range(len(self.sections))) or "0"
+        rows = self._query(
+            f"SELECT class_id, COUNT(*), AVG({visited}), SUM(simulations), SUM(questions), MAX(last_seen) "
+            "FROM students GROUP BY class_id ORDER BY class_id"
+        )
+        return [
+            {
+                "class_id": class_id,
+                "students": students,
+                "sections_visited": avg_sections or 0.0,
+                "progress": (avg_sections or 0.0) / len(self.sections) if self.sections else 0.0,
+                "simulations": simulations,
+                "questions": questions,
+                "last_activity": last_seen,
+            }
+            for class_id, students, avg_sections, simulations, questions, last_seen in rows
+        ]
+
+    def section_reach(self, class_id: Optional[str] = None) -> Dict[str, int]:
+        """Quantos alunos visitaram cada seção"""
+        where, params = _class_filter(class_id)
+        columns = ", ".join(f"SUM((sections >> {i}) & 1)" for i in range(len(self.sections)))
+        row = self._query(f"SELECT {columns} FROM students {where}", params)[0]
+        return {section: int(count or 0) for section, count in zip(self.sections, row)}
+
+
+def _class_filter(class_id: Optional[str]) -> Tuple[str, tuple]:
+    return ("WHERE class_id = ?", (class_id,)) if class_id is not None else ("", ())
@@ -0,0 +1,205 @@
+"""Instrumentação opcional do tempo de renderização por seção.
+
+Cada rerun do script (e cada reexecução isolada de um fragmento) gera um
+``RerunRecord`` com o tempo total, o tempo de cada trecho medido (injeção de
+CSS, indicadores, construção e envio das figuras, sidebar, funções
+``show_*``) e o tamanho em bytes das figuras enviadas, junto com o tamanho
+que teriam sem a redução de pontos e a compactação (``downsampling.py`` e
+``figure_payload.py``).
+
+``Telemetry`` agrega os registros do processo inteiro: mantém uma janela de
+amostras por trecho para p50/p95, conta reruns por seção, grava cada rerun
+como uma linha JSON e exporta as métricas no formato texto do Prometheus.
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Iterator, List, Optional
+
+import numpy as np
+
+RERUN_SPAN = "rerun"
+
+
+class RerunRecord:
+    """Medições de um único rerun"""
+
+    def __init__(self, clock: Callable[[], float]):
+        self._clock = clock
+        self.section: Optional[str] = None
+        self.started = clock()
+        self.timestamp = time.time()
+        self.spans: Dict[str, float] = defaultdict(float)
+        self.payload_bytes: Dict[str, int] = defaultdict(int)
+        self.raw_payload_bytes: Dict[str, int] = defaultdict(int)
+        self.finished = False
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Acumula o tempo do bloco em ``spans[name]`` (em segundos)"""
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.spans[name] += self._clock() - start
+
+    def add_payload(self, figure: str, nbytes: int, raw_nbytes: Optional[int] = None):
+        """Bytes enviados da figura e os bytes da figura original, antes da redução e da compactação"""
+        self.payload_bytes[figure] += nbytes
+        self.raw_payload_bytes[figure] += nbytes if raw_nbytes is None else raw_nbytes
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "timestamp": self.timestamp,
+            "section": self.section,
+            "total_ms": round(self.spans[RERUN_SPAN] * 1000, 3),
+            "spans_ms": {name: round(value * 1000, 3) for name, value in self.spans.items() if name != RERUN_SPAN},
+            "payload_bytes": dict(self.payload_bytes),
+            "raw_payload_bytes": dict(self.raw_payload_bytes),
+        }
+
+
+class Telemetry:
+    """Agregador de medições por processo, seguro para várias sessões"""
+
+    def __init__(
+        self,
+        window: int = 1000,
+        log_path: Optional[str] = None,
+        prometheus_path: Optional[str] = None,
+        export_interval: float = 5.0,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.window = window
+        self.log_path = log_path
+        self.prometheus_path = prometheus_path
+        self.export_interval = export_interval
+        self._clock = clock
+        self._samples: Dict[tuple, deque] = {}
+        self._sums: Dict[tuple, float] = defaultdict(float)
+        self._counts: Dict[tuple, int] = defaultdict(int)
+        self._reruns: Dict[str, int] = defaultdict(int)
+        self._payload: Dict[tuple, int] = defaultdict(int)
+        self._raw_payload: Dict[tuple, int] = defaultdict(int)
+        self._last_export = 0.0
+        self._lock = threading.Lock()
+
+    def start_rerun(self) -> RerunRecord:
+        return RerunRecord(self._clock)
+
+    def finish_rerun(self, record: RerunRecord):
+        """Fecha o registro, agrega suas medições e exporta logs/métricas"""
+        if record.finished:
+            return
+        record.finished = True
+        record.spans[RERUN_SPAN] = self._clock() - record.started
+        section = record.section = record.section or "desconhecida"
+
+        with self._lock:
+            self._reruns[section] += 1
+            for name, seconds in record.spans.items():
+                key = (section, name)
+                samples = self._samples.get(key)
+                if samples is None:
+                    samples = self._samples[key] = deque(maxlen=self.window)
+                samples.append(seconds)
+                self._sums[key] += seconds
+                self._counts[key] += 1
+            for figure, nbytes in record.payload_bytes.items():
+                self._payload[(section, figure)] += nbytes
+            for figure, nbytes in record.raw_payload_bytes.items():
+                self._raw_payload[(section, figure)] += nbytes
+
+        if self.log_path:
+            self._append_log(record.to_dict())
+        now = self._clock()
+        if self.prometheus_path and now - self._last_export >= self.export_interval:
+            self._last_export = now
+            self.export_prometheus(self.prometheus_path)
+
+    def percentiles(self, quantiles=(50, 95)) -> List[Dict[str, Any]]:
+        """Uma linha por seção e trecho com a contagem e os percentis, em ms"""
+        with self._lock:
+            snapshot = {key: np.fromiter(samples, dtype=np.float64) for key, samples in self._samples.items()}
+            counts = dict(self._counts)
+        rows = []
+        for (section, span), values in sorted(snapshot.items()):
+            pct = np.percentile(values, quantiles) * 1000
+            rows.append({
+                "section": section,
+                "span": span,
+                "count": counts[(section, span)],
+                **{f"p{q}_ms": round(float(v), 2) for q, v in zip(quantiles, pct)},
+            })
+        return rows
+
+    def reruns(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._reruns)
+
+    def payload_bytes(self, raw: bool = False) -> Dict[str, int]:
+        """Bytes de figuras enviados por seção, somando todos os reruns (``raw``: antes da redução e da compactação)"""
+        totals: Dict[str, int] = defaultdict(int)
+        with self._lock:
+            for (section, _), nbytes in (self._raw_payload if raw else self._payload).items():
+                totals[section] += nbytes
+        return dict(totals)
+
+    def prometheus_text(self, quantiles=(0.5, 0.95)) -> str:
+        """Métricas no formato de exposição em texto do Prometheus"""
+        lines = [
+            "# HELP app_render_seconds Tempo de renderização por seção e trecho.",
+            "# TYPE app_render_seconds summary",
+        ]
+        with self._lock:
+            snapshot = {key: np.fromiter(samples, dtype=np.float64) for key, samples in self._samples.items()}
+            sums = dict(self._sums)
+            counts = dict(self._counts)
+            reruns = dict(self._reruns)
+            payload = dict(self._payload)
+            raw_payload = dict(self._raw_payload)
+
+        for (section, span), values in sorted(snapshot.items()):
+            labels = f'section="{_escape(section)}",span="{_escape(span)}"'
+            for q, v in zip(quantiles, np.quantile(values, quantiles)):
+                lines.append(f'app_render_seconds{{{labels},quantile="{q}"}} {v:.6f}')
+            lines.append(f"app_render_seconds_sum{{{labels}}} {sums[(section, span)]:.6f}")
+            lines.append(f"app_render_seconds_count{{{labels}}} {counts[(section, span)]}")
+
+        lines += ["# HELP app_reruns_total Reruns do script por seção.", "# TYPE app_reruns_total counter"]
+        for section, count in sorted(reruns.items()):
+            lines.append(f'app_reruns_total{{section="{_escape(section)}"}} {count}')
+
+        lines += ["# HELP app_figure_payload_bytes_total Bytes de figuras enviados ao navegador.", "# TYPE app_figure_payload_bytes_total counter"]
+        for (section, figure), nbytes in sorted(payload.items()):
+            lines.append(f'app_figure_payload_bytes_total{{section="{_escape(section)}",figure="{_escape(figure)}"}} {nbytes}')
+
+        lines += [
+            "# HELP app_figure_raw_payload_bytes_total Bytes que as figuras teriam sem a redução e a compactação.",
+            "# TYPE app_figure_raw_payload_bytes_total counter",
+        ]
+        for (section, figure), nbytes in sorted(raw_payload.items()):
+            lines.append(f'app_figure_raw_payload_bytes_total{{section="{_escape(section)}",figure="{_escape(figure)}"}} {nbytes}')
+        return "\n".join(lines) + "\n"
+
+    def export_prometheus(self, path: str):
+        """Grava as métricas de forma atômica, para leitura por um node_exporter (textfile)"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def _append_log(self, entry: Dict[str, Any]):
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
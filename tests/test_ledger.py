@@ -0,0 +1,101 @@
+"""Agregação do razão: sinais por natureza, ``append`` incremental e DRE do exercício."""
+import math
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ledger import LedgerAggregator  # noqa: E402
+
+CHART = {
+    "1.1.1": "disponibilidades",
+    "1.1.2": "clientes",
+    "1.2.1": "imobilizado",
+    "2.1.1": "fornecedores",
+    "2.1.2": "obrigacoes_trabalhistas",
+    "2.2.1": "emprestimos_lp",
+    "2.3.1": "capital_social",
+    "3.1": "receita_bruta",
+    "3.2": "deducoes",
+    "4.1": "custo_mercadorias",
+    "4.2": "despesas_administrativas",
+    "4.3": "ir_csll",
+}
+
+
+def _entries(rows):
+    """Lançamentos em partidas dobradas: (data, conta debitada, conta creditada, valor)"""
+    records = []
+    for date, debit_account, credit_account, amount in rows:
+        records.append({"date": date, "account": debit_account, "debit": amount, "credit": 0.0})
+        records.append({"date": date, "account": credit_account, "debit": 0.0, "credit": amount})
+    return pd.DataFrame(records)
+
+
+# Venda do exercício anterior: entra em Lucros Acumulados, mas não na DRE de 2024
+FIRST_BATCH = _entries([
+    ("2023-12-15", "1.1.1", "3.1", 10_000.0),
+    ("2024-01-02", "1.1.1", "2.3.1", 100_000.0),
+    ("2024-01-10", "1.1.1", "2.2.1", 50_000.0),
+    ("2024-01-20", "1.2.1", "1.1.1", 60_000.0),
+])
+
+# O primeiro lançamento cai no mesmo mês e conta do lote anterior e precisa ser somado a ele
+SECOND_BATCH = _entries([
+    ("2024-01-25", "4.2", "1.1.1", 5_000.0),
+    ("2024-02-05", "1.1.2", "3.1", 30_000.0),
+    ("2024-02-05", "3.2", "1.1.1", 3_000.0),
+    ("2024-02-28", "4.1", "2.1.1", 12_000.0),
+    ("2024-03-31", "4.3", "1.1.1", 2_000.0),
+])
+
+
+@pytest.fixture
+def ledger():
+    return LedgerAggregator(CHART).append(FIRST_BATCH).append(SECOND_BATCH)
+
+
+def test_balance_sheet_balances(ledger):
+    balance = ledger.statements(as_of="2024-03-31")["balance_sheet"]
+
+    assert balance["disponibilidades"] == 90_000.0
+    assert balance["clientes"] == 30_000.0
+    assert balance["ativo_circulante"] == 120_000.0
+    assert balance["total_ativo"] == 180_000.0
+    assert balance["fornecedores"] == 12_000.0
+    assert balance["emprestimos_lp"] == 50_000.0
+    assert balance["capital_social"] == 100_000.0
+    # Resultado não encerrado: 10.000 de 2023 mais o lucro de 8.000 de 2024
+    assert balance["lucros_acumulados"] == 18_000.0
+    assert balance["total_passivo"] == balance["total_ativo"]
+
+
+def test_income_statement_covers_the_fiscal_year(ledger):
+    income = ledger.statements(as_of="2024-03-31")["income_statement"]
+
+    assert income["receita_bruta"] == 30_000.0
+    assert income["receita_liquida"] == 27_000.0
+    assert income["lucro_bruto"] == 15_000.0
+    assert income["resultado_operacional"] == 10_000.0
+    assert income["resultado_antes_ir"] == 10_000.0
+    assert income["lucro_liquido"] == 8_000.0
+
+    since_2023 = ledger.statements(as_of="2024-03-31", start="2023-01-01")["income_statement"]
+    assert since_2023["receita_bruta"] == 40_000.0
+
+
+def test_incremental_append_matches_single_batch(ledger):
+    single = LedgerAggregator(CHART).append(pd.concat([FIRST_BATCH, SECOND_BATCH], ignore_index=True))
+
+    assert single.statements(as_of="2024-03-31") == ledger.statements(as_of="2024-03-31")
+    assert ledger.entries == len(FIRST_BATCH) + len(SECOND_BATCH)
+
+
+def test_lines_without_activity_are_positive_zero(ledger):
+    data = ledger.statements(as_of="2024-03-31")
+
+    for value in (data["balance_sheet"]["obrigacoes_trabalhistas"], data["income_statement"]["receitas_financeiras"]):
+        assert value == 0.0 and math.copysign(1.0, value) == 1.0